@@ -0,0 +1,50 @@
+"""Compare the time and peak memory of each balance() strategy
+
+Usage: python benchmarks/balance.py [--sizes 1000 100000 ...]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from playground.tree import BinarySearchTree
+
+STRATEGIES = ("rebuild", "in_place")
+
+
+def measure(n: int, strategy: str) -> tuple[float, float]:
+    """Seconds and peak extra bytes per element taken to balance a random tree
+
+    The in-place strategy allocates no nodes, but large subtree sizes are new
+    int objects, which accounts for most of its peak.
+    """
+    values = list(range(n))
+    random.Random(0).shuffle(values)
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    for val in values:
+        tree.add(val)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree.balance(strategy)  # type: ignore[arg-type]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / len(tree)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**4, 10**5])
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'strategy':<10} {'seconds':>10} {'peak B/elem':>12}")
+    for n in args.sizes:
+        for strategy in STRATEGIES:
+            elapsed, peak = measure(n, strategy)
+            print(f"{n:>10} {strategy:<10} {elapsed:>10.3f} {peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
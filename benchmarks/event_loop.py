@@ -0,0 +1,94 @@
+"""Measure how long bulk tree operations block the asyncio event loop
+
+Usage: python benchmarks/event_loop.py [--size N] [--disable-gc]
+
+A ticker task sleeps for a millisecond at a time and records how late it
+wakes up while each operation runs, first with the blocking method and then
+with its async counterpart. Work in the executor still holds the GIL at
+times, most notably while the garbage collector runs, so the loop is not
+entirely free, but it no longer stalls for the whole operation. Running with
+the collector disabled tells its pauses apart from the work the async
+methods leave on the event loop.
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import time
+from collections.abc import Awaitable, Callable
+
+from playground.async_tree import AsyncBinarySearchTree
+
+TICK = 0.001
+
+
+async def lateness(operation: Callable[[], Awaitable[object]]) -> list[float]:
+    delays: list[float] = []
+    done = False
+
+    async def tick() -> None:
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            delays.append(time.perf_counter() - start - TICK)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(TICK)
+    await operation()
+    done = True
+    await ticker
+    return delays
+
+
+async def run(size: int, disable_gc: bool) -> None:
+    values = list(range(size))
+    random.Random(0).shuffle(values)
+    tree = AsyncBinarySearchTree.from_iterable(values)
+    other = AsyncBinarySearchTree.from_sorted(range(0, 2 * size, 2))
+    # Keep the garbage collector from walking the trees, which holds the GIL
+    gc.freeze()
+    if disable_gc:
+        gc.disable()
+
+    async def sync_balance() -> None:
+        tree.balance()
+
+    async def sync_iteration() -> None:
+        for _ in tree:
+            pass
+
+    async def async_iteration() -> None:
+        async for _ in tree:
+            pass
+
+    async def sync_union() -> None:
+        tree.union(other)
+
+    operations = (
+        ("balance", sync_balance),
+        ("abalance", tree.abalance),
+        ("for", sync_iteration),
+        ("async for", async_iteration),
+        ("union", sync_union),
+        ("aunion", lambda: tree.aunion(other)),
+    )
+    print(f"{'operation':>10} {'max lateness (ms)':>18} {'p99 lateness (ms)':>18}")
+    for name, operation in operations:
+        delays = await lateness(operation)
+        delays.sort()
+        worst = delays[-1] * 1000
+        p99 = delays[int(0.99 * (len(delays) - 1))] * 1000
+        print(f"{name:>10} {worst:>18.1f} {p99:>18.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10**6)
+    parser.add_argument("--disable-gc", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.size, args.disable_gc))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare lookups in a mutable tree and in its frozen Eytzinger layout
+
+Usage: python benchmarks/frozen.py [--sizes 10000 1000000 ...] [--queries N]
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+from playground.tree import BinarySearchTree
+
+
+def seconds_per_query(lookup: Callable[[Any], Any], queries: list[int]) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        lookup(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def measure(n: int, n_queries: int) -> dict[str, float]:
+    """Nanoseconds per contains and ceiling query, and seconds to freeze"""
+    tree = BinarySearchTree.from_sorted(range(0, 2 * n, 2))
+    start = time.perf_counter()
+    frozen = tree.freeze()
+    freeze_seconds = time.perf_counter() - start
+
+    rng = random.Random(0)
+    # Half of the queries are in the tree
+    queries = [rng.randrange(2 * n - 1) for _ in range(n_queries)]
+    return {
+        "freeze s": freeze_seconds,
+        "tree in": seconds_per_query(tree.__contains__, queries) * 1e9,
+        "frozen in": seconds_per_query(frozen.__contains__, queries) * 1e9,
+        "tree ceil": seconds_per_query(tree.ceiling, queries) * 1e9,
+        "frozen ceil": seconds_per_query(frozen.ceiling, queries) * 1e9,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10**4, 10**6, 10**7],
+    )
+    parser.add_argument("--queries", type=int, default=10**5)
+    args = parser.parse_args()
+
+    columns = ("freeze s", "tree in", "frozen in", "tree ceil", "frozen ceil")
+    print(f"{'size':>10}" + "".join(f"{column:>13}" for column in columns))
+    print(f"{'':>10}" + f"{'':>13}" + f"{'ns/query':>13}" * (len(columns) - 1))
+    for n in args.sizes:
+        results = measure(n, args.queries)
+        print(f"{n:>10}" + "".join(f"{results[column]:>13.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare the memory taken per element by each tree backend
+
+Usage: python benchmarks/memory.py [--sizes 1000 100000 ...]
+"""
+
+import argparse
+import random
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from playground.compact_tree import CompactBinarySearchTree
+from playground.tree import AVLBinarySearchTree, BinarySearchTree
+
+
+def build_list(values: list[int]) -> Any:
+    return sorted(values)
+
+
+def build_tree(values: list[int]) -> Any:
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    for val in values:
+        tree.add(val)
+    return tree
+
+
+def build_avl_tree(values: list[int]) -> Any:
+    tree: AVLBinarySearchTree[int] = AVLBinarySearchTree()
+    for val in values:
+        tree.add(val)
+    return tree
+
+
+def build_compact_tree(values: list[int]) -> Any:
+    tree: CompactBinarySearchTree[int] = CompactBinarySearchTree()
+    for val in values:
+        tree.add(val)
+    return tree
+
+
+BACKENDS: dict[str, Callable[[list[int]], Any]] = {
+    "sorted list": build_list,
+    "BinarySearchTree": build_tree,
+    "AVLBinarySearchTree": build_avl_tree,
+    "CompactBinarySearchTree": build_compact_tree,
+}
+
+
+def bytes_per_element(build: Callable[[list[int]], Any], n: int) -> float:
+    """Memory retained by the structure, including the int objects it holds"""
+    rng = random.Random(0)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    # Large values, so that CPython does not share cached small ints
+    values = [rng.randrange(2**40, 2**50) for _ in range(n)]
+    structure = build(values)
+    del values
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return (after - before) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10**3, 10**5],
+    )
+    args = parser.parse_args()
+
+    print(f"{'backend':<26}" + "".join(f"{n:>12}" for n in args.sizes))
+    for name, build in BACKENDS.items():
+        results = (bytes_per_element(build, n) for n in args.sizes)
+        print(f"{name:<26}" + "".join(f"{r:>12.1f}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare building a tree from unsorted values serially and with several cores
+
+Usage: python benchmarks/parallel_build.py [--sizes 1000000 ...] [--workers 2 4 ...]
+
+The values are only sorted and built in parallel on free-threaded builds of
+Python. With the GIL, from_iterable_parallel is from_iterable, so the speedup
+stays around 1.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from playground.parallel_tree import from_iterable_parallel
+from playground.tree import BinarySearchTree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**6, 10**7])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({2, 4, os.cpu_count() or 1}),
+    )
+    args = parser.parse_args()
+
+    gil = "enabled" if getattr(sys, "_is_gil_enabled", lambda: True)() else "disabled"
+    print(f"Python {sys.version.split()[0]}, GIL {gil}, {os.cpu_count()} cores")
+    print(f"{'size':>10} {'workers':>8} {'seconds':>10} {'speedup':>8}")
+    for n in args.sizes:
+        rng = random.Random(0)
+        values = [rng.random() for _ in range(n)]
+        start = time.perf_counter()
+        BinarySearchTree.from_iterable(values)
+        serial = time.perf_counter() - start
+        print(f"{n:>10} {'serial':>8} {serial:>10.3f} {1:>8.2f}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            from_iterable_parallel(values, workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{n:>10} {workers:>8} {elapsed:>10.3f} {serial / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
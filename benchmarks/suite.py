@@ -0,0 +1,352 @@
+"""Time tree operations across sizes and distributions, saving JSON results
+
+Usage: python benchmarks/suite.py [--sizes 1000 100000 ...]
+    [--distributions random zipf ...] [--structures BinarySearchTree ...]
+    [--output results.json] [--compare baseline.json]
+
+Each structure is built by adding the values one by one in the order the
+distribution gives them, and the time per operation is then measured for
+lookups, traversals, removals and balancing. A sorted list searched with
+bisect is the baseline. Results are written as JSON, so that runs on two
+commits can be compared with --compare, which lists the operations that got
+slower.
+
+Sorted and reverse-sorted values turn a BinarySearchTree into a chain, as do
+the many copies of the most common Zipf values unless it is a multiset. Such
+trees take O(n^2) to build, so those cases are skipped above --max-chain
+values. So does adding to the sorted list, which shifts the values after each
+one: above --max-chain values, it is built by sorting them instead, and adds
+are not timed.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timezone
+from functools import partial
+from itertools import accumulate
+from typing import Any
+
+from playground.tree import AVLBinarySearchTree, BinarySearchTree
+
+# Exponent of the Zipf distribution: the k-th most common value is drawn with
+# a probability proportional to 1 / k^s
+ZIPF_EXPONENT = 1.1
+# Average copies of each value in the duplicate-heavy distribution
+DUPLICATES = 100
+
+
+def random_order(n: int, rng: random.Random) -> list[int]:
+    values = list(range(0, 2 * n, 2))
+    rng.shuffle(values)
+    return values
+
+
+def sorted_order(n: int, rng: random.Random) -> list[int]:
+    return list(range(0, 2 * n, 2))
+
+
+def reverse_order(n: int, rng: random.Random) -> list[int]:
+    return list(range(2 * n - 2, -1, -2))
+
+
+def duplicate_heavy(n: int, rng: random.Random) -> list[int]:
+    distinct = max(1, n // DUPLICATES)
+    return [2 * rng.randrange(distinct) for _ in range(n)]
+
+
+def zipf(n: int, rng: random.Random) -> list[int]:
+    # The most common values are spread over the range, not the smallest ones
+    ranked = random_order(n, rng)
+    cum_weights = list(accumulate(1 / rank**ZIPF_EXPONENT for rank in range(1, n + 1)))
+    return rng.choices(ranked, cum_weights=cum_weights, k=n)
+
+
+DISTRIBUTIONS: dict[str, Callable[[int, random.Random], list[int]]] = {
+    "random": random_order,
+    "sorted": sorted_order,
+    "reverse": reverse_order,
+    "duplicates": duplicate_heavy,
+    "zipf": zipf,
+}
+
+
+class BisectList:
+    """Sorted list searched with bisect, the baseline the trees are compared to"""
+
+    def __init__(self) -> None:
+        self._values: list[int] = []
+
+    def add(self, val: int) -> None:
+        insort(self._values, val)
+
+    def add_many(self, values: Iterable[int]) -> None:
+        self._values = sorted([*self._values, *values])
+
+    def __contains__(self, val: int) -> bool:
+        index = bisect_left(self._values, val)
+        return index < len(self._values) and self._values[index] == val
+
+    def remove(self, val: int) -> None:
+        index = bisect_left(self._values, val)
+        if index == len(self._values) or self._values[index] != val:
+            raise ValueError(f"{val} is not contained in the list")
+        del self._values[index]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def depth_first_in_order_iterator(self) -> Iterator[int]:
+        return iter(self._values)
+
+
+STRUCTURES: dict[str, Callable[[], Any]] = {
+    "BinarySearchTree": BinarySearchTree,
+    "multiset": partial(BinarySearchTree, multiset=True),
+    "AVLBinarySearchTree": AVLBinarySearchTree,
+    "bisect": BisectList,
+}
+
+# Distributions that make long chains of nodes in each unbalanced structure.
+# Copies of the most common Zipf values are chained unless counted in a node
+CHAINS = {
+    "BinarySearchTree": {"sorted", "reverse", "zipf"},
+    "multiset": {"sorted", "reverse"},
+}
+
+# Structures where each add takes O(n), so that adding n values takes O(n^2)
+# in every distribution
+QUADRATIC_ADDS = {"bisect"}
+
+TRAVERSALS = (
+    "breadth_first_iterator",
+    "depth_first_pre_order_iterator",
+    "depth_first_in_order_iterator",
+    "depth_first_post_order_iterator",
+)
+
+
+def ns_per_op(run: Callable[[], int], repeat: int = 1) -> float:
+    """Best time per operation over the repetitions, run returning how many"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = run()
+        best = min(best, (time.perf_counter() - start) / ops)
+    return best * 1e9
+
+
+def measure(
+    structure_name: str,
+    distribution: str,
+    n: int,
+    n_queries: int,
+    repeat: int,
+    seed: int,
+    time_adds: bool = True,
+) -> dict[str, float]:
+    """Nanoseconds per operation for each operation the structure supports
+
+    Unless time_adds, the structure is built with add_many instead of adding
+    the values one by one, and adds are left out of the results.
+    """
+    rng = random.Random(seed)
+    values = DISTRIBUTIONS[distribution](n, rng)
+    # Half of the queries are values in the structure, the other half are odd
+    # numbers, which never are
+    queries = rng.choices(values, k=n_queries // 2)
+    queries += [2 * rng.randrange(n) + 1 for _ in range(n_queries - len(queries))]
+    rng.shuffle(queries)
+    removals = rng.sample(values, min(n, n_queries))
+    structure = STRUCTURES[structure_name]()
+    results: dict[str, float] = {}
+
+    def add() -> int:
+        for val in values:
+            structure.add(val)
+        return n
+
+    def contains() -> int:
+        for query in queries:
+            query in structure
+        return len(queries)
+
+    def length() -> int:
+        for _ in queries:
+            len(structure)
+        return len(queries)
+
+    def height() -> int:
+        for _ in queries:
+            structure.height
+        return len(queries)
+
+    def remove() -> int:
+        for val in removals:
+            structure.remove(val)
+        return len(removals)
+
+    def balance() -> int:
+        structure.balance()
+        return 1
+
+    def traverse(iterator: Callable[[], Iterator[int]]) -> int:
+        deque(iterator(), maxlen=0)
+        return n
+
+    if time_adds:
+        results["add"] = ns_per_op(add)
+    else:
+        structure.add_many(values)
+    results["contains"] = ns_per_op(contains, repeat)
+    results["len"] = ns_per_op(length, repeat)
+    if hasattr(structure, "height"):
+        results["height"] = ns_per_op(height, repeat)
+    for traversal in TRAVERSALS:
+        if hasattr(structure, traversal):
+            iterator = getattr(structure, traversal)
+            results[traversal] = ns_per_op(partial(traverse, iterator), repeat)
+    if hasattr(structure, "balance"):
+        results["balance"] = ns_per_op(balance)
+    results["remove"] = ns_per_op(remove)
+    return results
+
+
+def git_commit() -> str | None:
+    """Commit the benchmarked code is at, if run from a git checkout"""
+    try:
+        process = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout.strip()
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    threshold: float,
+) -> None:
+    """Print the operations more than threshold times slower than in baseline"""
+
+    def case(result: dict[str, Any]) -> tuple[Any, ...]:
+        return (
+            result["structure"],
+            result["distribution"],
+            result["size"],
+            result["operation"],
+        )
+
+    baseline_times = {case(result): result["ns_per_op"] for result in baseline}
+    print(f"\nSlower than the baseline by more than {threshold:.0%}:")
+    regressions = 0
+    for result in results:
+        before = baseline_times.get(case(result))
+        if before is None:
+            continue
+        ratio = result["ns_per_op"] / before
+        if ratio > 1 + threshold:
+            regressions += 1
+            print(" ".join(map(str, case(result))), f"{ratio:.2f}x")
+    if not regressions:
+        print("None")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10**3, 10**4, 10**5, 10**6, 10**7],
+    )
+    parser.add_argument(
+        "--distributions",
+        nargs="+",
+        choices=DISTRIBUTIONS,
+        default=list(DISTRIBUTIONS),
+    )
+    parser.add_argument(
+        "--structures",
+        nargs="+",
+        choices=STRUCTURES,
+        default=list(STRUCTURES),
+    )
+    parser.add_argument("--queries", type=int, default=10**4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-chain", type=int, default=10**4)
+    parser.add_argument("--output", default="results.json")
+    parser.add_argument("--compare", metavar="BASELINE")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    skipped: list[dict[str, Any]] = []
+    print(f"{'structure':<20} {'distribution':<11} {'size':>9} {'operation':<31} ns/op")
+    for n in args.sizes:
+        for distribution in args.distributions:
+            for structure in args.structures:
+                case = {"structure": structure, "distribution": distribution, "size": n}
+                if distribution in CHAINS.get(structure, ()) and n > args.max_chain:
+                    skipped.append({**case, "reason": "chain above --max-chain"})
+                    continue
+                time_adds = structure not in QUADRATIC_ADDS or n <= args.max_chain
+                if not time_adds:
+                    skipped.append(
+                        {
+                            **case,
+                            "operation": "add",
+                            "reason": "quadratic adds above --max-chain",
+                        }
+                    )
+                times = measure(
+                    structure,
+                    distribution,
+                    n,
+                    args.queries,
+                    args.repeat,
+                    args.seed,
+                    time_adds,
+                )
+                for operation, elapsed in times.items():
+                    results.append(
+                        {**case, "operation": operation, "ns_per_op": elapsed}
+                    )
+                    print(
+                        f"{structure:<20} {distribution:<11} {n:>9} {operation:<31}"
+                        f" {elapsed:.1f}"
+                    )
+
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "arguments": vars(args),
+        "results": results,
+        "skipped": skipped,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        compare(results, baseline["results"], args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Measure lookup throughput of a shared tree as reader threads are added
+
+Usage: python benchmarks/threads.py [--size N] [--threads 1 2 4 ...]
+
+Each thread runs lookups for a fixed time, while an optional writer thread
+adds and removes values. On builds with the GIL, readers take turns; on
+free-threaded builds they are expected to scale with the number of cores.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from playground.concurrent_tree import ConcurrentBinarySearchTree
+
+
+def lookups_per_second(
+    tree: ConcurrentBinarySearchTree[int],
+    n_threads: int,
+    seconds: float,
+    with_writer: bool,
+) -> float:
+    stop = threading.Event()
+    counts = [0] * n_threads
+    size = len(tree)
+
+    def read(index: int) -> None:
+        rng = random.Random(index)
+        count = 0
+        while not stop.is_set():
+            for _ in range(100):
+                rng.randrange(2 * size) in tree
+            count += 100
+        counts[index] = count
+
+    def write() -> None:
+        rng = random.Random(-1)
+        while not stop.is_set():
+            val = rng.randrange(2 * size)
+            tree.add(val)
+            tree.remove(val)
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(n_threads)]
+    if with_writer:
+        threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10**5)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    gil = "enabled" if getattr(sys, "_is_gil_enabled", lambda: True)() else "disabled"
+    print(f"Python {sys.version.split()[0]}, GIL {gil}")
+    tree = ConcurrentBinarySearchTree.from_sorted(range(0, 2 * args.size, 2))
+    print(f"{'threads':>8} {'lookups/s':>14} {'with writer':>14}")
+    for n_threads in args.threads:
+        read_only = lookups_per_second(tree, n_threads, args.seconds, False)
+        with_writer = lookups_per_second(tree, n_threads, args.seconds, True)
+        print(f"{n_threads:>8} {read_only:>14.0f} {with_writer:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
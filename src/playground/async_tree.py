@@ -0,0 +1,326 @@
+"""Binary Search Tree with asyncio counterparts of its slow operations"""
+
+import asyncio
+import heapq
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Sequence
+from operator import itemgetter
+from typing import Any, TypeVar
+
+from playground.tree import BaseBinarySearchTree, BinarySearchTree, BinaryTreeNode, T
+
+AsyncTreeT = TypeVar("AsyncTreeT", bound="AsyncBinarySearchTree[Any]")
+R = TypeVar("R")
+
+# Values an async iterator yields before letting other tasks run
+_YIELD_EVERY = 1000
+# Walks of the tree in the executor, each interrupted by a write, before the
+# event loop takes the snapshot itself
+_WALK_ATTEMPTS = 3
+# Builds in the executor, each outdated by a rebuild of the tree, before
+# aadd_many adds the values on the event loop
+_BUILD_ATTEMPTS = 3
+
+# A write to replay: count of writes after it, True for an add (with the key
+# of the value) and False for a removal (with whether all copies went), or
+# None for a rebuild or balance
+_LoggedWrite = tuple[int, bool | None, Any, Any]
+
+
+class AsyncBinarySearchTree(BinarySearchTree[T]):
+    """Binary search tree usable from asyncio code without blocking the loop
+
+    Async iterators let other tasks run every few values. Balancing, bulk
+    loads and set operations run in the default executor, while the event
+    loop goes on. They read a snapshot of the values, also taken in the
+    executor, which starts over if a write comes in the middle. Values added
+    or removed while abalance or aadd_many build the new tree are added or
+    removed again once it is built, so no write is lost and the work done in
+    the executor is kept.
+
+    >>> import asyncio
+    >>> async def main():
+    ...     tree = await AsyncBinarySearchTree.afrom_iterable([3, 1, 2])
+    ...     await tree.aadd_many([5, 4])
+    ...     await tree.abalance()
+    ...     return [val async for val in tree]
+    >>> asyncio.run(main())
+    [1, 2, 3, 4, 5]
+    """
+
+    def __init__(
+        self,
+        root: BinaryTreeNode[T] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Incremented before and after every write, so that it is odd while
+        # one is under way, and threads reading the tree can tell it changed
+        self._writes = 0
+        # Writes made while the executor builds new trees, to replay on them,
+        # or None when it builds none
+        self._write_log: list[_LoggedWrite] | None = None
+        self._builds = 0
+        super().__init__(root, **kwargs)
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self.adepth_first_in_order_iterator()
+
+    async def _cooperative(
+        self,
+        values: Iterator[T],
+        yield_every: int,
+    ) -> AsyncIterator[T]:
+        version = self._version
+        for count, val in enumerate(values, 1):
+            if self._version != version:
+                raise RuntimeError("BinarySearchTree changed during iteration")
+            yield val
+            if count % yield_every == 0:
+                await asyncio.sleep(0)
+
+    def abreadth_first_iterator(
+        self,
+        yield_every: int = _YIELD_EVERY,
+    ) -> AsyncIterator[T]:
+        """Iterate layer by layer, letting other tasks run every few values
+
+        >>> import asyncio
+        >>> tree = AsyncBinarySearchTree.from_sorted([1, 2, 3])
+        >>> async def main():
+        ...     return [val async for val in tree.abreadth_first_iterator()]
+        >>> asyncio.run(main())
+        [2, 1, 3]
+        """
+        return self._cooperative(self.breadth_first_iterator(), yield_every)
+
+    def adepth_first_pre_order_iterator(
+        self,
+        yield_every: int = _YIELD_EVERY,
+    ) -> AsyncIterator[T]:
+        """Iterate in value-left-right order, letting other tasks run"""
+        return self._cooperative(self.depth_first_pre_order_iterator(), yield_every)
+
+    def adepth_first_in_order_iterator(
+        self,
+        yield_every: int = _YIELD_EVERY,
+    ) -> AsyncIterator[T]:
+        """Iterate in left-value-right order (sort order), letting other tasks run"""
+        return self._cooperative(self.depth_first_in_order_iterator(), yield_every)
+
+    def adepth_first_post_order_iterator(
+        self,
+        yield_every: int = _YIELD_EVERY,
+    ) -> AsyncIterator[T]:
+        """Iterate in left-right-value order, letting other tasks run"""
+        return self._cooperative(self.depth_first_post_order_iterator(), yield_every)
+
+    @staticmethod
+    async def _in_executor(function: Callable[[], R]) -> R:
+        """Run a function in the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, function)
+
+    def _write(self, method: Callable[..., None], *args: Any) -> None:
+        self._writes += 1
+        try:
+            method(*args)
+        finally:
+            self._writes += 1
+
+    def _add(self, val: T, key: Any) -> None:
+        self._write(super()._add, val, key)
+        if self._write_log is not None:
+            self._write_log.append((self._writes, True, val, key))
+
+    def _remove(self, val: T, all_copies: bool) -> None:
+        self._write(super()._remove, val, all_copies)
+        if self._write_log is not None:
+            self._write_log.append((self._writes, False, val, all_copies))
+
+    def _replace_root(self, root: BinaryTreeNode[T] | None) -> None:
+        self._write(super()._replace_root, root)
+        if self._write_log is not None:
+            self._write_log.append((self._writes, None, None, None))
+
+    def _balance_in_place(self) -> None:
+        self._write(super()._balance_in_place)
+        if self._write_log is not None:
+            self._write_log.append((self._writes, None, None, None))
+
+    def _walk(self) -> tuple[int, list[T], list[Any]] | None:
+        """Count of writes, and values of the tree in order with their keys
+
+        Called from the executor, it gives up as soon as a write starts on the
+        event loop, as the nodes may be halfway through changing.
+        """
+        writes = self._writes
+        if writes % 2:
+            return None
+        ordered_elements = []
+        ordered_keys = []
+        for node in self._in_order_copies(self._root):
+            if self._writes != writes:
+                return None
+            ordered_elements.append(node.val)
+            ordered_keys.append(node.key)
+        if self._writes != writes:
+            return None
+        return writes, ordered_elements, ordered_keys
+
+    async def _snapshot_in_executor(self) -> tuple[int, Sequence[T], Sequence[Any]]:
+        """Count of writes, and values of the tree in order with their keys
+
+        Unless the values cached by the tree are up to date, the tree is
+        walked in the executor. Walks interrupted by writes are tried again a
+        few times, and then left to the event loop, where no write can be
+        under way.
+        """
+        if self._snapshot_version != self._version:
+            for _ in range(_WALK_ATTEMPTS):
+                snapshot = await self._in_executor(self._walk)
+                if snapshot is not None:
+                    return snapshot
+        return self._writes, self._sorted_snapshot(), self._sorted_keys_snapshot()
+
+    async def _replace_in_executor(
+        self,
+        new_values: Callable[
+            [Sequence[T], Sequence[Any]], tuple[Sequence[T], Sequence[Any]]
+        ],
+    ) -> bool:
+        """Replace the values of the tree, building it balanced in the executor
+
+        new_values gets a snapshot of the values in order and their keys, and
+        gives the new ones, also in order. Values added and removed while the
+        executor works are added and removed again on the new tree. Returns
+        False, leaving the tree alone, if it was rebuilt or balanced instead,
+        as that cannot be replayed.
+        """
+        if self._write_log is None:
+            self._write_log = []
+        self._builds += 1
+        try:
+            writes, ordered_elements, ordered_keys = await self._snapshot_in_executor()
+
+            def build() -> BinaryTreeNode[T] | None:
+                elements, keys = new_values(ordered_elements, ordered_keys)
+                return self._ordered_list_to_balanced_tree(
+                    ordered_elements=elements,
+                    start_index=0,
+                    end_index=len(elements) - 1,
+                    ordered_keys=keys,
+                )
+
+            root = await self._in_executor(build)
+            missed = [write for write in self._write_log if write[0] > writes]
+            if any(added is None for _, added, _, _ in missed):
+                return False
+            self._replace_root(root)
+            for _, added, val, argument in missed:
+                if added:
+                    self._add(val, argument)
+                else:
+                    self._remove(val, argument)
+            return True
+        finally:
+            self._builds -= 1
+            if not self._builds:
+                self._write_log = None
+
+    @classmethod
+    async def afrom_sorted(
+        cls: type[AsyncTreeT],
+        values: Iterable[T],
+        *,
+        validate: bool = True,
+        **kwargs: Any,
+    ) -> AsyncTreeT:
+        """Build a balanced tree from sorted values in the default executor"""
+        return await cls._in_executor(
+            lambda: cls.from_sorted(values, validate=validate, **kwargs)
+        )
+
+    @classmethod
+    async def afrom_iterable(
+        cls: type[AsyncTreeT],
+        values: Iterable[T],
+        **kwargs: Any,
+    ) -> AsyncTreeT:
+        """Build a balanced tree from values in any order in the default executor"""
+        return await cls._in_executor(lambda: cls.from_iterable(values, **kwargs))
+
+    async def abalance(self) -> None:
+        """Balance the tree, rebuilding it in the default executor
+
+        If the tree is rebuilt or balanced in the meantime, it is left as is.
+        """
+        await self._replace_in_executor(lambda elements, keys: (elements, keys))
+
+    async def aadd_many(self, values: Iterable[T]) -> None:
+        """Add several values, merging them with the tree in the default executor"""
+        adds = tuple(values)
+
+        def merged(
+            ordered_elements: Sequence[T],
+            ordered_keys: Sequence[Any],
+        ) -> tuple[list[T], list[Any]]:
+            add_elements, add_keys = self._sorted_with_keys(adds)
+            merged_elements = []
+            merged_keys = []
+            # Copies already in the tree go before the ones added, as in add
+            for key, val in heapq.merge(
+                zip(ordered_keys, ordered_elements),
+                zip(add_keys, add_elements),
+                key=itemgetter(0),
+            ):
+                merged_elements.append(val)
+                merged_keys.append(key)
+            return merged_elements, merged_keys
+
+        for _ in range(_BUILD_ATTEMPTS):
+            if await self._replace_in_executor(merged):
+                return
+        # The tree kept being rebuilt while the executor merged the values
+        self.add_many(adds)
+
+    async def _combined_in_executor(
+        self: AsyncTreeT,
+        other: Iterable[T],
+        operation: str,
+    ) -> AsyncTreeT:
+        """Combine snapshots of the tree and other with the named set operation
+
+        Other async trees are walked in the executor too, while other trees
+        are read on the event loop, from their cached values if up to date.
+        """
+        _, ordered_elements, ordered_keys = await self._snapshot_in_executor()
+        if isinstance(other, AsyncBinarySearchTree):
+            _, other, _ = await other._snapshot_in_executor()
+        elif isinstance(other, BaseBinarySearchTree):
+            # Their values in order, each copy repeated, combine the same way
+            other = other._sorted_snapshot()
+
+        def combined() -> AsyncTreeT:
+            tree = type(self)(**self._constructor_kwargs())
+            tree._rebuild(ordered_elements, ordered_keys)
+            combined_tree: AsyncTreeT = getattr(tree, operation)(other)
+            return combined_tree
+
+        return await self._in_executor(combined)
+
+    async def aunion(self: AsyncTreeT, other: Iterable[T]) -> AsyncTreeT:
+        """New tree with the union of this tree and other. See union"""
+        return await self._combined_in_executor(other, "union")
+
+    async def aintersection(self: AsyncTreeT, other: Iterable[T]) -> AsyncTreeT:
+        """New tree with the intersection of this tree and other"""
+        return await self._combined_in_executor(other, "intersection")
+
+    async def adifference(self: AsyncTreeT, other: Iterable[T]) -> AsyncTreeT:
+        """New tree with the difference of this tree and other"""
+        return await self._combined_in_executor(other, "difference")
+
+    async def asymmetric_difference(
+        self: AsyncTreeT,
+        other: Iterable[T],
+    ) -> AsyncTreeT:
+        """New tree with the symmetric difference of this tree and other"""
+        return await self._combined_in_executor(other, "symmetric_difference")
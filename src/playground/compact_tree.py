@@ -0,0 +1,634 @@
+"""Binary Search Tree of numbers stored in parallel arrays"""
+
+import math
+from array import array
+from collections import deque
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from itertools import islice
+from typing import Any, Generic, TypeVar
+
+NumberT = TypeVar("NumberT", int, float)
+CompactTreeT = TypeVar("CompactTreeT", bound="CompactBinarySearchTree[Any]")
+
+# Index of a missing child
+_NIL = -1
+# Children, heights and sizes are stored as 4-byte integers
+_INDEX_TYPECODE = "i"
+
+
+class CompactBinarySearchTree(Generic[NumberT], Collection[NumberT]):
+    """Binary search tree of numbers, without one object per node
+
+    It offers the same updates, traversals, lookups and order statistics as
+    BinarySearchTree, but a node is an index into typed arrays holding its
+    value, children, height and size. Values take the size given by the
+    array typecode ("q" for 8-byte integers and "d" for 8-byte floats), and
+    every node takes 16 more bytes. Key functions, multisets, batches and set
+    operations are only offered by BinarySearchTree.
+
+    >>> tree = CompactBinarySearchTree()
+    >>> tree.add(1)
+    >>> tree.add(3)
+    >>> tree.add(2)
+    >>> tuple(tree)
+    (1, 2, 3)
+    >>> 2 in tree
+    True
+    >>> tree.remove(2)
+    >>> tuple(tree)
+    (1, 3)
+
+    Floats can be stored with the "d" typecode:
+
+    >>> tree = CompactBinarySearchTree.from_iterable([2.5, 0.5], typecode="d")
+    >>> tuple(tree)
+    (0.5, 2.5)
+    """
+
+    def __init__(self, typecode: str = "q") -> None:
+        self._values: array[NumberT] = array(typecode)  # type: ignore[assignment]
+        self._left = array(_INDEX_TYPECODE)
+        self._right = array(_INDEX_TYPECODE)
+        self._heights = array(_INDEX_TYPECODE)
+        self._sizes = array(_INDEX_TYPECODE)
+        self._root = _NIL
+        # Removed nodes are linked through their left child to be reused
+        self._free = _NIL
+
+    @classmethod
+    def from_sorted(
+        cls: type[CompactTreeT],
+        values: Iterable[NumberT],
+        *,
+        typecode: str = "q",
+        validate: bool = True,
+    ) -> CompactTreeT:
+        """Build a balanced tree from sorted values in O(n)
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3, 4, 5, 6, 7])
+        >>> tuple(tree.breadth_first_iterator())
+        (4, 2, 6, 1, 3, 5, 7)
+        >>> CompactBinarySearchTree.from_sorted([1, 3, 2])
+        Traceback (most recent call last):
+            ...
+        ValueError: Unsorted values: 2 cannot come after 3
+        """
+        tree = cls(typecode)
+        tree._build(array(typecode, values), validate=validate)
+        return tree
+
+    @classmethod
+    def from_iterable(
+        cls: type[CompactTreeT],
+        values: Iterable[NumberT],
+        *,
+        typecode: str = "q",
+    ) -> CompactTreeT:
+        """Build a balanced tree from values in any order in O(n log n)
+
+        >>> tuple(CompactBinarySearchTree.from_iterable([3, 1, 2, 1]))
+        (1, 1, 2, 3)
+        """
+        return cls.from_sorted(sorted(values), typecode=typecode, validate=False)
+
+    def _build(self, ordered_values: Sequence[NumberT], validate: bool) -> None:
+        """Replace the tree by a balanced one holding the given values
+
+        The node of each value is its index, so values are stored in order
+        and the tree shape is the same BinarySearchTree.balance gives.
+        """
+        if validate:
+            following = islice(ordered_values, 1, None)
+            for previous, current in zip(ordered_values, following):
+                if current < previous:
+                    raise ValueError(
+                        f"Unsorted values: {current} cannot come after {previous}"
+                    )
+        n = len(ordered_values)
+        self._values = array(self._values.typecode, ordered_values)
+        self._left = array(_INDEX_TYPECODE, [_NIL]) * n
+        self._right = array(_INDEX_TYPECODE, [_NIL]) * n
+        self._heights = array(_INDEX_TYPECODE, [1]) * n
+        self._sizes = array(_INDEX_TYPECODE, [1]) * n
+        self._free = _NIL
+        self._root = self._build_range(0, n - 1)
+
+    def _build_range(self, start_index: int, end_index: int) -> int:
+        # Each range is visited twice: first to schedule building its left and
+        # right subtrees, and then to join them under the middle element
+        ranges = [(start_index, end_index, False)]
+        subtrees: list[int] = []
+        while ranges:
+            start, end, children_built = ranges.pop()
+            if start > end:
+                subtrees.append(_NIL)
+                continue
+            middle = start + (end - start) // 2
+            if children_built:
+                self._right[middle] = subtrees.pop()
+                self._left[middle] = subtrees.pop()
+                self._update(middle)
+                subtrees.append(middle)
+            else:
+                ranges.append((start, end, True))
+                ranges.append((middle + 1, end, False))
+                ranges.append((start, middle - 1, False))
+        return subtrees.pop()
+
+    def _height(self, node: int) -> int:
+        return self._heights[node] if node != _NIL else 0
+
+    def _size(self, node: int) -> int:
+        return self._sizes[node] if node != _NIL else 0
+
+    def _update(self, node: int) -> None:
+        left, right = self._left[node], self._right[node]
+        self._heights[node] = 1 + max(self._height(left), self._height(right))
+        self._sizes[node] = 1 + self._size(left) + self._size(right)
+
+    def __contains__(self, x: object) -> bool:
+        if not isinstance(x, (int, float)):
+            return False
+        values, left, right = self._values, self._left, self._right
+        node = self._root
+        while node != _NIL:
+            val = values[node]
+            if x == val:
+                return True
+            node = left[node] if x < val else right[node]
+        return False
+
+    def __iter__(self) -> Iterator[NumberT]:
+        return self.depth_first_in_order_iterator()
+
+    def __len__(self) -> int:
+        return self._size(self._root)
+
+    def breadth_first_iterator(self) -> Iterator[NumberT]:
+        """Iterate through all tree elements, layer by layer
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tuple(tree.breadth_first_iterator())
+        (2, 1, 3)
+        """
+        q: deque[int] = deque()
+        if self._root != _NIL:
+            q.append(self._root)
+        while q:
+            node = q.popleft()
+            yield self._values[node]
+            if self._left[node] != _NIL:
+                q.append(self._left[node])
+            if self._right[node] != _NIL:
+                q.append(self._right[node])
+
+    def depth_first_pre_order_iterator(self) -> Iterator[NumberT]:
+        """Iterate through all tree elements, in value-left-right order
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tuple(tree.depth_first_pre_order_iterator())
+        (2, 1, 3)
+        """
+        stack = [self._root] if self._root != _NIL else []
+        while stack:
+            node = stack.pop()
+            yield self._values[node]
+            if self._right[node] != _NIL:
+                stack.append(self._right[node])
+            if self._left[node] != _NIL:
+                stack.append(self._left[node])
+
+    def depth_first_in_order_iterator(self) -> Iterator[NumberT]:
+        """Iterate through all tree elements, in left-value-right order (sort order)
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tuple(tree.depth_first_in_order_iterator())
+        (1, 2, 3)
+        """
+        stack: list[int] = []
+        node = self._root
+        while stack or node != _NIL:
+            while node != _NIL:
+                stack.append(node)
+                node = self._left[node]
+            node = stack.pop()
+            yield self._values[node]
+            node = self._right[node]
+
+    def depth_first_post_order_iterator(self) -> Iterator[NumberT]:
+        """Iterate through all tree elements, in left-right-value order
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tuple(tree.depth_first_post_order_iterator())
+        (1, 3, 2)
+        """
+        stack: list[int] = []
+        node = self._root
+        last_yielded = _NIL
+        while stack or node != _NIL:
+            while node != _NIL:
+                stack.append(node)
+                node = self._left[node]
+            parent = stack[-1]
+            right = self._right[parent]
+            if right != _NIL and right != last_yielded:
+                node = right
+                continue
+            stack.pop()
+            yield self._values[parent]
+            last_yielded = parent
+
+    @property
+    def height(self) -> int:
+        """1-based height of the tree
+
+        >>> CompactBinarySearchTree.from_sorted([1, 2, 3]).height
+        2
+        """
+        return self._height(self._root)
+
+    def select(self, k: int) -> NumberT:
+        """k-th smallest value of the tree (0-based). Negative indexes are allowed
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tree.select(0)
+        1
+        >>> tree.select(-1)
+        3
+        >>> tree.select(3)
+        Traceback (most recent call last):
+            ...
+        IndexError: 3 is out of the tree range
+        """
+        index = k + len(self) if k < 0 else k
+        if not 0 <= index < len(self):
+            raise IndexError(f"{k} is out of the tree range")
+        node = self._root
+        while True:
+            left_size = self._size(self._left[node])
+            if index < left_size:
+                node = self._left[node]
+            elif index == left_size:
+                return self._values[node]
+            else:
+                index -= left_size + 1
+                node = self._right[node]
+
+    def rank(self, x: NumberT) -> int:
+        """Number of values of the tree strictly smaller than x
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tree.rank(1)
+        0
+        >>> tree.rank(10)
+        3
+        """
+        return self._count_lower(x, inclusive=False)
+
+    def _count_lower(self, x: NumberT, inclusive: bool) -> int:
+        values, left, right = self._values, self._left, self._right
+        count = 0
+        node = self._root
+        while node != _NIL:
+            if values[node] < x or (inclusive and values[node] == x):
+                count += self._size(left[node]) + 1
+                node = right[node]
+            else:
+                node = left[node]
+        return count
+
+    def count_range(self, lo: NumberT, hi: NumberT) -> int:
+        """Number of values of the tree between lo and hi, both inclusive
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2, 3, 3])
+        >>> tree.count_range(2, 3)
+        3
+        >>> tree.count_range(3, 2)
+        0
+        """
+        return max(0, self._count_lower(hi, inclusive=True) - self.rank(lo))
+
+    def count(self, x: NumberT) -> int:
+        """Number of copies of x in the tree, in O(height)
+
+        >>> CompactBinarySearchTree.from_sorted([1, 2, 2, 3]).count(2)
+        2
+        """
+        return self.count_range(x, x)
+
+    def percentile(self, p: float) -> NumberT:
+        """Smallest value with at least p percent of the values less or equal to it
+
+        >>> tree = CompactBinarySearchTree.from_sorted(range(1, 11))
+        >>> tree.percentile(50)
+        5
+        >>> tree.percentile(101)
+        Traceback (most recent call last):
+            ...
+        ValueError: 101 is not a percentage between 0 and 100
+        """
+        if not 0 <= p <= 100:
+            raise ValueError(f"{p} is not a percentage between 0 and 100")
+        return self.select(max(0, math.ceil(p * len(self) / 100) - 1))
+
+    def irange(
+        self,
+        lo: NumberT | None = None,
+        hi: NumberT | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[NumberT]:
+        """Iterate in order through the values between lo and hi
+
+        Subtrees out of the bounds are never visited, so it costs O(height + k)
+        to get k values. A missing bound means the range is not bounded there.
+
+        >>> tree = CompactBinarySearchTree.from_sorted(range(10))
+        >>> tuple(tree.irange(3, 6))
+        (3, 4, 5, 6)
+        >>> tuple(tree.irange(3, 6, inclusive=(False, False)))
+        (4, 5)
+        >>> tuple(tree.irange(hi=2, reverse=True))
+        (2, 1, 0)
+        """
+        include_lo, include_hi = inclusive
+
+        def above_lo(val: NumberT) -> bool:
+            return lo is None or val > lo or (include_lo and val == lo)
+
+        def below_hi(val: NumberT) -> bool:
+            return hi is None or val < hi or (include_hi and val == hi)
+
+        # Same walk as BinarySearchTree.irange, following child indexes
+        first_in_range, last_in_range = above_lo, below_hi
+        towards_start, towards_end = self._left, self._right
+        if reverse:
+            first_in_range, last_in_range = below_hi, above_lo
+            towards_start, towards_end = self._right, self._left
+        values = self._values
+        stack: list[int] = []
+        node = self._root
+        while True:
+            while node != _NIL:
+                if first_in_range(values[node]):
+                    stack.append(node)
+                    node = towards_start[node]
+                else:
+                    node = towards_end[node]
+            if not stack:
+                return
+            node = stack.pop()
+            if not last_in_range(values[node]):
+                return
+            yield values[node]
+            node = towards_end[node]
+
+    def iter_from(
+        self,
+        key: NumberT,
+        reverse: bool = False,
+        inclusive: bool = True,
+    ) -> Iterator[NumberT]:
+        """Iterate in order from key, to resume a previous iteration
+
+        >>> tree = CompactBinarySearchTree.from_sorted(range(10))
+        >>> tuple(tree.iter_from(7, inclusive=False))
+        (8, 9)
+        >>> tuple(tree.iter_from(2, reverse=True))
+        (2, 1, 0)
+        """
+        if reverse:
+            return self.irange(hi=key, inclusive=(True, inclusive), reverse=True)
+        return self.irange(lo=key, inclusive=(inclusive, True))
+
+    def __reversed__(self) -> Iterator[NumberT]:
+        """Iterate in descending order
+
+        >>> tuple(reversed(CompactBinarySearchTree.from_sorted([1, 2, 3])))
+        (3, 2, 1)
+        """
+        return self.irange(reverse=True)
+
+    def min(self) -> NumberT:
+        """Smallest value of the tree
+
+        >>> CompactBinarySearchTree.from_sorted([1, 2, 3]).min()
+        1
+        >>> CompactBinarySearchTree().min()
+        Traceback (most recent call last):
+            ...
+        ValueError: The tree is empty
+        """
+        return self._values[self._extreme(self._left)]
+
+    def max(self) -> NumberT:
+        """Largest value of the tree
+
+        >>> CompactBinarySearchTree.from_sorted([1, 2, 3]).max()
+        3
+        """
+        return self._values[self._extreme(self._right)]
+
+    def _extreme(self, children: "array[int]") -> int:
+        """Last node reached following the given children from the root"""
+        node = self._root
+        if node == _NIL:
+            raise ValueError("The tree is empty")
+        while children[node] != _NIL:
+            node = children[node]
+        return node
+
+    def floor(self, x: NumberT) -> NumberT:
+        """Largest value of the tree smaller than or equal to x
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.floor(4)
+        3
+        >>> tree.floor(0)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is smaller than or equal to 0
+        """
+        node = self._closest(x, below=True, inclusive=True)
+        if node == _NIL:
+            raise ValueError(f"No value in the tree is smaller than or equal to {x}")
+        return self._values[node]
+
+    def ceiling(self, x: NumberT) -> NumberT:
+        """Smallest value of the tree greater than or equal to x
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.ceiling(4)
+        5
+        >>> tree.ceiling(6)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than or equal to 6
+        """
+        node = self._closest(x, below=False, inclusive=True)
+        if node == _NIL:
+            raise ValueError(f"No value in the tree is greater than or equal to {x}")
+        return self._values[node]
+
+    def predecessor(self, x: NumberT) -> NumberT:
+        """Largest value of the tree strictly smaller than x
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.predecessor(3)
+        1
+        >>> tree.predecessor(1)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is smaller than 1
+        """
+        node = self._closest(x, below=True, inclusive=False)
+        if node == _NIL:
+            raise ValueError(f"No value in the tree is smaller than {x}")
+        return self._values[node]
+
+    def successor(self, x: NumberT) -> NumberT:
+        """Smallest value of the tree strictly greater than x
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.successor(3)
+        5
+        >>> tree.successor(5)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than 5
+        """
+        node = self._closest(x, below=False, inclusive=False)
+        if node == _NIL:
+            raise ValueError(f"No value in the tree is greater than {x}")
+        return self._values[node]
+
+    def _closest(self, x: NumberT, *, below: bool, inclusive: bool) -> int:
+        values, left, right = self._values, self._left, self._right
+        closest = _NIL
+        node = self._root
+        while node != _NIL:
+            val = values[node]
+            if inclusive and val == x:
+                return node
+            if below and val < x:
+                closest = node
+                node = right[node]
+            elif not below and val > x:
+                closest = node
+                node = left[node]
+            else:
+                node = left[node] if below else right[node]
+        return closest
+
+    def add(self, val: NumberT) -> None:
+        """Add a value to the tree. Duplicates are allowed
+
+        >>> tree = CompactBinarySearchTree()
+        >>> tree.add(1)
+        >>> tree.add(1)
+        >>> tuple(tree)
+        (1, 1)
+        """
+        node = self._allocate(val)
+        if self._root == _NIL:
+            self._root = node
+            return
+        path = []
+        parent = self._root
+        while parent != _NIL:
+            path.append(parent)
+            self._sizes[parent] += 1
+            parent = (
+                self._left[parent]
+                if self._values[parent] > val
+                else self._right[parent]
+            )
+        if self._values[path[-1]] > val:
+            self._left[path[-1]] = node
+        else:
+            self._right[path[-1]] = node
+        self._update_heights(path)
+
+    def _allocate(self, val: NumberT) -> int:
+        node = self._free
+        if node == _NIL:
+            self._values.append(val)
+            self._left.append(_NIL)
+            self._right.append(_NIL)
+            self._heights.append(1)
+            self._sizes.append(1)
+            return len(self._values) - 1
+        self._free = self._left[node]
+        self._values[node] = val
+        self._left[node] = _NIL
+        self._right[node] = _NIL
+        self._heights[node] = 1
+        self._sizes[node] = 1
+        return node
+
+    def remove(self, val: NumberT) -> None:
+        """Remove a value from the tree. Raises a ValueError if not present
+
+        >>> tree = CompactBinarySearchTree.from_sorted([1, 2])
+        >>> tree.remove(1)
+        >>> tuple(tree)
+        (2,)
+        >>> tree.remove(3)
+        Traceback (most recent call last):
+            ...
+        ValueError: 3 is not contained in the tree
+        """
+        values, left, right = self._values, self._left, self._right
+        path = []
+        node = self._root
+        while node != _NIL and values[node] != val:
+            path.append(node)
+            node = left[node] if values[node] > val else right[node]
+        if node == _NIL:
+            raise ValueError(f"{val} is not contained in the tree")
+
+        if left[node] != _NIL and right[node] != _NIL:
+            # Take the value of the in-order successor, and unlink that
+            # successor instead, as it has no left child
+            path.append(node)
+            successor = right[node]
+            while left[successor] != _NIL:
+                path.append(successor)
+                successor = left[successor]
+            values[node] = values[successor]
+            node = successor
+
+        child = left[node] if left[node] != _NIL else right[node]
+        left[node] = self._free
+        self._free = node
+        if not path:
+            self._root = child
+            return
+        for ancestor in path:
+            self._sizes[ancestor] -= 1
+        if left[path[-1]] == node:
+            left[path[-1]] = child
+        else:
+            right[path[-1]] = child
+        self._update_heights(path)
+
+    def _update_heights(self, path: list[int]) -> None:
+        for node in reversed(path):
+            previous_height = self._heights[node]
+            self._update(node)
+            if self._heights[node] == previous_height:
+                return
+
+    def balance(self) -> None:
+        """Balances this tree to have minimum height, releasing unused memory
+
+        >>> tree = CompactBinarySearchTree()
+        >>> for i in range(1, 4):
+        ...     tree.add(i)
+        >>> tree.height
+        3
+        >>> tree.balance()
+        >>> tree.height
+        2
+        """
+        self._build(array(self._values.typecode, self), validate=False)
@@ -0,0 +1,353 @@
+"""Thread-safe Binary Search Tree guarded by a reader-writer lock"""
+
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from functools import wraps
+from itertools import islice
+from typing import Any, Generic, ParamSpec, TypeVar
+
+from playground.tree import BinarySearchTree, BinaryTreeNode, T
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Values an iterator takes from the tree each time it holds the lock
+_ITERATION_CHUNK_SIZE = 64
+
+
+class ReadWriteLock:
+    """Lock held by either any number of readers or a single writer
+
+    Readers only hold the internal mutex while updating the counters, so they
+    run in parallel on free-threaded Python builds. Writers are preferred:
+    once one is waiting, new readers wait as well, so a steady stream of
+    readers cannot starve it.
+
+    A thread holding the lock may take it again, and a writer may read, but
+    a reader cannot start writing, as two readers doing so would deadlock.
+
+    >>> lock = ReadWriteLock()
+    >>> with lock.write():
+    ...     with lock.read():
+    ...         pass
+    >>> with lock.read():
+    ...     with lock.write():
+    ...         pass
+    Traceback (most recent call last):
+        ...
+    RuntimeError: A reader cannot take the lock for writing
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer: int | None = None
+        self._writer_depth = 0
+        # Number of times each thread holds the lock for reading
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        if self._writer == threading.get_ident():
+            self._writer_depth += 1
+            return
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            with self._condition:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+
+    def release_read(self) -> None:
+        if self._writer == threading.get_ident():
+            self._writer_depth -= 1
+            return
+        self._local.depth -= 1
+        if not self._local.depth:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        thread = threading.get_ident()
+        if self._writer == thread:
+            self._writer_depth += 1
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("A reader cannot take the lock for writing")
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = thread
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        self._writer_depth -= 1
+        if not self._writer_depth:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock for reading within a with block"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock for writing within a with block"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _reading(method: Callable[P, R]) -> Callable[P, R]:
+    @wraps(method)
+    def locked(*args: P.args, **kwargs: P.kwargs) -> R:
+        lock = args[0]._lock  # type: ignore[attr-defined]
+        lock.acquire_read()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            lock.release_read()
+
+    return locked
+
+
+def _writing(method: Callable[P, R]) -> Callable[P, R]:
+    @wraps(method)
+    def locked(*args: P.args, **kwargs: P.kwargs) -> R:
+        lock = args[0]._lock  # type: ignore[attr-defined]
+        lock.acquire_write()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            lock.release_write()
+
+    return locked
+
+
+def _fail_fast(method: Callable[P, Iterator[R]]) -> Callable[P, Iterator[R]]:
+    """Iterate while holding the lock only to take each chunk of values
+
+    The iteration raises a RuntimeError if the tree changes in between, as
+    the values would otherwise be skipped or repeated.
+    """
+
+    @wraps(method)
+    def iterate(*args: P.args, **kwargs: P.kwargs) -> Iterator[R]:
+        tree: ConcurrentBinarySearchTree[Any] = args[0]  # type: ignore[assignment]
+        with tree._lock.read():
+            version = tree._version
+            values = method(*args, **kwargs)
+        while True:
+            with tree._lock.read():
+                if tree._version != version:
+                    raise RuntimeError("BinarySearchTree changed during iteration")
+                chunk = list(islice(values, _ITERATION_CHUNK_SIZE))
+            for val in chunk:
+                # Reading the version without the lock is enough to notice
+                # changes made since the chunk was taken
+                if tree._version != version:
+                    raise RuntimeError("BinarySearchTree changed during iteration")
+                yield val
+            if len(chunk) < _ITERATION_CHUNK_SIZE:
+                return
+
+    return iterate
+
+
+class _Snapshot(Generic[T]):
+    """Values of a concurrent tree in order, and their keys
+
+    They are taken while holding the lock of the tree, and copied out of its
+    nodes, as removing values may move others between nodes.
+    """
+
+    def __init__(self, tree: "ConcurrentBinarySearchTree[T]") -> None:
+        with tree._lock.read():
+            self.key = tree._key
+            nodes = list(tree._in_order_copies(tree._root))
+            self.values = [node.val for node in nodes]
+            self.keys = [node.key for node in nodes]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.values)
+
+
+def _snapshotting(method: Callable[P, R]) -> Callable[P, R]:
+    """Combine the tree with a snapshot of the other operand, if concurrent
+
+    The snapshot is taken before locking the tree, so that no thread holds
+    the locks of both trees, which could deadlock with another thread
+    combining them the other way around.
+    """
+
+    @wraps(method)
+    def combine(*args: P.args, **kwargs: P.kwargs) -> R:
+        if len(args) == 2 and not kwargs:
+            tree, other = args
+            if isinstance(other, ConcurrentBinarySearchTree) and other is not tree:
+                snapshot = _Snapshot(other)
+                return method(tree, snapshot)  # type: ignore[arg-type, call-arg]
+        return method(*args, **kwargs)
+
+    return combine
+
+
+class ConcurrentBinarySearchTree(BinarySearchTree[T]):
+    """Binary search tree that can be shared by several threads
+
+    Every operation holds a reader-writer lock, so lookups run in parallel
+    while adds and removes run alone. Iterators only hold the lock while
+    taking each chunk of values, so that a slow consumer does not block
+    writers, and raise a RuntimeError if the tree changes while iterating.
+
+    >>> tree = ConcurrentBinarySearchTree.from_sorted([1, 2, 3])
+    >>> values = iter(tree)
+    >>> next(values)
+    1
+    >>> tree.add(4)
+    >>> next(values)
+    Traceback (most recent call last):
+        ...
+    RuntimeError: BinarySearchTree changed during iteration
+
+    Several operations can be done atomically by holding the lock:
+
+    >>> with tree.lock.write():
+    ...     if 4 in tree:
+    ...         tree.remove(4)
+    >>> tuple(tree)
+    (1, 2, 3)
+
+    Set operations with another concurrent tree read a snapshot of its
+    values, taken while holding its lock.
+    """
+
+    def __init__(
+        self,
+        root: BinaryTreeNode[T] | None = None,
+        *,
+        key: Callable[[T], Any] | None = None,
+        multiset: bool = False,
+    ) -> None:
+        self._lock = ReadWriteLock()
+        super().__init__(root, key=key, multiset=multiset)
+
+    @property
+    def lock(self) -> ReadWriteLock:
+        """Lock guarding the tree, to group several operations"""
+        return self._lock
+
+    def _nodes_of(self, other: Iterable[T]) -> Iterable[BinaryTreeNode[T]]:
+        if isinstance(other, _Snapshot) and other.key is self._key:
+            return (
+                BinaryTreeNode(val, key=key)
+                for val, key in zip(other.values, other.keys)
+            )
+        return super()._nodes_of(other)
+
+    def __contains__(self, x: object) -> bool:
+        with self._lock.read():
+            return super().__contains__(x)
+
+    def __len__(self) -> int:
+        with self._lock.read():
+            return super().__len__()
+
+    __reduce__ = _reading(BinarySearchTree.__reduce__)
+    __copy__ = _reading(BinarySearchTree.__copy__)
+    __deepcopy__ = _reading(BinarySearchTree.__deepcopy__)
+    freeze = _reading(BinarySearchTree.freeze)
+    share = _reading(BinarySearchTree.share)
+    dump = _reading(BinarySearchTree.dump)
+
+    breadth_first_iterator = _fail_fast(BinarySearchTree.breadth_first_iterator)
+    depth_first_pre_order_iterator = _fail_fast(
+        BinarySearchTree.depth_first_pre_order_iterator
+    )
+    depth_first_in_order_iterator = _fail_fast(
+        BinarySearchTree.depth_first_in_order_iterator
+    )
+    depth_first_post_order_iterator = _fail_fast(
+        BinarySearchTree.depth_first_post_order_iterator
+    )
+    irange = _fail_fast(BinarySearchTree.irange)
+
+    # Built on the unwrapped irange, so that each value goes through a single
+    # fail-fast iterator, taking the lock once per chunk
+
+    @_fail_fast
+    def iter_from(
+        self,
+        key: T,
+        reverse: bool = False,
+        inclusive: bool = True,
+    ) -> Iterator[T]:
+        """Iterate in order from key, to resume a previous iteration"""
+        if reverse:
+            return BinarySearchTree.irange(
+                self, hi=key, inclusive=(True, inclusive), reverse=True
+            )
+        return BinarySearchTree.irange(self, lo=key, inclusive=(inclusive, True))
+
+    @_fail_fast
+    def __reversed__(self) -> Iterator[T]:
+        """Iterate in descending order"""
+        return BinarySearchTree.irange(self, reverse=True)
+
+    iter_chunks = _fail_fast(BinarySearchTree.iter_chunks)
+    distinct = _fail_fast(BinarySearchTree.distinct)
+
+    @property
+    def height(self) -> int:
+        with self._lock.read():
+            return super().height
+
+    shape_report = _reading(BinarySearchTree.shape_report)
+    select = _reading(BinarySearchTree.select)
+    rank = _reading(BinarySearchTree.rank)
+    count_range = _reading(BinarySearchTree.count_range)
+    count = _reading(BinarySearchTree.count)
+    percentile = _reading(BinarySearchTree.percentile)
+    min = _reading(BinarySearchTree.min)
+    max = _reading(BinarySearchTree.max)
+    floor = _reading(BinarySearchTree.floor)
+    ceiling = _reading(BinarySearchTree.ceiling)
+    predecessor = _reading(BinarySearchTree.predecessor)
+    successor = _reading(BinarySearchTree.successor)
+    contains_many = _reading(BinarySearchTree.contains_many)
+    floor_many = _reading(BinarySearchTree.floor_many)
+    ceiling_many = _reading(BinarySearchTree.ceiling_many)
+    union = _snapshotting(_reading(BinarySearchTree.union))
+    intersection = _snapshotting(_reading(BinarySearchTree.intersection))
+    difference = _snapshotting(_reading(BinarySearchTree.difference))
+    symmetric_difference = _snapshotting(
+        _reading(BinarySearchTree.symmetric_difference)
+    )
+
+    add = _writing(BinarySearchTree.add)
+    remove = _writing(BinarySearchTree.remove)
+    remove_all = _writing(BinarySearchTree.remove_all)
+    add_many = _writing(BinarySearchTree.add_many)
+    remove_many = _writing(BinarySearchTree.remove_many)
+    apply_batch = _writing(BinarySearchTree.apply_batch)
+    update = _snapshotting(_writing(BinarySearchTree.update))
+    intersection_update = _snapshotting(_writing(BinarySearchTree.intersection_update))
+    difference_update = _snapshotting(_writing(BinarySearchTree.difference_update))
+    symmetric_difference_update = _snapshotting(
+        _writing(BinarySearchTree.symmetric_difference_update)
+    )
+    balance = _writing(BinarySearchTree.balance)
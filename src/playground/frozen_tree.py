@@ -0,0 +1,463 @@
+"""Read-only Binary Search Tree stored in Eytzinger (breadth-first) order"""
+
+from array import array
+from collections.abc import Collection, Iterable, Iterator, MutableSequence, Sequence
+from itertools import islice
+from typing import Any, Generic, TypeVar
+
+from playground.tree import T, _dump_typecode
+
+FrozenTreeT = TypeVar("FrozenTreeT", bound="FrozenBinarySearchTree[Any]")
+
+
+class FrozenBinarySearchTree(Generic[T], Collection[T]):
+    """Complete binary search tree whose values are laid out in a flat array
+
+    The node at index k has its children at 2k + 1 and 2k + 2, so the values
+    are stored in breadth-first order, and a search walks down a single
+    contiguous array instead of following references between node objects.
+    Ints fitting in 64 bits and floats are stored unboxed in an array.array.
+
+    Searches compute the next index from the result of the comparison, and
+    recover the answer from the bits of the final index, instead of
+    branching on each comparison.
+
+    It is usually created by freezing a tree:
+
+    >>> from playground.tree import BinarySearchTree
+    >>> tree = BinarySearchTree.from_iterable([5, 3, 1, 4, 2]).freeze()
+    >>> tuple(tree.breadth_first_iterator())
+    (4, 2, 5, 1, 3)
+    >>> 3 in tree
+    True
+    >>> tree.floor(0)
+    Traceback (most recent call last):
+        ...
+    ValueError: No value in the tree is smaller than or equal to 0
+    """
+
+    def __init__(self) -> None:
+        self._values: Sequence[T] = []
+
+    @classmethod
+    def from_sorted(
+        cls: type[FrozenTreeT],
+        values: Iterable[T],
+        *,
+        validate: bool = True,
+        **kwargs: Any,
+    ) -> FrozenTreeT:
+        """Build the tree from sorted values in O(n)
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 2, 3, 4, 5, 6])
+        >>> tuple(tree.breadth_first_iterator())
+        (4, 2, 6, 1, 3, 5)
+        >>> FrozenBinarySearchTree.from_sorted([1, 3, 2])
+        Traceback (most recent call last):
+            ...
+        ValueError: Unsorted values: 2 cannot come after 3
+
+        Other keyword arguments are passed to the constructor.
+        """
+        ordered_values = values if isinstance(values, Sequence) else tuple(values)
+        if validate:
+            following = islice(ordered_values, 1, None)
+            for previous, current in zip(ordered_values, following):
+                if current < previous:
+                    raise ValueError(
+                        f"Unsorted values: {current} cannot come after {previous}"
+                    )
+        tree = cls(**kwargs)
+        tree._build(ordered_values)
+        return tree
+
+    @classmethod
+    def from_iterable(
+        cls: type[FrozenTreeT],
+        values: Iterable[T],
+        **kwargs: Any,
+    ) -> FrozenTreeT:
+        """Build the tree from values in any order in O(n log n)
+
+        >>> tuple(FrozenBinarySearchTree.from_iterable([3, 1, 2, 1]))
+        (1, 1, 2, 3)
+        """
+        return cls.from_sorted(sorted(values), validate=False, **kwargs)
+
+    def _build(self, ordered_values: Sequence[T]) -> None:
+        n = len(ordered_values)
+        typecode = _dump_typecode(ordered_values)
+        layout: Any
+        if typecode == b"p":
+            layout = [None] * n
+        else:
+            layout = array(typecode.decode(), [0]) * n
+        self._store(layout, ordered_values)
+        self._values = layout
+
+    @classmethod
+    def _store(
+        cls,
+        layout: MutableSequence[Any],
+        ordered_values: Sequence[T],
+    ) -> None:
+        """Store the values at the indexes an in-order traversal visits"""
+        values = iter(ordered_values)
+        for index in cls._in_order_indexes(len(layout)):
+            layout[index] = next(values)
+
+    @staticmethod
+    def _in_order_indexes(n: int) -> Iterator[int]:
+        stack: list[int] = []
+        index = 0
+        while stack or index < n:
+            while index < n:
+                stack.append(index)
+                index = 2 * index + 1
+            index = stack.pop()
+            yield index
+            index = 2 * index + 2
+
+    def __contains__(self, x: object) -> bool:
+        values = self._values
+        if not values or not isinstance(x, values[0].__class__):
+            return False
+        # Same search as _lower_bound, inlined as it is the hottest path
+        n = len(values)
+        index = 0
+        while index < n:
+            index = 2 * index + 1 + (values[index] < x)
+        index += 1
+        index = (index >> (index ^ (index + 1)).bit_length()) - 1
+        return index >= 0 and values[index] == x
+
+    def __iter__(self) -> Iterator[T]:
+        return self.depth_first_in_order_iterator()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _lower_bound(self, x: Any, *, inclusive: bool) -> int:
+        """Index of the smallest value greater than (or equal to) x, or -1
+
+        The search goes right while values are smaller than x. The answer is
+        the last node where it went left: the 1-based index with its trailing
+        1 bits, and the 0 bit before them, shifted out.
+        """
+        values = self._values
+        n = len(values)
+        index = 0
+        if inclusive:
+            while index < n:
+                index = 2 * index + 1 + (values[index] < x)
+        else:
+            while index < n:
+                index = 2 * index + 1 + (values[index] <= x)
+        index += 1
+        return (index >> (index ^ (index + 1)).bit_length()) - 1
+
+    def _upper_bound(self, x: Any, *, inclusive: bool) -> int:
+        """Index of the largest value smaller than (or equal to) x, or -1
+
+        Mirrors _lower_bound: the answer is the last node where the search
+        went right, found by shifting out the trailing 0 bits and the 1 bit
+        before them.
+        """
+        values = self._values
+        n = len(values)
+        index = 0
+        if inclusive:
+            while index < n:
+                index = 2 * index + 1 + (values[index] <= x)
+        else:
+            while index < n:
+                index = 2 * index + 1 + (values[index] < x)
+        index += 1
+        return (index >> (index ^ (index - 1)).bit_length()) - 1
+
+    def _next_index(self, index: int) -> int:
+        """Index of the in-order successor of a node, or -1
+
+        With 1-based indexes, the leftmost node below i is i shifted left
+        down to the last level (or the one above it if that is past the end).
+        """
+        n = len(self._values)
+        index += 1
+        if 2 * index + 1 <= n:
+            index = 2 * index + 1
+            index <<= n.bit_length() - index.bit_length()
+            if index > n:
+                index >>= 1
+        else:
+            index >>= (index ^ (index + 1)).bit_length()
+        return index - 1
+
+    def _previous_index(self, index: int) -> int:
+        """Index of the in-order predecessor of a node, or -1"""
+        n = len(self._values)
+        index += 1
+        if 2 * index <= n:
+            index = 2 * index
+            index = ((index + 1) << n.bit_length() - index.bit_length()) - 1
+            if index > n:
+                index >>= 1
+        else:
+            index >>= (index ^ (index - 1)).bit_length()
+        return index - 1
+
+    def irange(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[T]:
+        """Iterate in order through the values between lo and hi
+
+        It costs O(height) to find the first value, and then O(1) per value.
+        A missing bound means the range is not bounded there.
+
+        >>> tree = FrozenBinarySearchTree.from_sorted(range(10))
+        >>> tuple(tree.irange(3, 6))
+        (3, 4, 5, 6)
+        >>> tuple(tree.irange(3, 6, inclusive=(False, False)))
+        (4, 5)
+        >>> tuple(tree.irange(hi=2, reverse=True))
+        (2, 1, 0)
+        """
+        include_lo, include_hi = inclusive
+        values = self._values
+        if reverse:
+            if hi is None:
+                index = self._max_index()
+            else:
+                index = self._upper_bound(hi, inclusive=include_hi)
+            while index >= 0:
+                val = values[index]
+                if lo is not None and (val < lo or (not include_lo and val == lo)):
+                    return
+                yield val
+                index = self._previous_index(index)
+        else:
+            if lo is None:
+                index = self._min_index()
+            else:
+                index = self._lower_bound(lo, inclusive=include_lo)
+            while index >= 0:
+                val = values[index]
+                if hi is not None and (val > hi or (not include_hi and val == hi)):
+                    return
+                yield val
+                index = self._next_index(index)
+
+    def iter_from(
+        self,
+        key: T,
+        reverse: bool = False,
+        inclusive: bool = True,
+    ) -> Iterator[T]:
+        """Iterate in order from key, to resume a previous iteration
+
+        >>> tree = FrozenBinarySearchTree.from_sorted(range(10))
+        >>> tuple(tree.iter_from(7, inclusive=False))
+        (8, 9)
+        >>> tuple(tree.iter_from(2, reverse=True))
+        (2, 1, 0)
+        """
+        if reverse:
+            return self.irange(hi=key, inclusive=(True, inclusive), reverse=True)
+        return self.irange(lo=key, inclusive=(inclusive, True))
+
+    def __reversed__(self) -> Iterator[T]:
+        """Iterate in descending order
+
+        >>> tuple(reversed(FrozenBinarySearchTree.from_sorted([1, 2, 3])))
+        (3, 2, 1)
+        """
+        return self.irange(reverse=True)
+
+    def iter_chunks(self, size: int) -> Iterator[list[T]]:
+        """Iterate in order through lists of up to size consecutive values
+
+        >>> tuple(FrozenBinarySearchTree.from_sorted(range(5)).iter_chunks(2))
+        ([0, 1], [2, 3], [4])
+        """
+        if size < 1:
+            raise ValueError(f"{size} is not a valid chunk size")
+        values = self._values
+        indexes = self._in_order_indexes(len(values))
+        while chunk := [values[index] for index in islice(indexes, size)]:
+            yield chunk
+
+    def breadth_first_iterator(self) -> Iterator[T]:
+        """Iterate through all tree elements, layer by layer
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 2, 3])
+        >>> tuple(tree.breadth_first_iterator())
+        (2, 1, 3)
+        """
+        return iter(self._values)
+
+    def depth_first_pre_order_iterator(self) -> Iterator[T]:
+        """Iterate through all tree elements, in value-left-right order
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 2, 3, 4])
+        >>> tuple(tree.depth_first_pre_order_iterator())
+        (3, 2, 1, 4)
+        """
+        values = self._values
+        stack = [0] if values else []
+        while stack:
+            index = stack.pop()
+            yield values[index]
+            if 2 * index + 2 < len(values):
+                stack.append(2 * index + 2)
+            if 2 * index + 1 < len(values):
+                stack.append(2 * index + 1)
+
+    def depth_first_in_order_iterator(self) -> Iterator[T]:
+        """Iterate through all tree elements, in left-value-right order (sort order)
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 2, 3, 4])
+        >>> tuple(tree.depth_first_in_order_iterator())
+        (1, 2, 3, 4)
+        """
+        values = self._values
+        for index in self._in_order_indexes(len(values)):
+            yield values[index]
+
+    def depth_first_post_order_iterator(self) -> Iterator[T]:
+        """Iterate through all tree elements, in left-right-value order
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 2, 3, 4])
+        >>> tuple(tree.depth_first_post_order_iterator())
+        (1, 2, 4, 3)
+        """
+        values = self._values
+        n = len(values)
+        stack: list[int] = []
+        index = 0
+        last_yielded = -1
+        while stack or index < n:
+            while index < n:
+                stack.append(index)
+                index = 2 * index + 1
+            parent = stack[-1]
+            right = 2 * parent + 2
+            if right < n and right != last_yielded:
+                index = right
+                continue
+            stack.pop()
+            yield values[parent]
+            last_yielded = parent
+
+    @property
+    def height(self) -> int:
+        """1-based height of the tree, which is always the minimum possible
+
+        >>> FrozenBinarySearchTree.from_sorted([1, 2, 3, 4]).height
+        3
+        """
+        return len(self._values).bit_length()
+
+    def min(self) -> T:
+        """Smallest value of the tree
+
+        >>> FrozenBinarySearchTree.from_sorted([1, 2, 3]).min()
+        1
+        >>> FrozenBinarySearchTree().min()
+        Traceback (most recent call last):
+            ...
+        ValueError: The tree is empty
+        """
+        index = self._min_index()
+        if index < 0:
+            raise ValueError("The tree is empty")
+        return self._values[index]
+
+    def _min_index(self) -> int:
+        """Index of the leftmost node, the deepest one at 2^k - 1, or -1"""
+        return (1 << len(self._values).bit_length() >> 1) - 1
+
+    def max(self) -> T:
+        """Largest value of the tree
+
+        >>> FrozenBinarySearchTree.from_sorted([1, 2, 3, 4]).max()
+        4
+        >>> FrozenBinarySearchTree().max()
+        Traceback (most recent call last):
+            ...
+        ValueError: The tree is empty
+        """
+        index = self._max_index()
+        if index < 0:
+            raise ValueError("The tree is empty")
+        return self._values[index]
+
+    def _max_index(self) -> int:
+        """Index of the rightmost node, the deepest one at 2^k - 2, or -1"""
+        return (1 << (len(self._values) + 1).bit_length() >> 1) - 2
+
+    def floor(self, x: T) -> T:
+        """Largest value of the tree smaller than or equal to x
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.floor(3)
+        3
+        >>> tree.floor(4)
+        3
+        """
+        index = self._upper_bound(x, inclusive=True)
+        if index < 0:
+            raise ValueError(f"No value in the tree is smaller than or equal to {x}")
+        return self._values[index]
+
+    def ceiling(self, x: T) -> T:
+        """Smallest value of the tree greater than or equal to x
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.ceiling(3)
+        3
+        >>> tree.ceiling(4)
+        5
+        >>> tree.ceiling(6)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than or equal to 6
+        """
+        index = self._lower_bound(x, inclusive=True)
+        if index < 0:
+            raise ValueError(f"No value in the tree is greater than or equal to {x}")
+        return self._values[index]
+
+    def predecessor(self, x: T) -> T:
+        """Largest value of the tree strictly smaller than x
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.predecessor(3)
+        1
+        >>> tree.predecessor(1)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is smaller than 1
+        """
+        index = self._upper_bound(x, inclusive=False)
+        if index < 0:
+            raise ValueError(f"No value in the tree is smaller than {x}")
+        return self._values[index]
+
+    def successor(self, x: T) -> T:
+        """Smallest value of the tree strictly greater than x
+
+        >>> tree = FrozenBinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.successor(3)
+        5
+        >>> tree.successor(5)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than 5
+        """
+        index = self._lower_bound(x, inclusive=False)
+        if index < 0:
+            raise ValueError(f"No value in the tree is greater than {x}")
+        return self._values[index]
@@ -0,0 +1,266 @@
+"""Binary Search Trees that measure the work done by each operation"""
+
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, Literal, NamedTuple, TypeVar
+
+from playground.tree import (
+    AVLBinarySearchTree,
+    BinarySearchTree,
+    BinaryTreeNode,
+    ScapegoatBinarySearchTree,
+    T,
+    _in_order_nodes,
+)
+
+R = TypeVar("R")
+
+# Called after each operation with its name, the seconds it took and the nodes
+# it visited
+StatsCallback = Callable[[str, float, int], None]
+
+
+class OperationStats(NamedTuple):
+    """Work done by all the calls to an operation"""
+
+    calls: int
+    seconds: float
+    # Nodes compared to the value looked for, or read by traversals and
+    # balancing. Every one of them costs a key comparison when searching
+    nodes_visited: int
+    rotations: int
+    # Nodes placed in subtrees rebuilt from scratch
+    rebuilt_nodes: int
+
+
+class InstrumentedBinarySearchTree(BinarySearchTree[T]):
+    """Binary search tree that measures its operations, to diagnose slow ones
+
+    Each add, remove, lookup (in), traversal and balance is timed, and counts
+    the nodes it visits and the rotations and rebuilds it makes. stats() adds
+    them up per operation, and the callback, if given, is called after each
+    one with its name, duration and nodes visited. A tall tree shows up as
+    many nodes visited per call, and slow comparisons as a long time for few
+    of them.
+
+    >>> tree = InstrumentedBinarySearchTree.from_sorted([1, 2, 3, 4, 5, 6, 7])
+    >>> 7 in tree
+    True
+    >>> 8 in tree
+    False
+    >>> stats = tree.stats()["contains"]
+    >>> stats.calls, stats.nodes_visited
+    (2, 6)
+
+    Measuring adds and removals costs an extra walk down the tree, so trees
+    of the other classes, which are not instrumented, pay nothing for it.
+    Traversals are timed from their first value to their last, including the
+    time the caller takes with each value.
+    """
+
+    def __init__(
+        self,
+        root: BinaryTreeNode[T] | None = None,
+        *,
+        callback: StatsCallback | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.callback: StatsCallback | None = None
+        # Nodes visited, rotations and rebuilt nodes of the running operation
+        self._work: list[int] | None = None
+        self._stats: dict[str, list[Any]] = {}
+        super().__init__(root, **kwargs)
+        # Balancing done while creating the tree is not measured
+        self.reset_stats()
+        self.callback = callback
+
+    def stats(self) -> dict[str, OperationStats]:
+        """Work done by each operation since creation or the last reset_stats
+
+        >>> tree = InstrumentedBinarySearchTree()
+        >>> tree.add(1)
+        >>> tree.stats()["add"].calls
+        1
+        """
+        return {
+            operation: OperationStats(*totals)
+            for operation, totals in self._stats.items()
+        }
+
+    def reset_stats(self) -> None:
+        """Forget the work measured so far"""
+        self._stats = {}
+
+    def _measure(
+        self,
+        operation: str,
+        nodes_visited: int,
+        method: Callable[..., R],
+        *args: Any,
+    ) -> R:
+        if self._work is not None:
+            # Part of an operation that is already being measured
+            return method(*args)
+        work = self._work = [nodes_visited, 0, 0]
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._work = None
+            self._record(operation, time.perf_counter() - start, work)
+
+    def _record(self, operation: str, seconds: float, work: list[int]) -> None:
+        totals = self._stats.setdefault(operation, [0, 0.0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        for i, amount in enumerate(work, 2):
+            totals[i] += amount
+        if self.callback is not None:
+            self.callback(operation, seconds, work[0])
+
+    def _search_length(self, key: Any, to_leaf: bool = False) -> int:
+        """Nodes compared to key on the way down to it, or to a leaf
+
+        Keys that cannot be compared to the ones in the tree visit no nodes.
+        """
+        length = 0
+        node = self._root
+        try:
+            while node:
+                if not to_leaf and node.key == key:
+                    return length + 1
+                node = node.left if node.key > key else node.right
+                length += 1
+        except TypeError:
+            pass
+        return length
+
+    def _node_count(self) -> int:
+        return sum(1 for _ in _in_order_nodes(self._root))
+
+    def _add(self, val: T, key: Any) -> None:
+        # Copies go down to a leaf, unless counted in the node of the value
+        visited = self._search_length(key, to_leaf=not self._multiset)
+        self._measure("add", visited, super()._add, val, key)
+
+    def remove(self, val: T) -> None:
+        self._measure("remove", self._search_length(val), super().remove, val)
+
+    def __contains__(self, x: object) -> bool:
+        # Nodes are counted by the search itself, which values of another type
+        # than the keys never reach
+        return self._measure("contains", 0, super().__contains__, x)
+
+    def _contains_type_safe(self, root: BinaryTreeNode[T] | None, x: Any) -> bool:
+        work = self._work
+        if work is None:
+            return super()._contains_type_safe(root, x)
+        node = root
+        while node:
+            work[0] += 1
+            if x == node.key:
+                return True
+            node = node.left if x < node.key else node.right
+        return False
+
+    def balance(self, strategy: Literal["rebuild", "in_place"] = "rebuild") -> None:
+        self._measure("balance", self._node_count(), super().balance, strategy)
+
+    def _balance_in_place(self) -> None:
+        if self._work is not None:
+            # Turning the tree into a vine takes a right rotation for each
+            # node that is not on its right spine yet
+            spine = 0
+            node = self._root
+            while node:
+                spine += 1
+                node = node.right
+            self._work[1] += self._node_count() - spine
+        super()._balance_in_place()
+
+    def _compress_vine(self, pseudo_root: BinaryTreeNode[T], count: int) -> None:
+        super()._compress_vine(pseudo_root, count)
+        if self._work is not None:
+            self._work[1] += count
+
+    def _ordered_list_to_balanced_tree(
+        self,
+        ordered_elements: Any,
+        start_index: int,
+        end_index: int,
+        ordered_keys: Any = None,
+    ) -> BinaryTreeNode[T] | None:
+        if self._work is not None:
+            self._work[2] += max(0, end_index - start_index + 1)
+        return super()._ordered_list_to_balanced_tree(
+            ordered_elements, start_index, end_index, ordered_keys
+        )
+
+    def _rebalance(self, node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+        work = self._work
+        if work is None:
+            return super()._rebalance(node)
+        left, right, rebuilt_nodes = node.left, node.right, work[2]
+        balanced = super()._rebalance(node)
+        if balanced is not node and work[2] == rebuilt_nodes:
+            # A child taking the place of the node takes one rotation, and a
+            # grandchild two
+            work[1] += 1 if balanced is left or balanced is right else 2
+        return balanced
+
+    def _traversal(self, operation: str, values: Iterator[T]) -> Iterator[T]:
+        work = [0, 0, 0]
+        start = time.perf_counter()
+        try:
+            for val in values:
+                work[0] += 1
+                yield val
+        finally:
+            self._record(operation, time.perf_counter() - start, work)
+
+    def breadth_first_iterator(self) -> Iterator[T]:
+        return self._traversal(
+            "breadth_first_iterator", super().breadth_first_iterator()
+        )
+
+    def depth_first_pre_order_iterator(self) -> Iterator[T]:
+        return self._traversal(
+            "depth_first_pre_order_iterator", super().depth_first_pre_order_iterator()
+        )
+
+    def depth_first_in_order_iterator(self) -> Iterator[T]:
+        return self._traversal(
+            "depth_first_in_order_iterator", super().depth_first_in_order_iterator()
+        )
+
+    def depth_first_post_order_iterator(self) -> Iterator[T]:
+        return self._traversal(
+            "depth_first_post_order_iterator",
+            super().depth_first_post_order_iterator(),
+        )
+
+
+class InstrumentedAVLBinarySearchTree(
+    InstrumentedBinarySearchTree[T], AVLBinarySearchTree[T]
+):
+    """AVL tree that measures its operations, counting the rotations it makes
+
+    >>> tree = InstrumentedAVLBinarySearchTree()
+    >>> for i in range(1, 8):
+    ...     tree.add(i)
+    >>> tree.stats()["add"].rotations
+    4
+    """
+
+
+class InstrumentedScapegoatBinarySearchTree(
+    InstrumentedBinarySearchTree[T], ScapegoatBinarySearchTree[T]
+):
+    """Scapegoat tree that measures its operations, counting the rebuilt nodes
+
+    >>> tree = InstrumentedScapegoatBinarySearchTree(alpha=0.5)
+    >>> for i in range(1, 8):
+    ...     tree.add(i)
+    >>> tree.stats()["add"].rebuilt_nodes > 0
+    True
+    """
@@ -0,0 +1,173 @@
+"""Bulk construction of Binary Search Trees spread over several cores"""
+
+import os
+import sys
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain, repeat
+from operator import itemgetter
+from typing import Any
+
+from playground.tree import (
+    BinarySearchTree,
+    BinaryTreeNode,
+    _balanced_subtree,
+    _collapsed,
+    _CountedNode,
+    _middle,
+)
+
+# Threads only run Python code in parallel on free-threaded builds. With the
+# GIL, they would take turns, so trees are built by a single thread instead
+_FREE_THREADED = not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+# Fewer values are sorted and built by a single thread, as starting the others
+# would take longer than sorting them
+_MIN_PARALLEL_SIZE = 100_000
+
+
+def from_iterable_parallel(
+    values: Iterable[Any],
+    tree_class: type[BinarySearchTree[Any]] = BinarySearchTree,
+    *,
+    workers: int | None = None,
+    min_parallel_size: int = _MIN_PARALLEL_SIZE,
+    **kwargs: Any,
+) -> BinarySearchTree[Any]:
+    """Build a balanced tree from values in any order, using several cores
+
+    The values are split into a chunk per worker, and the chunks are sorted
+    in a thread pool. The sorted runs are then merged. Below the top
+    log2(workers) levels, the subtrees are built in the thread pool as well,
+    and then joined under those levels. The tree is identical to the one
+    from_iterable builds:
+
+    >>> values = [5, 3, 8, 1, 9, 2, 7]
+    >>> tree = from_iterable_parallel(values, workers=2, min_parallel_size=0)
+    >>> tuple(tree.breadth_first_iterator())
+    (5, 2, 8, 1, 3, 7, 9)
+    >>> tuple(BinarySearchTree.from_iterable(values).breadth_first_iterator())
+    (5, 2, 8, 1, 3, 7, 9)
+
+    It only runs in parallel on free-threaded builds of Python (3.13t and
+    later). On builds with the GIL, where threads take turns and processes
+    would have to pickle every value and node, it is from_iterable. So are
+    builds of fewer than min_parallel_size values. Other keyword arguments
+    are passed to the constructor of tree_class.
+    """
+    ordered_elements = list(values)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"{workers} is not a valid number of workers")
+    if (
+        not _FREE_THREADED
+        or workers == 1
+        or len(ordered_elements) < max(min_parallel_size, 1)
+    ):
+        return tree_class.from_iterable(ordered_elements, **kwargs)
+
+    key = kwargs.get("key")
+    chunk_size = -(-len(ordered_elements) // workers)
+    bounds = range(0, len(ordered_elements) + chunk_size, chunk_size)
+    chunks = [ordered_elements[start:stop] for start, stop in zip(bounds, bounds[1:])]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        runs = list(executor.map(_sorted, chunks, repeat(key)))
+        # Timsort finds the sorted runs and merges them, in O(n log k) and
+        # without comparing the keys within each run again. It is stable, as
+        # was sorting each chunk, so equal keys keep their order in the input
+        ordered_keys: Sequence[Any]
+        if key is None:
+            ordered_elements = sorted(chain.from_iterable(runs))
+            ordered_keys = ordered_elements
+        else:
+            keyed = sorted(chain.from_iterable(runs), key=itemgetter(0))
+            ordered_elements = [val for _, val in keyed]
+            ordered_keys = [val_key for val_key, _ in keyed]
+
+        tree = tree_class(**kwargs)
+        ordered_counts: Sequence[int] | None = None
+        if tree._multiset:
+            ordered_elements, ordered_keys, ordered_counts = _collapsed(
+                ordered_elements, ordered_keys
+            )
+        tree._replace_root(
+            _balanced_tree(
+                ordered_elements, ordered_keys, ordered_counts, workers, executor
+            )
+        )
+    return tree
+
+
+def _sorted(values: list[Any], key: Callable[[Any], Any] | None) -> list[Any]:
+    """Values sorted, or else pairs of their key and them sorted by key"""
+    if key is None:
+        return sorted(values)
+    return sorted(((key(val), val) for val in values), key=itemgetter(0))
+
+
+def _balanced_tree(
+    ordered_elements: Sequence[Any],
+    ordered_keys: Sequence[Any],
+    ordered_counts: Sequence[int] | None,
+    workers: int,
+    executor: ThreadPoolExecutor,
+) -> BinaryTreeNode[Any] | None:
+    """Balanced tree of the elements, built by the threads of the executor
+
+    The range of the elements is split as _balanced_subtree would, until
+    there is a subtree for each thread to build. The nodes above them, fewer
+    than the threads, make up a spine that is built last, as each node takes
+    its height and size from its children.
+    """
+    levels = (workers - 1).bit_length()
+    ranges = [(0, len(ordered_elements) - 1)]
+    for _ in range(levels):
+        ranges = [
+            half
+            for start, end in ranges
+            for half in (
+                (start, _middle(start, end) - 1),
+                (_middle(start, end) + 1, end),
+            )
+            if start <= end
+        ]
+
+    subtrees: dict[tuple[int, int], Future[BinaryTreeNode[Any] | None]] = {
+        (start, end): executor.submit(
+            _balanced_subtree,
+            ordered_elements,
+            ordered_keys,
+            ordered_counts,
+            start,
+            end,
+        )
+        for start, end in ranges
+        if start <= end
+    }
+
+    def spine(start: int, end: int, levels: int) -> BinaryTreeNode[Any] | None:
+        # Only recurses log2(workers) levels deep
+        if start > end:
+            return None
+        if not levels:
+            return subtrees[start, end].result()
+        middle = _middle(start, end)
+        left = spine(start, middle - 1, levels - 1)
+        right = spine(middle + 1, end, levels - 1)
+        if ordered_counts is None:
+            return BinaryTreeNode(
+                ordered_elements[middle],
+                left=left,
+                right=right,
+                key=ordered_keys[middle],
+            )
+        return _CountedNode(
+            ordered_elements[middle],
+            left=left,
+            right=right,
+            key=ordered_keys[middle],
+            count=ordered_counts[middle],
+        )
+
+    return spine(0, len(ordered_elements) - 1, levels)
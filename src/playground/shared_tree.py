@@ -0,0 +1,142 @@
+"""Read-only Binary Search Tree of numbers in shared memory"""
+
+import struct
+from collections.abc import Sequence
+from multiprocessing.shared_memory import SharedMemory
+from types import TracebackType
+from typing import Any, TypeVar
+
+from playground.frozen_tree import FrozenBinarySearchTree
+from playground.tree import _dump_typecode
+
+NumberT = TypeVar("NumberT", int, float)
+SharedTreeT = TypeVar("SharedTreeT", bound="SharedBinarySearchTree[Any]")
+
+# Shared memory layout: a header followed by the values in Eytzinger order, as
+# native 8-byte ints ("q") or floats ("d")
+_SHARED_MAGIC = b"PGSBST"
+_SHARED_HEADER = struct.Struct("=6sxcQ")
+
+
+class SharedBinarySearchTree(FrozenBinarySearchTree[NumberT]):
+    """Frozen tree of numbers whose values live in a shared memory block
+
+    The process creating it owns the block. Other processes attach to it by
+    name, getting a tree that reads the same memory without copying it.
+    Pickling the tree (for example, to pass it to a multiprocessing pool)
+    only sends the name, and unpickling attaches to the block.
+
+    Every process closes its tree when done with it, and the owner unlinks
+    the block once no process needs it. Using the tree as a context manager
+    closes it on exit, and unlinks the block if this process created it.
+
+    >>> from playground.tree import BinarySearchTree
+    >>> with BinarySearchTree.from_sorted([1, 2, 3]).share() as tree:
+    ...     with SharedBinarySearchTree.attach(tree.name) as attached:
+    ...         tuple(attached.irange(2))
+    (2, 3)
+    """
+
+    def __init__(self, name: str | None = None) -> None:
+        super().__init__()
+        self._requested_name = name
+        self._shared_memory: SharedMemory | None = None
+        self._owner = False
+
+    def _build(self, ordered_values: Sequence[NumberT]) -> None:
+        typecode = _dump_typecode(ordered_values)
+        if typecode == b"p":
+            raise ValueError("Only ints fitting in 64 bits or floats can be shared")
+        n = len(ordered_values)
+        shared_memory = SharedMemory(
+            self._requested_name,
+            create=True,
+            size=_SHARED_HEADER.size + 8 * n,
+        )
+        buffer = shared_memory.buf
+        assert buffer is not None
+        _SHARED_HEADER.pack_into(buffer, 0, _SHARED_MAGIC, typecode, n)
+        self._map(shared_memory, typecode, n)
+        self._owner = True
+        self._store(self._values, ordered_values)  # type: ignore[arg-type]
+
+    def _map(self, shared_memory: SharedMemory, typecode: bytes, n: int) -> None:
+        buffer = shared_memory.buf
+        assert buffer is not None
+        start, end = _SHARED_HEADER.size, _SHARED_HEADER.size + 8 * n
+        values = buffer[start:end]
+        self._values = values.cast(typecode.decode())  # type: ignore[call-overload]
+        values.release()
+        self._shared_memory = shared_memory
+
+    @classmethod
+    def attach(cls: type[SharedTreeT], name: str) -> SharedTreeT:
+        """Tree reading the values shared by another tree under the given name
+
+        >>> SharedBinarySearchTree.attach("playground-missing-tree")
+        Traceback (most recent call last):
+            ...
+        FileNotFoundError: ...
+        """
+        shared_memory = SharedMemory(name)
+        buffer = shared_memory.buf
+        assert buffer is not None
+        if len(buffer) >= _SHARED_HEADER.size:
+            magic, typecode, n = _SHARED_HEADER.unpack_from(buffer)
+        else:
+            magic = None
+        if magic != _SHARED_MAGIC:
+            shared_memory.close()
+            raise ValueError(f"{name} is not a shared BinarySearchTree")
+        tree = cls()
+        tree._map(shared_memory, typecode, n)
+        return tree
+
+    @property
+    def name(self) -> str | None:
+        """Name other processes attach to, or None once closed"""
+        if self._shared_memory is None:
+            return None
+        return self._shared_memory.name
+
+    def close(self) -> None:
+        """Stop using the shared values in this process. Closing twice has no effect
+
+        The tree cannot be used afterwards, though other processes can.
+        """
+        if self._shared_memory is None:
+            return
+        values = self._values
+        assert isinstance(values, memoryview)
+        values.release()
+        self._shared_memory.close()
+        self._shared_memory = None
+
+    def unlink(self) -> None:
+        """Close the tree and free the shared block once all processes close it
+
+        It must be called once, usually by the process that created the tree.
+        """
+        shared_memory = self._shared_memory
+        self.close()
+        if shared_memory is not None:
+            shared_memory.unlink()
+
+    def __enter__(self: SharedTreeT) -> SharedTreeT:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        if self.name is None:
+            raise ValueError("A closed shared tree cannot be pickled")
+        return (type(self).attach, (self.name,))
@@ -1,10 +1,56 @@
 """Simple Binary Tree implementation"""
 
+import copy
+import heapq
+import math
+import pickle
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import deque
-from collections.abc import Collection, Iterator
-from typing import Any, Generic, Protocol, TypeVar
+from collections.abc import Callable, Collection, Iterable, Iterator, Sequence
+from itertools import chain, groupby, islice, repeat
+from operator import attrgetter, itemgetter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Generic,
+    Literal,
+    NamedTuple,
+    Protocol,
+    TypeVar,
+)
+
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:  # pragma: no cover
+    _HAS_NUMPY = False
+
+if TYPE_CHECKING:
+    from playground.frozen_tree import FrozenBinarySearchTree
+    from playground.shared_tree import SharedBinarySearchTree
 
 T = TypeVar("T", bound="_Comparable")
+TreeT = TypeVar("TreeT", bound="BaseBinarySearchTree[Any]")
+MutableTreeT = TypeVar("MutableTreeT", bound="BinarySearchTree[Any]")
+PersistentTreeT = TypeVar("PersistentTreeT", bound="PersistentBinarySearchTree[Any]")
+
+# Binary dump format: a header followed by the values in order, either packed
+# as little-endian 8-byte ints ("q") or floats ("d"), or pickled as a list ("p")
+_DUMP_MAGIC = b"PGBST"
+_DUMP_VERSION = 1
+_DUMP_HEADER = struct.Struct("<5sBcQ")
+_DUMP_CHUNK_SIZE = 1 << 16
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+# Cost of rebuilding the tree per element, relative to visiting a node when
+# adding or removing a single value
+_BATCH_REBUILD_COST = 10
 
 
 class _Comparable(Protocol):
@@ -16,126 +62,469 @@ class _Comparable(Protocol):
 
 
 class BinaryTreeNode(Generic[T]):
+    # The key stays on every node, as it is read at every level of a search.
+    # The copy count is only stored by the nodes of multiset trees
+    __slots__ = ("val", "key", "left", "right", "height", "size")
+
+    count = 1
+
     def __init__(
         self,
         val: T,
         *,
         left: "BinaryTreeNode[T] | None" = None,
         right: "BinaryTreeNode[T] | None" = None,
+        key: Any = None,
     ) -> None:
         self.val = val
+        # What the tree orders the node by: the value itself, unless the tree
+        # has a key function
+        self.key = val if key is None else key
         self.left = left
         self.right = right
+        self.height = 1 + max(_height(left), _height(right))
+        self.size = self.count + _size(left) + _size(right)
 
 
-class BinarySearchTree(Generic[T], Collection[T]):
-    """Simple binary search tree implementation
+class _CountedNode(BinaryTreeNode[T]):
+    """Node of a multiset tree, which counts the copies of its value"""
 
-    >>> tree = BinarySearchTree()
-    >>> tree.add(1)
-    >>> tree.add(3)
-    >>> tree.add(2)
-    >>> tuple(tree)
-    (1, 2, 3)
+    __slots__ = ("count",)
 
-    It can be created from a binary tree represented by BinaryTreeNode:
+    def __init__(
+        self,
+        val: T,
+        *,
+        left: BinaryTreeNode[T] | None = None,
+        right: BinaryTreeNode[T] | None = None,
+        key: Any = None,
+        count: int = 1,
+    ) -> None:
+        self.count = count
+        super().__init__(val, left=left, right=right, key=key)
 
-    >>> BinarySearchTree(
-    ...     BinaryTreeNode(
-    ...         2,
-    ...         left=BinaryTreeNode(1),
-    ...         right=BinaryTreeNode(3),
-    ...     )
-    ... )
-    <playground.tree.BinarySearchTree object at ...>
 
-    It allows duplicate values. For example:
+def _height(node: BinaryTreeNode[Any] | None) -> int:
+    return node.height if node else 0
 
-    >>> BinarySearchTree(BinaryTreeNode(1, left=BinaryTreeNode(1)))
-    <playground.tree.BinarySearchTree object at ...>
 
-    It does not allow instantiating an unsorted tree. For example:
+def _size(node: BinaryTreeNode[Any] | None) -> int:
+    return node.size if node else 0
 
-    >>> BinarySearchTree(BinaryTreeNode(1, left=BinaryTreeNode(2)))
-    Traceback (most recent call last):
-        ...
-    ValueError: Unsorted BinarySearchTree: 2 cannot be to the left of 1
 
-    By default, it is iterated depth-first in-order:
+def _update(node: BinaryTreeNode[Any]) -> None:
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.size = node.count + _size(node.left) + _size(node.right)
 
-    >>> tuple(
-    ...     BinarySearchTree(
-    ...         BinaryTreeNode(
-    ...             2,
-    ...             left=BinaryTreeNode(1),
-    ...             right=BinaryTreeNode(3),
-    ...         )
-    ...     )
+
+def _in_order_nodes(root: BinaryTreeNode[T] | None) -> Iterator[BinaryTreeNode[T]]:
+    stack: list[BinaryTreeNode[T]] = []
+    node = root
+    while stack or node:
+        while node:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+def _counted_copy(root: BinaryTreeNode[T] | None) -> BinaryTreeNode[T] | None:
+    """Copy of a subtree, with the same shape, of nodes that count copies"""
+    # Like building a balanced subtree, each node is visited twice: first to
+    # schedule copying its children, and then to join the copies under it
+    nodes: list[tuple[BinaryTreeNode[T] | None, bool]] = [(root, False)]
+    copies: list[BinaryTreeNode[T] | None] = []
+    while nodes:
+        node, children_copied = nodes.pop()
+        if node is None:
+            copies.append(None)
+        elif children_copied:
+            right = copies.pop()
+            left = copies.pop()
+            copies.append(
+                _CountedNode(
+                    node.val, left=left, right=right, key=node.key, count=node.count
+                )
+            )
+        else:
+            nodes.append((node, True))
+            nodes.append((node.right, False))
+            nodes.append((node.left, False))
+    return copies.pop()
+
+
+def _copies(nodes: Iterable[BinaryTreeNode[T]]) -> Iterator[BinaryTreeNode[T]]:
+    """Each node repeated as many times as the copies of its value"""
+    for node in nodes:
+        yield node
+        if node.count > 1:
+            yield from repeat(node, node.count - 1)
+
+
+def _collapsed(
+    ordered_elements: Iterable[T],
+    ordered_keys: Iterable[Any],
+) -> tuple[list[T], list[Any], list[int]]:
+    """Elements with distinct keys, their keys, and how many copies they had"""
+    elements: list[T] = []
+    keys: list[Any] = []
+    counts: list[int] = []
+    for val, key in zip(ordered_elements, ordered_keys):
+        if counts and key == keys[-1]:
+            counts[-1] += 1
+        else:
+            elements.append(val)
+            keys.append(key)
+            counts.append(1)
+    return elements, keys, counts
+
+
+class ShapeReport(NamedTuple):
+    """Shape of a tree, to tell whether balancing it is worth it. See shape_report"""
+
+    nodes: int
+    height: int
+    # Height of the tree once balanced
+    optimal_height: int
+    # Nodes at each depth, the root being at depth 1 (index 0)
+    depth_histogram: tuple[int, ...]
+    # Nodes visited on average to find the value of a node
+    average_depth: float
+    # Values with the most copies, as (value, copies, nodes holding them),
+    # from the most copied
+    most_copied: list[tuple[Any, int, int]]
+    # Subtrees taller than if balanced, as (value of their root, height,
+    # optimal height), from the one with the most extra height
+    most_unbalanced: list[tuple[Any, int, int]]
+    # How many times faster searches are expected to be once balanced
+    balance_speedup: float
+
+
+def _balanced_depth_sum(nodes: int) -> int:
+    """Sum of the depths of the nodes of a balanced tree with the given nodes"""
+    total = 0
+    depth = 1
+    while nodes:
+        width = min(nodes, 1 << (depth - 1))
+        total += width * depth
+        nodes -= width
+        depth += 1
+    return total
+
+
+class BaseBinarySearchTree(Generic[T], Collection[T]):
+    """Binary search tree operations that do not change the tree
+
+    BinarySearchTree adds the operations changing a tree in place, and
+    PersistentBinarySearchTree the ones returning a changed copy of it.
+
+    Values are ordered by themselves, or by the result of the key function
+    if one is given, as sorted does. Keys are computed once, when a value is
+    added, and stored next to it. Then every method looking values up (in,
+    remove, floor, irange, rank...) takes keys rather than values:
+
+    >>> tree = BinarySearchTree.from_iterable(
+    ...     [("b", 2), ("a", 1), ("c", 3)], key=lambda item: item[1]
     ... )
-    (1, 2, 3)
+    >>> tuple(tree)
+    (('a', 1), ('b', 2), ('c', 3))
+    >>> 2 in tree
+    True
+    >>> tree.ceiling(2.5)
+    ('c', 3)
+
+    Duplicates are stored in nodes of their own, unless multiset is True,
+    in which case a node counts the copies of its value. Values with the
+    same key count as copies of the first one added.
     """
 
     def __init__(
         self,
         root: BinaryTreeNode[T] | None = None,
+        *,
+        key: Callable[[T], Any] | None = None,
+        multiset: bool = False,
     ) -> None:
-        self._root = root
+        # The nodes of a multiset count the copies of their value
+        self._root = _counted_copy(root) if multiset else root
+        self._key = key
+        self._multiset = multiset
         self._validate(self._root)
+        # Incremented on every change, to tell when cached data is outdated
+        self._version = 0
+        self._snapshot: list[T] = []
+        self._snapshot_keys: Sequence[Any] = []
+        self._snapshot_version = -1
+        self._snapshot_array: Any = None
+
+    @classmethod
+    def from_sorted(
+        cls: type[TreeT],
+        values: Iterable[T],
+        *,
+        validate: bool = True,
+        **kwargs: Any,
+    ) -> TreeT:
+        """Build a balanced tree from sorted values in O(n)
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2, 3, 4, 5, 6, 7])
+        >>> tuple(tree.breadth_first_iterator())
+        (4, 2, 6, 1, 3, 5, 7)
+        >>> BinarySearchTree.from_sorted([1, 3, 2])
+        Traceback (most recent call last):
+            ...
+        ValueError: Unsorted values: 2 cannot come after 3
+
+        Checking the order can be skipped when the caller guarantees it, in
+        which case unsorted values lead to an unsorted tree. Other keyword
+        arguments are passed to the constructor.
+        """
+        ordered_elements = values if isinstance(values, Sequence) else tuple(values)
+        tree = cls(**kwargs)
+        ordered_keys = tree._keys_of(ordered_elements)
+        if validate:
+            following = islice(ordered_keys, 1, None)
+            for previous, current in zip(ordered_keys, following):
+                if current < previous:
+                    raise ValueError(
+                        f"Unsorted values: {current} cannot come after {previous}"
+                    )
+        tree._rebuild(ordered_elements, ordered_keys)
+        return tree
+
+    @classmethod
+    def from_iterable(
+        cls: type[TreeT],
+        values: Iterable[T],
+        **kwargs: Any,
+    ) -> TreeT:
+        """Build a balanced tree from values in any order in O(n log n)
+
+        >>> tuple(BinarySearchTree.from_iterable([3, 1, 2, 1]))
+        (1, 1, 2, 3)
+        """
+        tree = cls(**kwargs)
+        tree._rebuild(*tree._sorted_with_keys(values))
+        return tree
+
+    def _keys_of(self, values: Sequence[T]) -> Sequence[Any]:
+        """Keys of the given values, which are the values themselves by default"""
+        if self._key is None:
+            return values
+        return [self._key(val) for val in values]
 
-    def _validate(
+    def _in_order_copies(
         self,
         root: BinaryTreeNode[T] | None,
-        lower_bound: T | None = None,
-        upper_bound: T | None = None,
-    ) -> None:
-        if root is None:
-            return
-        if lower_bound is not None and root.val < lower_bound:
-            raise ValueError(
-                "Unsorted BinarySearchTree: "
-                f"{root.val} cannot be to the right of {lower_bound}"
-            )
-        if upper_bound is not None and root.val > upper_bound:
-            raise ValueError(
-                "Unsorted BinarySearchTree: "
-                f"{root.val} cannot be to the left of {upper_bound}"
-            )
-        self._validate(
-            root.left,
-            lower_bound=lower_bound,
-            upper_bound=root.val,
-        )
-        self._validate(
-            root.right,
-            lower_bound=root.val,
-            upper_bound=upper_bound,
-        )
+    ) -> Iterator[BinaryTreeNode[T]]:
+        """Nodes in order, each repeated as many times as the copies of its value"""
+        nodes = _in_order_nodes(root)
+        return _copies(nodes) if self._multiset else nodes
+
+    def _validate(self, root: BinaryTreeNode[T] | None) -> None:
+        """Check the tree is sorted, and compute the key, height and size of nodes"""
+        visited = []
+        stack: list[tuple[BinaryTreeNode[T] | None, Any, Any]] = [(root, None, None)]
+        while stack:
+            node, lower_bound, upper_bound = stack.pop()
+            if node is None:
+                continue
+            if self._key is not None:
+                node.key = self._key(node.val)
+            if lower_bound is not None and node.key < lower_bound:
+                raise ValueError(
+                    "Unsorted BinarySearchTree: "
+                    f"{node.key} cannot be to the right of {lower_bound}"
+                )
+            if upper_bound is not None and node.key > upper_bound:
+                raise ValueError(
+                    "Unsorted BinarySearchTree: "
+                    f"{node.key} cannot be to the left of {upper_bound}"
+                )
+            visited.append(node)
+            stack.append((node.right, node.key, upper_bound))
+            stack.append((node.left, lower_bound, node.key))
+        # Nodes were visited in pre-order, so children come after their parent
+        for node in reversed(visited):
+            _update(node)
 
     def __contains__(self, x: object) -> bool:
         if not self._root:
             return False
-        if not isinstance(x, self._root.val.__class__):
+        if not isinstance(x, self._root.key.__class__):
             return False
         return self._contains_type_safe(self._root, x)
 
     def _contains_type_safe(
         self,
         root: BinaryTreeNode[T] | None,
-        x: T,
+        x: Any,
     ) -> bool:
-        if not root:
-            return False
-        if x == root.val:
-            return True
-        if x < root.val:
-            return self._contains_type_safe(root.left, x)
-        return self._contains_type_safe(root.right, x)
+        node = root
+        while node:
+            if x == node.key:
+                return True
+            node = node.left if x < node.key else node.right
+        return False
 
     def __iter__(self) -> Iterator[T]:
         return self.depth_first_in_order_iterator()
 
     def __len__(self) -> int:
-        return sum(1 for _ in self.depth_first_in_order_iterator())
+        return _size(self._root)
+
+    def _constructor_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments to create an empty tree configured as this one"""
+        kwargs: dict[str, Any] = {}
+        if self._key is not None:
+            kwargs["key"] = self._key
+        if self._multiset:
+            kwargs["multiset"] = True
+        return kwargs
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        """Pickle the tree as its values in order, rebuilt balanced on unpickling
+
+        >>> import pickle
+        >>> tree = BinarySearchTree.from_sorted([1, 2, 3])
+        >>> tuple(pickle.loads(pickle.dumps(tree)))
+        (1, 2, 3)
+        """
+        return (
+            _tree_from_sorted,
+            (type(self), list(self), self._constructor_kwargs()),
+        )
+
+    def __copy__(self: TreeT) -> TreeT:
+        """Balanced tree with the same values
+
+        >>> import copy
+        >>> tree = BinarySearchTree.from_sorted([[1], [2]])
+        >>> copied = copy.copy(tree)
+        >>> copied.select(0) is tree.select(0)
+        True
+        """
+        return _tree_from_sorted(type(self), list(self), self._constructor_kwargs())
+
+    def __deepcopy__(self: TreeT, memo: dict[int, Any]) -> TreeT:
+        """Balanced tree with copies of the values
+
+        >>> import copy
+        >>> tree = BinarySearchTree.from_sorted([[1], [2]])
+        >>> copied = copy.deepcopy(tree)
+        >>> copied.select(0) is tree.select(0)
+        False
+        >>> tuple(copied)
+        ([1], [2])
+        """
+        values = copy.deepcopy(list(self), memo)
+        kwargs = copy.deepcopy(self._constructor_kwargs(), memo)
+        return _tree_from_sorted(type(self), values, kwargs)
+
+    def freeze(self) -> "FrozenBinarySearchTree[T]":
+        """Read-only copy of the tree, laid out for faster searches
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2, 3])
+        >>> frozen = tree.freeze()
+        >>> tree.add(4)
+        >>> tuple(frozen)
+        (1, 2, 3)
+
+        Trees with a key function cannot be frozen, nor shared.
+        """
+        from playground.frozen_tree import FrozenBinarySearchTree
+
+        if self._key is not None:
+            raise ValueError("A tree with a key function cannot be frozen")
+        return FrozenBinarySearchTree.from_sorted(
+            self._sorted_snapshot(), validate=False
+        )
+
+    def share(self, name: str | None = None) -> "SharedBinarySearchTree[Any]":
+        """Read-only copy of a tree of numbers, in memory shared across processes
+
+        The block gets a random name unless one is given. See
+        SharedBinarySearchTree for how to attach to it and free it.
+
+        >>> with BinarySearchTree.from_sorted([1, 2, 3]).share() as shared:
+        ...     2 in shared
+        True
+        """
+        from playground.shared_tree import SharedBinarySearchTree
+
+        if self._key is not None:
+            raise ValueError("A tree with a key function cannot be shared")
+        return SharedBinarySearchTree.from_sorted(
+            self._sorted_snapshot(), validate=False, name=name
+        )
+
+    def dump(self, file: BinaryIO) -> None:
+        """Write the values of the tree, in order, to a binary file
+
+        Trees of ints fitting in 64 bits, or of floats, are written as packed
+        fixed-width numbers. Other values are pickled.
+
+        >>> import io
+        >>> file = io.BytesIO()
+        >>> BinarySearchTree.from_sorted([1, 2, 3]).dump(file)
+        >>> _ = file.seek(0)
+        >>> tuple(BinarySearchTree.load(file))
+        (1, 2, 3)
+        """
+        typecode = _dump_typecode(self)
+        file.write(_DUMP_HEADER.pack(_DUMP_MAGIC, _DUMP_VERSION, typecode, len(self)))
+        if typecode == b"p":
+            pickle.dump(list(self), file, protocol=pickle.HIGHEST_PROTOCOL)
+            return
+        values: Iterator[Any] = iter(self)
+        while chunk := array(typecode.decode(), islice(values, _DUMP_CHUNK_SIZE)):
+            if sys.byteorder == "big":  # pragma: no cover
+                chunk.byteswap()
+            file.write(chunk.tobytes())
+
+    @classmethod
+    def load(
+        cls: type[TreeT],
+        file: BinaryIO,
+        *,
+        validate: bool = True,
+        **kwargs: Any,
+    ) -> TreeT:
+        """Build a balanced tree from a file written by dump
+
+        Only load files from trusted sources, as they may contain pickled data.
+        The order of the values is checked unless validate is False. Other
+        keyword arguments are passed to the constructor.
+
+        >>> import io
+        >>> BinarySearchTree.load(io.BytesIO(b"not a tree"))
+        Traceback (most recent call last):
+            ...
+        ValueError: Not a BinarySearchTree dump
+        """
+        header = file.read(_DUMP_HEADER.size)
+        if len(header) < _DUMP_HEADER.size:
+            raise ValueError("Not a BinarySearchTree dump")
+        magic, version, typecode, size = _DUMP_HEADER.unpack(header)
+        if magic != _DUMP_MAGIC:
+            raise ValueError("Not a BinarySearchTree dump")
+        if version != _DUMP_VERSION:
+            raise ValueError(f"Unsupported BinarySearchTree dump version: {version}")
+        values: Sequence[Any]
+        if typecode == b"p":
+            values = pickle.load(file)
+        else:
+            values = array(typecode.decode())
+            data = file.read(size * values.itemsize)
+            if len(data) < size * values.itemsize:
+                raise ValueError("Truncated BinarySearchTree dump")
+            values.frombytes(data)
+            if sys.byteorder == "big":  # pragma: no cover
+                values.byteswap()
+        if len(values) != size:
+            raise ValueError("Truncated BinarySearchTree dump")
+        return cls.from_sorted(values, validate=validate, **kwargs)
 
     def breadth_first_iterator(
         self,
@@ -161,12 +550,15 @@ class BinarySearchTree(Generic[T], Collection[T]):
         ... )
         (4, 2, 6, 1, 3, 5, 7)
         """
+        multiset = self._multiset
         q: deque[BinaryTreeNode[T]] = deque()
         if self._root:
             q.append(self._root)
         while len(q) > 0:
             node = q.popleft()
             yield node.val
+            if multiset and node.count > 1:
+                yield from repeat(node.val, node.count - 1)
             if node.left:
                 q.append(node.left)
             if node.right:
@@ -200,11 +592,17 @@ class BinarySearchTree(Generic[T], Collection[T]):
         self,
         root: BinaryTreeNode[T] | None,
     ) -> Iterator[T]:
-        if not root:
-            return
-        yield root.val
-        yield from self._depth_first_pre_order_iterator(root.left)
-        yield from self._depth_first_pre_order_iterator(root.right)
+        multiset = self._multiset
+        stack = [root] if root else []
+        while stack:
+            node = stack.pop()
+            yield node.val
+            if multiset and node.count > 1:
+                yield from repeat(node.val, node.count - 1)
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
 
     def depth_first_in_order_iterator(self) -> Iterator[T]:
         """Iterate through all tree elements, in left-value-right order (sort order)
@@ -234,11 +632,18 @@ class BinarySearchTree(Generic[T], Collection[T]):
         self,
         root: BinaryTreeNode[T] | None,
     ) -> Iterator[T]:
-        if not root:
-            return
-        yield from self._depth_first_in_order_iterator(root.left)
-        yield root.val
-        yield from self._depth_first_in_order_iterator(root.right)
+        multiset = self._multiset
+        stack: list[BinaryTreeNode[T]] = []
+        node = root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.val
+            if multiset and node.count > 1:
+                yield from repeat(node.val, node.count - 1)
+            node = node.right
 
     def depth_first_post_order_iterator(self) -> Iterator[T]:
         """Iterate through all tree elements, in left-right-value order
@@ -268,11 +673,23 @@ class BinarySearchTree(Generic[T], Collection[T]):
         self,
         root: BinaryTreeNode[T] | None,
     ) -> Iterator[T]:
-        if not root:
-            return
-        yield from self._depth_first_post_order_iterator(root.left)
-        yield from self._depth_first_post_order_iterator(root.right)
-        yield root.val
+        multiset = self._multiset
+        stack: list[BinaryTreeNode[T]] = []
+        node = root
+        last_yielded: BinaryTreeNode[T] | None = None
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            parent = stack[-1]
+            if parent.right and parent.right is not last_yielded:
+                node = parent.right
+                continue
+            stack.pop()
+            yield parent.val
+            if multiset and parent.count > 1:
+                yield from repeat(parent.val, parent.count - 1)
+            last_yielded = parent
 
     @property
     def height(self) -> int:
@@ -287,142 +704,1751 @@ class BinarySearchTree(Generic[T], Collection[T]):
         >>> BinarySearchTree(BinaryTreeNode(2, left=BinaryTreeNode(1))).height
         2
         """
-        return self._height(self._root)
+        return _height(self._root)
 
-    def _height(self, root: BinaryTreeNode[T] | None) -> int:
-        if not root:
-            return 0
-        return 1 + max(self._height(root.left), self._height(root.right))
+    def shape_report(self, top: int = 5) -> ShapeReport:
+        """Measure the shape of the tree in a single O(n) pass
 
-    def add(self, val: T) -> None:
-        """Add a value to the tree
+        Besides the height, it reports how the nodes spread over depths,
+        where they are not balanced, and how much faster searches would be if
+        they were, as the ratio between the average depth of a node and its
+        average depth in a balanced tree. Up to top values are listed as the
+        most copied and the roots of the most unbalanced subtrees.
 
         >>> tree = BinarySearchTree()
-        >>> tree.add(1)
-        >>> tree.add(2)
-        >>> tree.add(3)
-        >>> tuple(tree)
-        (1, 2, 3)
+        >>> for val in (1, 2, 3, 4, 4, 4):
+        ...     tree.add(val)
+        >>> report = tree.shape_report()
+        >>> report.height, report.optimal_height, report.depth_histogram
+        (6, 3, (1, 1, 1, 1, 1, 1))
+        >>> report.average_depth, report.balance_speedup
+        (3.5, 1.5)
+        >>> report.most_copied
+        [(4, 3, 3)]
+        >>> report.most_unbalanced[:2]
+        [(1, 6, 3), (2, 5, 3)]
+        """
+        histogram: list[int] = []
+        depth_sum = 0
+        # Heaps of the top entries so far, the smallest first. Indexes break
+        # ties, so that values are never compared
+        most_copied: list[tuple[int, int, T, int]] = []
+        most_unbalanced: list[tuple[int, int, int, T, int, int]] = []
+        run: list[Any] = []
 
-        Duplicates are allowed.
+        def keep(heap: list[Any], entry: tuple[Any, ...]) -> None:
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+            elif heap and entry > heap[0]:
+                heapq.heapreplace(heap, entry)
 
-        >>> tree = BinarySearchTree()
-        >>> tree.add(1)
-        >>> tree.add(1)
-        >>> tuple(tree)
-        (1, 1)
-        """
-        node = BinaryTreeNode(val)
-        if not self._root:
-            self._root = node
-            return
-        self._add(self._root, node)
+        def end_run() -> None:
+            # Run of nodes with equal keys, as [key, first value, copies, nodes,
+            # index of the first node]
+            if run and run[2] > 1:
+                keep(most_copied, (run[2], -run[4], run[1], run[3]))
 
-    def _add(self, root: BinaryTreeNode[T], node: BinaryTreeNode[T]) -> None:
-        if root.val > node.val:
-            if root.left:
-                self._add(root.left, node)
-            else:
-                root.left = node
-        else:
-            if root.right:
-                self._add(root.right, node)
+        # Subtrees whose right side is being walked, as (root, index of the
+        # root, nodes visited before the subtree, stack length below the root)
+        open_subtrees: list[tuple[BinaryTreeNode[T], int, int, int]] = []
+
+        def close_subtrees(stack_length: int) -> None:
+            # A subtree is fully walked once the walk climbs above its root.
+            # Its nodes, unlike its size, do not count copies
+            while open_subtrees and open_subtrees[-1][3] > stack_length:
+                root, root_index, visited_before, _ = open_subtrees.pop()
+                subtree_nodes = index - visited_before
+                optimal_height = subtree_nodes.bit_length()
+                if root.height > optimal_height:
+                    keep(
+                        most_unbalanced,
+                        (
+                            root.height - optimal_height,
+                            subtree_nodes,
+                            -root_index,
+                            root.val,
+                            root.height,
+                            optimal_height,
+                        ),
+                    )
+
+        index = 0
+        stack: list[tuple[BinaryTreeNode[T], int, int]] = []
+        node = self._root
+        depth = 1
+        while stack or node:
+            while node:
+                stack.append((node, depth, index))
+                node = node.left
+                depth += 1
+            node, depth, visited_before = stack.pop()
+            close_subtrees(len(stack))
+            index += 1
+            if depth > len(histogram):
+                histogram.extend([0] * (depth - len(histogram)))
+            histogram[depth - 1] += 1
+            depth_sum += depth
+            if run and run[0] == node.key:
+                run[2] += node.count
+                run[3] += 1
             else:
-                root.right = node
+                end_run()
+                run[:] = [node.key, node.val, node.count, 1, index]
+            open_subtrees.append((node, index, visited_before, len(stack)))
+            node = node.right
+            depth += 1
+        close_subtrees(-1)
+        end_run()
 
-    def remove(self, val: T) -> None:
-        """Remove a value from the tree. Raises a ValueError if not present
+        nodes = index
+        return ShapeReport(
+            nodes=nodes,
+            height=self.height,
+            optimal_height=nodes.bit_length(),
+            depth_histogram=tuple(histogram),
+            average_depth=depth_sum / nodes if nodes else 0.0,
+            most_copied=[
+                (val, copies, run_nodes)
+                for copies, _, val, run_nodes in sorted(most_copied, reverse=True)
+            ],
+            most_unbalanced=[
+                (val, height, optimal_height)
+                for *_, val, height, optimal_height in sorted(
+                    most_unbalanced, reverse=True
+                )
+            ],
+            balance_speedup=depth_sum / _balanced_depth_sum(nodes) if nodes else 1.0,
+        )
 
-        >>> tree = BinarySearchTree(BinaryTreeNode(2, left=BinaryTreeNode(1)))
-        >>> tree.remove(1)
-        >>> tuple(tree)
-        (2,)
-        >>> tree.remove(2)
-        >>> tuple(tree)
-        ()
-        >>> tree.remove(3)
+    def select(self, k: int) -> T:
+        """k-th smallest value of the tree (0-based). Negative indexes are allowed
+
+        >>> tree = BinarySearchTree(
+        ...     BinaryTreeNode(
+        ...         2,
+        ...         left=BinaryTreeNode(1),
+        ...         right=BinaryTreeNode(3),
+        ...     )
+        ... )
+        >>> tree.select(0)
+        1
+        >>> tree.select(-1)
+        3
+        >>> tree.select(3)
         Traceback (most recent call last):
             ...
-        ValueError: 3 is not contained in the tree
+        IndexError: 3 is out of the tree range
         """
-        self._root = self._remove(self._root, val)
-
-    def _remove(
-        self,
-        root: BinaryTreeNode[T] | None,
-        val: T,
-    ) -> BinaryTreeNode[T] | None:
-        if not root:
-            raise ValueError(f"{val} is not contained in the tree")
+        index = k + len(self) if k < 0 else k
+        if not 0 <= index < len(self):
+            raise IndexError(f"{k} is out of the tree range")
+        node = self._root
+        while node:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index < left_size + node.count:
+                break
+            else:
+                index -= left_size + node.count
+                node = node.right
+        assert node is not None
+        return node.val
 
-        if root.val == val:
-            if root.right:
-                if root.left:
-                    self._add(root.right, root.left)
-                    return root.right
-                return root.right
-            if root.left:
-                return root.left
-            return None
+    def rank(self, x: T) -> int:
+        """Number of values of the tree strictly smaller than x
 
-        if root.val > val:
-            root.left = self._remove(root.left, val)
-        else:
-            root.right = self._remove(root.right, val)
+        >>> tree = BinarySearchTree(
+        ...     BinaryTreeNode(
+        ...         2,
+        ...         left=BinaryTreeNode(1),
+        ...         right=BinaryTreeNode(3),
+        ...     )
+        ... )
+        >>> tree.rank(1)
+        0
+        >>> tree.rank(3)
+        2
+        >>> tree.rank(10)
+        3
+        """
+        return self._count_lower(x, inclusive=False)
 
-        return root
+    def _count_lower(self, x: Any, inclusive: bool) -> int:
+        count = 0
+        node = self._root
+        while node:
+            if node.key < x or (inclusive and node.key == x):
+                count += _size(node.left) + node.count
+                node = node.right
+            else:
+                node = node.left
+        return count
 
-    def balance(self) -> None:
-        """Balances this tree to have minimum height
+    def count_range(self, lo: T, hi: T) -> int:
+        """Number of values of the tree between lo and hi, both inclusive
 
         >>> tree = BinarySearchTree(
         ...     BinaryTreeNode(
-        ...         1,
-        ...         right=BinaryTreeNode(
-        ...             2,
-        ...             right=BinaryTreeNode(3),
-        ...         ),
-        ...     ),
+        ...         2,
+        ...         left=BinaryTreeNode(1),
+        ...         right=BinaryTreeNode(3, right=BinaryTreeNode(3)),
+        ...     )
         ... )
-        >>> tree.balance()
-        >>> tree.height
+        >>> tree.count_range(2, 3)
+        3
+        >>> tree.count_range(3, 2)
+        0
+        """
+        return max(0, self._count_lower(hi, inclusive=True) - self.rank(lo))
+
+    def count(self, x: T) -> int:
+        """Number of copies of x in the tree, in O(height)
+
+        >>> BinarySearchTree.from_sorted([1, 2, 2, 3]).count(2)
         2
+        >>> BinarySearchTree.from_sorted([1, 2, 2, 3]).count(4)
+        0
+        """
+        return self.count_range(x, x)
 
-        Balancing an empty tree has no effect:
+    def distinct(self) -> Iterator[T]:
+        """Iterate in order through the values, once each
+
+        >>> tuple(BinarySearchTree.from_sorted([1, 2, 2, 3]).distinct())
+        (1, 2, 3)
+        """
+        for _, nodes in groupby(_in_order_nodes(self._root), key=attrgetter("key")):
+            yield next(nodes).val
+
+    def percentile(self, p: float) -> T:
+        """Smallest value with at least p percent of the values less or equal to it
 
         >>> tree = BinarySearchTree()
-        >>> tree.balance()
-        >>> tree.height
-        0
+        >>> for i in range(1, 11):
+        ...     tree.add(i)
+        >>> tree.percentile(0)
+        1
+        >>> tree.percentile(50)
+        5
+        >>> tree.percentile(90)
+        9
+        >>> tree.percentile(100)
+        10
+        >>> tree.percentile(101)
+        Traceback (most recent call last):
+            ...
+        ValueError: 101 is not a percentage between 0 and 100
         """
-        ordered_elements = tuple(self)
-        self._root = self._ordered_list_to_balanced_tree(
-            ordered_elements=ordered_elements,
-            start_index=0,
-            end_index=len(ordered_elements) - 1,
-        )
+        if not 0 <= p <= 100:
+            raise ValueError(f"{p} is not a percentage between 0 and 100")
+        return self.select(max(0, math.ceil(p * len(self) / 100) - 1))
 
-    def _ordered_list_to_balanced_tree(
+    def irange(
         self,
-        ordered_elements: tuple[T, ...],
-        start_index: int,
-        end_index: int,
-    ) -> BinaryTreeNode[T] | None:
-        if start_index > end_index:
-            return None
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[T]:
+        """Iterate in order through the values between lo and hi
 
-        middle_index = start_index + (end_index - start_index) // 2
-        root = BinaryTreeNode(ordered_elements[middle_index])
+        Subtrees out of the bounds are never visited, so it costs O(height + k)
+        to get k values. A missing bound means the range is not bounded there.
+
+        >>> tree = BinarySearchTree.from_sorted(range(10))
+        >>> tuple(tree.irange(3, 6))
+        (3, 4, 5, 6)
+        >>> tuple(tree.irange(3, 6, inclusive=(False, False)))
+        (4, 5)
+        >>> tuple(tree.irange(hi=2, reverse=True))
+        (2, 1, 0)
+        """
+        include_lo, include_hi = inclusive
+
+        def above_lo(key: Any) -> bool:
+            return lo is None or key > lo or (include_lo and key == lo)
+
+        def below_hi(key: Any) -> bool:
+            return hi is None or key < hi or (include_hi and key == hi)
+
+        # Walk towards the start of the range, pushing the nodes within it, as
+        # an in-order traversal would (mirrored when reversed)
+        first_in_range, last_in_range = above_lo, below_hi
+        if reverse:
+            first_in_range, last_in_range = below_hi, above_lo
+        multiset = self._multiset
+        stack: list[BinaryTreeNode[T]] = []
+        node = self._root
+        while True:
+            while node:
+                if first_in_range(node.key):
+                    stack.append(node)
+                    node = node.right if reverse else node.left
+                else:
+                    node = node.left if reverse else node.right
+            if not stack:
+                return
+            node = stack.pop()
+            if not last_in_range(node.key):
+                return
+            yield node.val
+            if multiset and node.count > 1:
+                yield from repeat(node.val, node.count - 1)
+            node = node.left if reverse else node.right
+
+    def iter_from(
+        self,
+        key: T,
+        reverse: bool = False,
+        inclusive: bool = True,
+    ) -> Iterator[T]:
+        """Iterate in order from key, to resume a previous iteration
+
+        The first value is found in O(height), without visiting the values
+        before it. When reversed, the iteration goes down from key.
+
+        >>> tree = BinarySearchTree.from_sorted(range(10))
+        >>> tuple(tree.iter_from(7))
+        (7, 8, 9)
+        >>> tuple(tree.iter_from(7, inclusive=False))
+        (8, 9)
+        >>> tuple(tree.iter_from(2, reverse=True))
+        (2, 1, 0)
+        """
+        if reverse:
+            return self.irange(hi=key, inclusive=(True, inclusive), reverse=True)
+        return self.irange(lo=key, inclusive=(inclusive, True))
+
+    def __reversed__(self) -> Iterator[T]:
+        """Iterate in descending order
+
+        >>> tuple(reversed(BinarySearchTree.from_sorted([1, 2, 3])))
+        (3, 2, 1)
+        """
+        return self.irange(reverse=True)
+
+    def iter_chunks(self, size: int) -> Iterator[list[T]]:
+        """Iterate in order through lists of up to size consecutive values
+
+        >>> tuple(BinarySearchTree.from_sorted(range(5)).iter_chunks(2))
+        ([0, 1], [2, 3], [4])
+        >>> next(BinarySearchTree().iter_chunks(0))
+        Traceback (most recent call last):
+            ...
+        ValueError: 0 is not a valid chunk size
+        """
+        if size < 1:
+            raise ValueError(f"{size} is not a valid chunk size")
+        chunk: list[T] = []
+        for node in self._in_order_copies(self._root):
+            chunk.append(node.val)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def min(self) -> T:
+        """Smallest value of the tree
+
+        >>> BinarySearchTree.from_sorted([1, 2, 3]).min()
+        1
+        >>> BinarySearchTree().min()
+        Traceback (most recent call last):
+            ...
+        ValueError: The tree is empty
+        """
+        node = self._root
+        if not node:
+            raise ValueError("The tree is empty")
+        while node.left:
+            node = node.left
+        return node.val
+
+    def max(self) -> T:
+        """Largest value of the tree
+
+        >>> BinarySearchTree.from_sorted([1, 2, 3]).max()
+        3
+        >>> BinarySearchTree().max()
+        Traceback (most recent call last):
+            ...
+        ValueError: The tree is empty
+        """
+        node = self._root
+        if not node:
+            raise ValueError("The tree is empty")
+        while node.right:
+            node = node.right
+        return node.val
+
+    def floor(self, x: T) -> T:
+        """Largest value of the tree smaller than or equal to x
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.floor(3)
+        3
+        >>> tree.floor(4)
+        3
+        >>> tree.floor(0)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is smaller than or equal to 0
+        """
+        node = self._closest(x, below=True, inclusive=True)
+        if not node:
+            raise ValueError(f"No value in the tree is smaller than or equal to {x}")
+        return node.val
+
+    def ceiling(self, x: T) -> T:
+        """Smallest value of the tree greater than or equal to x
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.ceiling(3)
+        3
+        >>> tree.ceiling(4)
+        5
+        >>> tree.ceiling(6)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than or equal to 6
+        """
+        node = self._closest(x, below=False, inclusive=True)
+        if not node:
+            raise ValueError(f"No value in the tree is greater than or equal to {x}")
+        return node.val
+
+    def predecessor(self, x: T) -> T:
+        """Largest value of the tree strictly smaller than x
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.predecessor(3)
+        1
+        >>> tree.predecessor(1)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is smaller than 1
+        """
+        node = self._closest(x, below=True, inclusive=False)
+        if not node:
+            raise ValueError(f"No value in the tree is smaller than {x}")
+        return node.val
+
+    def successor(self, x: T) -> T:
+        """Smallest value of the tree strictly greater than x
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.successor(3)
+        5
+        >>> tree.successor(5)
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than 5
+        """
+        node = self._closest(x, below=False, inclusive=False)
+        if not node:
+            raise ValueError(f"No value in the tree is greater than {x}")
+        return node.val
+
+    def _closest(
+        self,
+        x: Any,
+        *,
+        below: bool,
+        inclusive: bool,
+    ) -> BinaryTreeNode[T] | None:
+        closest = None
+        node = self._root
+        while node:
+            if inclusive and node.key == x:
+                return node
+            if below and node.key < x:
+                closest = node
+                node = node.right
+            elif not below and node.key > x:
+                closest = node
+                node = node.left
+            else:
+                node = node.left if below else node.right
+        return closest
+
+    def contains_many(self, values: Iterable[T]) -> Any:
+        """Check whether each of the given values is in the tree
+
+        NumPy arrays, and any other object supporting the buffer protocol, are
+        checked with vectorized operations when NumPy is installed, getting a
+        boolean NumPy array back. Other iterables get a list back.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.contains_many([0, 1, 5])
+        [False, True, True]
+        """
+        snapshot = self._sorted_keys_snapshot()
+        array = self._as_array(values)
+        if array is not None:
+            sorted_array = self._sorted_snapshot_array()
+            indexes = np.searchsorted(sorted_array, array, side="left")
+            found = indexes < len(sorted_array)
+            found[found] = sorted_array[indexes[found]] == array[found]
+            return found
+        result = []
+        for val in values:
+            i = bisect_left(snapshot, val)
+            result.append(i < len(snapshot) and snapshot[i] == val)
+        return result
+
+    def floor_many(self, values: Iterable[T], default: Any = None) -> Any:
+        """Largest value of the tree smaller than or equal to each given value
+
+        Works as contains_many with regard to vectorization. Values without a
+        floor get the default, or raise a ValueError if there is none.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.floor_many([1, 4, 10])
+        [1, 3, 5]
+        >>> tree.floor_many([0, 4], default=-1)
+        [-1, 3]
+        >>> tree.floor_many([0])
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is smaller than or equal to 0
+        """
+        return self._closest_many(values, default, below=True)
+
+    def ceiling_many(self, values: Iterable[T], default: Any = None) -> Any:
+        """Smallest value of the tree greater than or equal to each given value
+
+        Works as floor_many.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 3, 5])
+        >>> tree.ceiling_many([0, 4, 5])
+        [1, 5, 5]
+        >>> tree.ceiling_many([6], default=-1)
+        [-1]
+        >>> tree.ceiling_many([6])
+        Traceback (most recent call last):
+            ...
+        ValueError: No value in the tree is greater than or equal to 6
+        """
+        return self._closest_many(values, default, below=False)
+
+    def _closest_many(self, values: Iterable[T], default: Any, below: bool) -> Any:
+        comparison = "smaller" if below else "greater"
+        snapshot = self._sorted_snapshot()
+        keys = self._sorted_keys_snapshot()
+        array = self._as_array(values)
+        if array is not None:
+            sorted_array = self._sorted_snapshot_array()
+            if below:
+                indexes = np.searchsorted(sorted_array, array, side="right") - 1
+                missing = indexes < 0
+            else:
+                indexes = np.searchsorted(sorted_array, array, side="left")
+                missing = indexes >= len(sorted_array)
+            if missing.any() and default is None:
+                raise ValueError(
+                    "No value in the tree is "
+                    f"{comparison} than or equal to {array[missing][0]}"
+                )
+            if len(sorted_array) == 0:
+                return np.full(array.shape, default)
+            result = sorted_array[np.clip(indexes, 0, len(sorted_array) - 1)]
+            if missing.any():
+                result = np.where(missing, default, result)
+            return result
+        result = []
+        for val in values:
+            if below:
+                i = bisect_right(keys, val) - 1
+                found = i >= 0
+            else:
+                i = bisect_left(keys, val)
+                found = i < len(keys)
+            if found:
+                result.append(snapshot[i])
+            elif default is not None:
+                result.append(default)
+            else:
+                raise ValueError(
+                    f"No value in the tree is {comparison} than or equal to {val}"
+                )
+        return result
+
+    def _sorted_snapshot(self) -> list[T]:
+        """Values of the tree in order, cached until the tree changes"""
+        if self._snapshot_version != self._version:
+            nodes = list(self._in_order_copies(self._root))
+            self._snapshot = [node.val for node in nodes]
+            self._snapshot_keys = (
+                self._snapshot if self._key is None else [node.key for node in nodes]
+            )
+            self._snapshot_array = None
+            self._snapshot_version = self._version
+        return self._snapshot
+
+    def _sorted_keys_snapshot(self) -> Sequence[Any]:
+        """Keys of the values of the tree in order, cached as _sorted_snapshot"""
+        self._sorted_snapshot()
+        return self._snapshot_keys
+
+    def _sorted_snapshot_array(self) -> Any:
+        # Read once, as concurrent readers may reset it when refreshing
+        sorted_array = self._snapshot_array
+        if sorted_array is None:
+            sorted_array = self._snapshot_array = np.asarray(self._sorted_snapshot())
+        return sorted_array
+
+    def _as_array(self, values: Iterable[Any]) -> Any:
+        """NumPy array for the given values, if they should be vectorized
+
+        Only trees ordering values by themselves are searched this way.
+        """
+        if not _HAS_NUMPY or self._key is not None:
+            return None
+        if isinstance(values, np.ndarray):
+            return values
+        try:
+            memoryview(values)  # type: ignore[arg-type]
+        except TypeError:
+            return None
+        return np.asarray(values)
+
+    def _rebuild(
+        self,
+        ordered_elements: Sequence[T],
+        ordered_keys: Sequence[Any] | None = None,
+    ) -> None:
+        """Replace the values of the tree, building it balanced"""
+        self._replace_root(
+            self._ordered_list_to_balanced_tree(
+                ordered_elements=ordered_elements,
+                start_index=0,
+                end_index=len(ordered_elements) - 1,
+                ordered_keys=ordered_keys,
+            )
+        )
+
+    def _replace_root(self, root: BinaryTreeNode[T] | None) -> None:
+        """Replace the nodes of the tree with a balanced tree built for it"""
+        self._version += 1
+        self._root = root
+
+    def union(self: TreeT, other: Iterable[T]) -> TreeT:
+        """New tree with the values in this tree or in other
+
+        A value is kept as many times as it appears in whichever has more
+        copies of it, like the union of collections.Counter. Both trees are
+        walked in order side by side and the result is built balanced, in
+        O(n + m) time. Other iterables are sorted first. Also available as
+        the | operator.
+
+        >>> a = BinarySearchTree.from_sorted([1, 2, 2, 3])
+        >>> b = BinarySearchTree.from_sorted([2, 3, 3, 4])
+        >>> tuple(a.union(b))
+        (1, 2, 2, 3, 3, 4)
+        >>> tuple(a | b) == tuple(b | a)
+        True
+        """
+        return self._combined(other, _union_copies)
+
+    def intersection(self: TreeT, other: Iterable[T]) -> TreeT:
+        """New tree with the values both in this tree and in other
+
+        A value is kept as many times as it appears in whichever has fewer
+        copies of it. Also available as the & operator.
+
+        >>> a = BinarySearchTree.from_sorted([1, 2, 2, 3])
+        >>> b = BinarySearchTree.from_sorted([2, 2, 2, 4])
+        >>> tuple(a & b)
+        (2, 2)
+        """
+        return self._combined(other, _intersection_copies)
+
+    def difference(self: TreeT, other: Iterable[T]) -> TreeT:
+        """New tree with the values in this tree, less the copies in other
+
+        Each value in other takes away one copy of it, if any is left. Also
+        available as the - operator.
+
+        >>> a = BinarySearchTree.from_sorted([1, 2, 2, 3])
+        >>> b = BinarySearchTree.from_sorted([2, 3, 3, 4])
+        >>> tuple(a - b)
+        (1, 2)
+        """
+        return self._combined(other, _difference_copies)
+
+    def symmetric_difference(self: TreeT, other: Iterable[T]) -> TreeT:
+        """New tree with the copies of each value that only one of them has
+
+        A value is kept as many times as the difference between its number
+        of copies in this tree and in other. Also available as the ^ operator.
+
+        >>> a = BinarySearchTree.from_sorted([1, 2, 2, 3])
+        >>> b = BinarySearchTree.from_sorted([2, 3, 3, 4])
+        >>> tuple(a ^ b)
+        (1, 2, 3, 4)
+        """
+        return self._combined(other, _symmetric_difference_copies)
+
+    def _combined(
+        self: TreeT,
+        other: Iterable[T],
+        copies_kept: Callable[[int, int], int],
+    ) -> TreeT:
+        tree = type(self)(**self._constructor_kwargs())
+        tree._rebuild(*self._combined_values(other, copies_kept))
+        return tree
+
+    def _combined_values(
+        self,
+        other: Iterable[T],
+        copies_kept: Callable[[int, int], int],
+    ) -> tuple[list[T], list[Any]]:
+        """Values of the tree and other in order, as many times as copies_kept says
+
+        copies_kept gets the number of copies of a value in the tree and in
+        other. The copies kept are taken from the tree first. Values of other
+        are compared by the key function of the tree, and their keys are
+        returned along with the values.
+        """
+        combined: list[BinaryTreeNode[T]] = []
+        runs = _runs(self._in_order_copies(self._root))
+        other_runs = _runs(self._nodes_of(other))
+        run = next(runs, None)
+        other_run = next(other_runs, None)
+        while run is not None or other_run is not None:
+            if other_run is None or (run is not None and run[0].key < other_run[0].key):
+                copies, other_copies = run, []
+                run = next(runs, None)
+            elif run is None or other_run[0].key < run[0].key:
+                copies, other_copies = [], other_run
+                other_run = next(other_runs, None)
+            else:
+                copies, other_copies = run, other_run
+                run = next(runs, None)
+                other_run = next(other_runs, None)
+            assert copies is not None and other_copies is not None
+            kept = copies_kept(len(copies), len(other_copies))
+            combined.extend(islice(chain(copies, other_copies), kept))
+        return [node.val for node in combined], [node.key for node in combined]
+
+    def _nodes_of(self, other: Iterable[T]) -> Iterable[BinaryTreeNode[T]]:
+        """Nodes with the values of other in order, keyed as in this tree
+
+        Trees ordered by the same key give their own nodes, each repeated as
+        many times as the copies of its value.
+        """
+        if isinstance(other, BaseBinarySearchTree) and other._key is self._key:
+            return other._in_order_copies(other._root)
+        return (
+            BinaryTreeNode(val, key=key)
+            for val, key in zip(*self._sorted_with_keys(other))
+        )
+
+    def _sorted_with_keys(
+        self,
+        values: Iterable[T],
+    ) -> tuple[Sequence[T], Sequence[Any]]:
+        """Values sorted by the key function of the tree, and their keys"""
+        if self._key is None:
+            ordered_elements = sorted(values)
+            return ordered_elements, ordered_elements
+        keyed = sorted(((self._key(val), val) for val in values), key=itemgetter(0))
+        return [val for _, val in keyed], [key for key, _ in keyed]
+
+    def __or__(self: TreeT, other: object) -> TreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        return self.union(other)
+
+    def __and__(self: TreeT, other: object) -> TreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        return self.intersection(other)
+
+    def __sub__(self: TreeT, other: object) -> TreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        return self.difference(other)
+
+    def __xor__(self: TreeT, other: object) -> TreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        return self.symmetric_difference(other)
+
+    def _ordered_list_to_balanced_tree(
+        self,
+        ordered_elements: Sequence[T],
+        start_index: int,
+        end_index: int,
+        ordered_keys: Sequence[Any] | None = None,
+    ) -> BinaryTreeNode[T] | None:
+        if ordered_keys is None:
+            ordered_keys = self._keys_of(ordered_elements)
+        ordered_counts: Sequence[int] | None = None
+        if self._multiset:
+            ordered_elements, ordered_keys, ordered_counts = _collapsed(
+                islice(ordered_elements, start_index, end_index + 1),
+                islice(ordered_keys, start_index, end_index + 1),
+            )
+            start_index, end_index = 0, len(ordered_elements) - 1
+        return _balanced_subtree(
+            ordered_elements, ordered_keys, ordered_counts, start_index, end_index
+        )
+
+
+class BinarySearchTree(BaseBinarySearchTree[T]):
+    """Simple binary search tree implementation
+
+    >>> tree = BinarySearchTree()
+    >>> tree.add(1)
+    >>> tree.add(3)
+    >>> tree.add(2)
+    >>> tuple(tree)
+    (1, 2, 3)
+
+    It can be created from a binary tree represented by BinaryTreeNode:
+
+    >>> BinarySearchTree(
+    ...     BinaryTreeNode(
+    ...         2,
+    ...         left=BinaryTreeNode(1),
+    ...         right=BinaryTreeNode(3),
+    ...     )
+    ... )
+    <playground.tree.BinarySearchTree object at ...>
+
+    It allows duplicate values. For example:
+
+    >>> BinarySearchTree(BinaryTreeNode(1, left=BinaryTreeNode(1)))
+    <playground.tree.BinarySearchTree object at ...>
+
+    It does not allow instantiating an unsorted tree. For example:
+
+    >>> BinarySearchTree(BinaryTreeNode(1, left=BinaryTreeNode(2)))
+    Traceback (most recent call last):
+        ...
+    ValueError: Unsorted BinarySearchTree: 2 cannot be to the left of 1
+
+    By default, it is iterated depth-first in-order:
+
+    >>> tuple(
+    ...     BinarySearchTree(
+    ...         BinaryTreeNode(
+    ...             2,
+    ...             left=BinaryTreeNode(1),
+    ...             right=BinaryTreeNode(3),
+    ...         )
+    ...     )
+    ... )
+    (1, 2, 3)
+    """
+
+    def add(self, val: T) -> None:
+        """Add a value to the tree
+
+        >>> tree = BinarySearchTree()
+        >>> tree.add(1)
+        >>> tree.add(2)
+        >>> tree.add(3)
+        >>> tuple(tree)
+        (1, 2, 3)
+
+        Duplicates are allowed.
+
+        >>> tree = BinarySearchTree()
+        >>> tree.add(1)
+        >>> tree.add(1)
+        >>> tuple(tree)
+        (1, 1)
+
+        In a multiset, they only increase the count of the existing node:
+
+        >>> tree = BinarySearchTree(multiset=True)
+        >>> for val in (1, 1, 2, 1):
+        ...     tree.add(val)
+        >>> tuple(tree), tree.height
+        ((1, 1, 1, 2), 2)
+        """
+        self._add(val, val if self._key is None else self._key(val))
+
+    def _add(self, val: T, key: Any) -> None:
+        """Add a value whose key is already known"""
+        self._version += 1
+        if self._multiset and self._add_copy(key):
+            return
+        node = (
+            _CountedNode(val, key=key)
+            if self._multiset
+            else BinaryTreeNode(val, key=key)
+        )
+        if not self._root:
+            self._root = node
+            return
+        path = []
+        parent: BinaryTreeNode[T] | None = self._root
+        while parent:
+            path.append(parent)
+            parent.size += 1
+            parent = parent.left if parent.key > key else parent.right
+        if path[-1].key > key:
+            path[-1].left = node
+        else:
+            path[-1].right = node
+        self._rebalance_path(path)
+
+    def _add_copy(self, key: Any) -> bool:
+        """Count one more copy in the node with the given key, if there is one
+
+        Kept apart from add, so that trees that are not multisets do not pay
+        for comparing keys for equality on every level.
+        """
+        node = self._root
+        while node and node.key != key:
+            node = node.left if node.key > key else node.right
+        if not node:
+            return False
+        assert isinstance(node, _CountedNode)
+        node.count += 1
+        parent = self._root
+        while parent is not node:
+            assert parent is not None
+            parent.size += 1
+            parent = parent.left if parent.key > key else parent.right
+        node.size += 1
+        return True
+
+    def remove(self, val: T) -> None:
+        """Remove a value from the tree. Raises a ValueError if not present
+
+        >>> tree = BinarySearchTree(BinaryTreeNode(2, left=BinaryTreeNode(1)))
+        >>> tree.remove(1)
+        >>> tuple(tree)
+        (2,)
+        >>> tree.remove(2)
+        >>> tuple(tree)
+        ()
+        >>> tree.remove(3)
+        Traceback (most recent call last):
+            ...
+        ValueError: 3 is not contained in the tree
+        """
+        self._remove(val, all_copies=False)
+
+    def remove_all(self, val: T) -> None:
+        """Remove every copy of a value from the tree. ValueError if not present
+
+        It takes O(height) in a multiset, and removes the copies as a batch
+        otherwise.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2, 2, 2, 3], multiset=True)
+        >>> tree.remove_all(2)
+        >>> tuple(tree)
+        (1, 3)
+        """
+        if not self._multiset:
+            copies = self.count(val)
+            if not copies:
+                raise ValueError(f"{val} is not contained in the tree")
+            self._apply_batch([], [], [val] * copies)
+            return
+        self._remove(val, all_copies=True)
+
+    def _remove(self, val: T, all_copies: bool) -> None:
+        path = []
+        node = self._root
+        while node and node.key != val:
+            path.append(node)
+            node = node.left if node.key > val else node.right
+        if not node:
+            raise ValueError(f"{val} is not contained in the tree")
+        self._version += 1
+        removed = node.count if all_copies else 1
+        for ancestor in path:
+            ancestor.size -= removed
+        if removed < node.count:
+            # Only nodes of multisets hold several copies
+            assert isinstance(node, _CountedNode)
+            node.count -= removed
+            node.size -= removed
+            return
+
+        if node.left and node.right:
+            # Take the value of the in-order successor, and unlink that
+            # successor instead, as it has no left child. Its copies leave
+            # the subtrees it was in
+            node.size -= removed
+            path.append(node)
+            below_node = len(path)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
+            for ancestor in islice(path, below_node, None):
+                ancestor.size -= successor.count
+            node.val = successor.val
+            node.key = successor.key
+            if isinstance(node, _CountedNode):
+                node.count = successor.count
+            node = successor
+
+        child = node.left or node.right
+        if not path:
+            self._root = child
+            return
+        parent = path[-1]
+        if parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
+        self._rebalance_path(path)
+
+    def add_many(self, values: Iterable[T]) -> None:
+        """Add several values to the tree at once
+
+        Small batches are added one by one, while large ones are merged with
+        the values of the tree, which is rebuilt balanced in O(n + k).
+
+        >>> tree = BinarySearchTree.from_sorted([1, 5])
+        >>> tree.add_many([4, 2, 3])
+        >>> tuple(tree)
+        (1, 2, 3, 4, 5)
+        """
+        self._apply_batch(*self._sorted_with_keys(values), [])
+
+    def remove_many(self, values: Iterable[T]) -> None:
+        """Remove several values from the tree at once
+
+        If any value is not present, a ValueError is raised and the tree is
+        left unchanged.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2, 3, 4, 5])
+        >>> tree.remove_many([4, 2])
+        >>> tuple(tree)
+        (1, 3, 5)
+        >>> tree.remove_many([1, 2])
+        Traceback (most recent call last):
+            ...
+        ValueError: 2 is not contained in the tree
+        >>> tuple(tree)
+        (1, 3, 5)
+        """
+        self._apply_batch([], [], sorted(values))
+
+    def apply_batch(self, ops: Iterable[tuple[str, T]]) -> None:
+        """Apply several ("add", value) and ("remove", value) operations at once
+
+        The batch is applied as a whole: values are added first, so a value
+        added in the batch can be removed in the same batch. If any removed
+        value is not present, a ValueError is raised and the tree is left
+        unchanged.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2])
+        >>> tree.apply_batch([("remove", 3), ("add", 3), ("remove", 1)])
+        >>> tuple(tree)
+        (2,)
+        >>> tree.apply_batch([("update", 2)])
+        Traceback (most recent call last):
+            ...
+        ValueError: Unknown batch operation: update
+        """
+        adds = []
+        removes = []
+        for op, val in ops:
+            if op == "add":
+                adds.append(val)
+            elif op == "remove":
+                removes.append(val)
+            else:
+                raise ValueError(f"Unknown batch operation: {op}")
+        removes.sort()
+        self._apply_batch(*self._sorted_with_keys(adds), removes)
+
+    def _apply_batch(
+        self,
+        adds: Sequence[T],
+        add_keys: Sequence[Any],
+        removes: list[Any],
+    ) -> None:
+        """Add the values and remove the keys, both given in order"""
+        batch_size = len(adds) + len(removes)
+        if not batch_size:
+            return
+        # Rebuilding visits every node once, while each targeted operation
+        # visits a root-to-leaf path
+        final_size = len(self) + batch_size
+        targeted_cost = batch_size * max(self.height, final_size.bit_length())
+        rebuild_cost = _BATCH_REBUILD_COST * final_size
+        if targeted_cost > rebuild_cost:
+            self._merge_batch(adds, add_keys, removes)
+            return
+
+        added_index = 0
+        for val, group in groupby(removes):
+            while added_index < len(add_keys) and add_keys[added_index] < val:
+                added_index += 1
+            added = bisect_right(add_keys, val, lo=added_index) - added_index
+            if sum(1 for _ in group) > self.count_range(val, val) + added:
+                raise ValueError(f"{val} is not contained in the tree")
+        # Add the middle values first, so that sorted values do not end up
+        # forming a chain
+        for i in _balanced_order(range(len(adds))):
+            self._add(adds[i], add_keys[i])
+        for val in removes:
+            self.remove(val)
+
+    def _merge_batch(
+        self,
+        adds: Sequence[T],
+        add_keys: Sequence[Any],
+        removes: list[Any],
+    ) -> None:
+        self._rebuild(*self._merged(adds, add_keys, removes))
+
+    def _merged(
+        self,
+        adds: Sequence[T],
+        add_keys: Sequence[Any],
+        removes: list[Any],
+    ) -> tuple[list[T], list[Any]]:
+        """Values of the tree and adds in order, less removes, with their keys"""
+        merged = []
+        merged_keys = []
+        removed_index = 0
+        existing = ((node.key, node.val) for node in self._in_order_copies(self._root))
+        added = zip(add_keys, adds)
+        for key, val in heapq.merge(existing, added, key=itemgetter(0)):
+            if removed_index < len(removes):
+                if removes[removed_index] < key:
+                    break
+                if removes[removed_index] == key:
+                    removed_index += 1
+                    continue
+            merged.append(val)
+            merged_keys.append(key)
+        if removed_index < len(removes):
+            raise ValueError(f"{removes[removed_index]} is not contained in the tree")
+        return merged, merged_keys
+
+    def update(self, other: Iterable[T]) -> None:
+        """Replace this tree by its union with other. Also available as |=
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2])
+        >>> tree |= BinarySearchTree.from_sorted([2, 3])
+        >>> tuple(tree)
+        (1, 2, 3)
+        """
+        self._rebuild(*self._combined_values(other, _union_copies))
+
+    def intersection_update(self, other: Iterable[T]) -> None:
+        """Replace this tree by its intersection with other. Also available as &=
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2])
+        >>> tree &= BinarySearchTree.from_sorted([2, 3])
+        >>> tuple(tree)
+        (2,)
+        """
+        self._rebuild(*self._combined_values(other, _intersection_copies))
+
+    def difference_update(self, other: Iterable[T]) -> None:
+        """Replace this tree by its difference with other. Also available as -=
+
+        Unlike remove_many, values of other missing from the tree are ignored.
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2])
+        >>> tree -= BinarySearchTree.from_sorted([2, 3])
+        >>> tuple(tree)
+        (1,)
+        """
+        self._rebuild(*self._combined_values(other, _difference_copies))
+
+    def symmetric_difference_update(self, other: Iterable[T]) -> None:
+        """Replace this tree by its symmetric difference with other. Also ^=
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2])
+        >>> tree ^= BinarySearchTree.from_sorted([2, 3])
+        >>> tuple(tree)
+        (1, 3)
+        """
+        self._rebuild(*self._combined_values(other, _symmetric_difference_copies))
+
+    def __ior__(self: MutableTreeT, other: object) -> MutableTreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def __iand__(self: MutableTreeT, other: object) -> MutableTreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self: MutableTreeT, other: object) -> MutableTreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self: MutableTreeT, other: object) -> MutableTreeT:
+        if not isinstance(other, BaseBinarySearchTree):
+            return NotImplemented
+        self.symmetric_difference_update(other)
+        return self
+
+    def _rebalance_path(self, path: list[BinaryTreeNode[T]]) -> None:
+        """Update the nodes of a root-to-leaf path after an add or remove
+
+        Sizes must already be up to date. Heights are updated bottom-up,
+        letting subclasses restructure each subtree through _rebalance
+        """
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            previous_height = node.height
+            balanced = self._rebalance(node)
+            if balanced is not node:
+                if i == 0:
+                    self._root = balanced
+                elif path[i - 1].left is node:
+                    path[i - 1].left = balanced
+                else:
+                    path[i - 1].right = balanced
+            if balanced.height == previous_height:
+                # The ancestors are not affected by this change, as their sizes
+                # have already been updated while looking for the node
+                return
+
+    def _rebalance(self, node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+        _update(node)
+        return node
+
+    def balance(self, strategy: Literal["rebuild", "in_place"] = "rebuild") -> None:
+        """Balances this tree to have minimum height
+
+        The "rebuild" strategy copies the values in order and builds a new
+        tree from them. The "in_place" strategy (Day-Stout-Warren algorithm)
+        reuses the nodes through rotations, taking O(1) extra memory, though
+        the resulting shape may differ.
+
+        >>> tree = BinarySearchTree(
+        ...     BinaryTreeNode(
+        ...         1,
+        ...         right=BinaryTreeNode(
+        ...             2,
+        ...             right=BinaryTreeNode(3),
+        ...         ),
+        ...     ),
+        ... )
+        >>> tree.balance()
+        >>> tree.height
+        2
+
+        Balancing an empty tree has no effect:
+
+        >>> tree = BinarySearchTree()
+        >>> tree.balance()
+        >>> tree.height
+        0
+
+        >>> tree = BinarySearchTree.from_sorted([1, 2, 3])
+        >>> tree.balance("in_place")
+        >>> tree.balance("other")
+        Traceback (most recent call last):
+            ...
+        ValueError: Unknown balance strategy: other
+        """
+        if strategy == "in_place":
+            self._version += 1
+            self._balance_in_place()
+            return
+        if strategy != "rebuild":
+            raise ValueError(f"Unknown balance strategy: {strategy}")
+        nodes = tuple(self._in_order_copies(self._root))
+        self._rebuild([node.val for node in nodes], [node.key for node in nodes])
+
+    def _balance_in_place(self) -> None:
+        if not self._root:
+            return
+        pseudo_root = BinaryTreeNode(self._root.val, right=self._root)
+
+        # Turn the tree into a vine: a chain of right children, counting its
+        # nodes, which are fewer than the values in a multiset
+        size = 0
+        tail = pseudo_root
+        rest = tail.right
+        while rest:
+            if rest.left:
+                rest = _rotate_right(rest)
+                tail.right = rest
+            else:
+                tail = rest
+                rest = rest.right
+                size += 1
+
+        # Fold the vine into a balanced tree, by rotating every other node of
+        # it to the left. The first pass leaves the extra values as leaves
+        full_tree_size = (1 << ((size + 1).bit_length() - 1)) - 1
+        self._compress_vine(pseudo_root, size - full_tree_size)
+        while full_tree_size > 1:
+            full_tree_size //= 2
+            self._compress_vine(pseudo_root, full_tree_size)
+        assert pseudo_root.right is not None
+        self._root = pseudo_root.right
+
+        # Nodes rotated out of the vine got their final height then, but the
+        # ones left on it need updating, bottom-up. It is walked backwards by
+        # reversing its links, and restoring them on the way
+        reversed_vine: BinaryTreeNode[T] | None = None
+        node: BinaryTreeNode[T] | None = self._root
+        while node:
+            node.right, reversed_vine, node = reversed_vine, node, node.right
+        below = None
+        while reversed_vine:
+            above = reversed_vine.right
+            reversed_vine.right = below
+            _update(reversed_vine)
+            below, reversed_vine = reversed_vine, above
+
+    def _compress_vine(self, pseudo_root: BinaryTreeNode[T], count: int) -> None:
+        scanner = pseudo_root
+        for _ in range(count):
+            assert scanner.right is not None
+            scanner.right = _rotate_left(scanner.right)
+            scanner = scanner.right
+
+
+def _middle(start: int, end: int) -> int:
+    """Index of the root of the balanced subtree built from a range"""
+    return start + (end - start) // 2
+
+
+def _balanced_subtree(
+    ordered_elements: Sequence[T],
+    ordered_keys: Sequence[Any],
+    ordered_counts: Sequence[int] | None,
+    start_index: int,
+    end_index: int,
+) -> BinaryTreeNode[T] | None:
+    """Balanced subtree of the elements between both indexes, inclusive
+
+    The copies of each element are given by ordered_counts, if any.
+    """
+    # Each range is visited twice: first to schedule building its left and
+    # right subtrees, and then to join them under the middle element
+    ranges = [(start_index, end_index, False)]
+    subtrees: list[BinaryTreeNode[T] | None] = []
+    while ranges:
+        start, end, children_built = ranges.pop()
+        if start > end:
+            subtrees.append(None)
+            continue
+        middle = _middle(start, end)
+        if children_built:
+            right = subtrees.pop()
+            left = subtrees.pop()
+            subtrees.append(
+                BinaryTreeNode(
+                    ordered_elements[middle],
+                    left=left,
+                    right=right,
+                    key=ordered_keys[middle],
+                )
+                if ordered_counts is None
+                else _CountedNode(
+                    ordered_elements[middle],
+                    left=left,
+                    right=right,
+                    key=ordered_keys[middle],
+                    count=ordered_counts[middle],
+                )
+            )
+        else:
+            ranges.append((start, end, True))
+            ranges.append((middle + 1, end, False))
+            ranges.append((start, middle - 1, False))
+    return subtrees.pop()
+
+
+def _tree_from_sorted(
+    cls: type[TreeT],
+    values: Sequence[Any],
+    kwargs: dict[str, Any],
+) -> TreeT:
+    return cls.from_sorted(values, validate=False, **kwargs)
+
+
+def _dump_typecode(values: Iterable[Any]) -> bytes:
+    """Fixed-width encoding fitting all the values, or b"p" to pickle them"""
+    typecode = None
+    for val in values:
+        if type(val) is int and _INT64_MIN <= val <= _INT64_MAX:
+            val_typecode = b"q"
+        elif type(val) is float:
+            val_typecode = b"d"
+        else:
+            return b"p"
+        if typecode is None:
+            typecode = val_typecode
+        elif typecode != val_typecode:
+            return b"p"
+    return typecode or b"q"
+
+
+def _balanced_order(ordered_elements: Sequence[T]) -> Iterator[T]:
+    """Pre-order of the elements in the balanced tree built from them"""
+    ranges = [(0, len(ordered_elements) - 1)]
+    while ranges:
+        start, end = ranges.pop()
+        if start > end:
+            continue
+        middle = start + (end - start) // 2
+        yield ordered_elements[middle]
+        ranges.append((middle + 1, end))
+        ranges.append((start, middle - 1))
+
+
+def _runs(
+    ordered_nodes: Iterable[BinaryTreeNode[T]],
+) -> Iterator[list[BinaryTreeNode[T]]]:
+    """Lists of the consecutive nodes with equal keys"""
+    return (list(run) for _, run in groupby(ordered_nodes, key=attrgetter("key")))
+
+
+# Copies of a value kept by each set operation, given the number of copies in
+# each operand, as collections.Counter does
+_union_copies = max
+_intersection_copies = min
+
+
+def _difference_copies(copies: int, other_copies: int) -> int:
+    return max(0, copies - other_copies)
+
+
+def _symmetric_difference_copies(copies: int, other_copies: int) -> int:
+    return abs(copies - other_copies)
+
+
+def _is_avl_balanced(root: BinaryTreeNode[Any] | None) -> bool:
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if abs(_height(node.left) - _height(node.right)) > 1:
+            return False
+        stack.append(node.left)
+        stack.append(node.right)
+    return True
+
+
+def _rotate_left(node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+    pivot = node.right
+    assert pivot is not None
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_right(node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+    pivot = node.left
+    assert pivot is not None
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+class AVLBinarySearchTree(BinarySearchTree[T]):
+    """Binary search tree that rebalances itself on every add and remove
+
+    The height of sibling subtrees never differs by more than one (AVL
+    invariant), so the height of the tree stays O(log n) even when the values
+    are added in sorted order:
+
+    >>> tree = AVLBinarySearchTree()
+    >>> for i in range(1, 8):
+    ...     tree.add(i)
+    >>> tuple(tree)
+    (1, 2, 3, 4, 5, 6, 7)
+    >>> tree.height
+    3
+    >>> tuple(tree.breadth_first_iterator())
+    (4, 2, 6, 1, 3, 5, 7)
+
+    Removing values rebalances it as well:
+
+    >>> tree.remove(1)
+    >>> tree.remove(3)
+    >>> tree.remove(2)
+    >>> tuple(tree.breadth_first_iterator())
+    (6, 4, 7, 5)
+
+    A tree that does not satisfy the AVL invariant is balanced on creation:
+
+    >>> AVLBinarySearchTree(
+    ...     BinaryTreeNode(1, right=BinaryTreeNode(2, right=BinaryTreeNode(3)))
+    ... ).height
+    2
+    """
+
+    def __init__(
+        self,
+        root: BinaryTreeNode[T] | None = None,
+        *,
+        key: Callable[[T], Any] | None = None,
+        multiset: bool = False,
+    ) -> None:
+        super().__init__(root, key=key, multiset=multiset)
+        if not _is_avl_balanced(self._root):
+            self.balance()
+
+    def _rebalance(self, node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+        _update(node)
+        balance_factor = _height(node.left) - _height(node.right)
+        if balance_factor > 1:
+            assert node.left is not None
+            if _height(node.left.left) < _height(node.left.right):
+                node.left = _rotate_left(node.left)
+            return _rotate_right(node)
+        if balance_factor < -1:
+            assert node.right is not None
+            if _height(node.right.right) < _height(node.right.left):
+                node.right = _rotate_right(node.right)
+            return _rotate_left(node)
+        return node
+
+
+class ScapegoatBinarySearchTree(BinarySearchTree[T]):
+    """Binary search tree that rebuilds its unbalanced subtrees
+
+    Instead of rotating on every change, the smallest subtree on the path of
+    an added value that grows taller than its height budget is rebuilt
+    balanced. A subtree of n values is allowed a height of log_{1/alpha}(n) + 1,
+    so alpha, between 0.5 and 1, trades faster lookups (lower alpha) for fewer
+    rebuilds (higher alpha). The whole tree is rebuilt when removals shrink it
+    below alpha times its largest size since the last full rebuild. Updates
+    take amortized O(log n) time.
+
+    >>> tree = ScapegoatBinarySearchTree(alpha=0.5)
+    >>> for i in range(1, 8):
+    ...     tree.add(i)
+    >>> tuple(tree)
+    (1, 2, 3, 4, 5, 6, 7)
+    >>> tree.height
+    3
+
+    >>> ScapegoatBinarySearchTree(alpha=1)
+    Traceback (most recent call last):
+        ...
+    ValueError: alpha must be between 0.5 and 1, not 1
+    """
+
+    def __init__(
+        self,
+        root: BinaryTreeNode[T] | None = None,
+        *,
+        alpha: float = 0.7,
+        key: Callable[[T], Any] | None = None,
+        multiset: bool = False,
+    ) -> None:
+        if not 0.5 <= alpha < 1:
+            raise ValueError(f"alpha must be between 0.5 and 1, not {alpha}")
+        self._alpha = alpha
+        self._log_inverse_alpha = math.log(1 / alpha)
+        super().__init__(root, key=key, multiset=multiset)
+        if self.height > self._height_budget(len(self)):
+            self.balance()
+        self._max_size = len(self)
+
+    @property
+    def alpha(self) -> float:
+        """Balance parameter, between 0.5 and 1, given on creation"""
+        return self._alpha
+
+    def _constructor_kwargs(self) -> dict[str, Any]:
+        return {**super()._constructor_kwargs(), "alpha": self._alpha}
+
+    def _height_budget(self, size: int) -> int:
+        # The small epsilon keeps exact powers of 1 / alpha within the budget
+        return int(math.log(size) / self._log_inverse_alpha + 1e-9) + 1 if size else 0
+
+    def _add(self, val: T, key: Any) -> None:
+        super()._add(val, key)
+        self._max_size = max(self._max_size, len(self))
+
+    def _remove(self, val: T, all_copies: bool) -> None:
+        super()._remove(val, all_copies)
+        if len(self) < self._alpha * self._max_size:
+            self.balance()
+
+    def _replace_root(self, root: BinaryTreeNode[T] | None) -> None:
+        super()._replace_root(root)
+        self._max_size = len(self)
+
+    def _balance_in_place(self) -> None:
+        super()._balance_in_place()
+        self._max_size = len(self)
+
+    def _rebalance(self, node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+        _update(node)
+        if node.height <= self._height_budget(node.size):
+            return node
+        nodes = list(self._in_order_copies(node))
+        rebuilt = self._ordered_list_to_balanced_tree(
+            ordered_elements=[node.val for node in nodes],
+            start_index=0,
+            end_index=len(nodes) - 1,
+            ordered_keys=[node.key for node in nodes],
+        )
+        assert rebuilt is not None
+        return rebuilt
+
+
+class PersistentBinarySearchTree(BaseBinarySearchTree[T]):
+    """Immutable binary search tree, whose updates return a new version
+
+    Adding or removing a value copies only the nodes on the path to it, and
+    the new version shares every other node with the previous one. Versions
+    never change, so any of them can be read (for example, iterated by
+    another thread) while newer versions are being created, and keeping a
+    snapshot costs O(1). It is kept balanced like AVLBinarySearchTree, so
+    each update creates O(log n) nodes.
+
+    >>> tree = PersistentBinarySearchTree.from_sorted([1, 2, 3])
+    >>> updated = tree.add(4).remove(1)
+    >>> tuple(updated)
+    (2, 3, 4)
+    >>> tuple(tree)
+    (1, 2, 3)
+
+    The nodes it is created from must not be changed afterwards.
+    """
+
+    def __init__(
+        self,
+        root: BinaryTreeNode[T] | None = None,
+        *,
+        key: Callable[[T], Any] | None = None,
+    ) -> None:
+        super().__init__(root, key=key)
+        if not _is_avl_balanced(self._root):
+            self._rebuild(tuple(self))
+
+    def _new_version(
+        self: PersistentTreeT, root: BinaryTreeNode[T] | None
+    ) -> PersistentTreeT:
+        tree = type(self)(**self._constructor_kwargs())
+        tree._root = root
+        return tree
+
+    def add(self: PersistentTreeT, val: T) -> PersistentTreeT:
+        """New version of the tree with the value added. Duplicates are allowed
+
+        >>> tree = PersistentBinarySearchTree()
+        >>> tuple(tree.add(1).add(1))
+        (1, 1)
+        """
+        key = val if self._key is None else self._key(val)
+        path = []
+        node = self._root
+        while node:
+            went_left = node.key > key
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+        return self._new_version(_copy_path(path, BinaryTreeNode(val, key=key)))
+
+    def remove(self: PersistentTreeT, val: T) -> PersistentTreeT:
+        """New version of the tree with the value removed
+
+        >>> tree = PersistentBinarySearchTree.from_sorted([1, 2])
+        >>> tuple(tree.remove(1))
+        (2,)
+        >>> tree.remove(3)
+        Traceback (most recent call last):
+            ...
+        ValueError: 3 is not contained in the tree
+        """
+        path = []
+        node = self._root
+        while node and node.key != val:
+            went_left = node.key > val
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+        if not node:
+            raise ValueError(f"{val} is not contained in the tree")
+        if not (node.left and node.right):
+            return self._new_version(_copy_path(path, node.left or node.right))
+
+        # The copy of the node takes the value of its in-order successor,
+        # which is unlinked instead, as it has no left child
+        removed = node
+        path.append((node, False))
+        successor = node.right
+        while successor.left:
+            path.append((successor, True))
+            successor = successor.left
+        root = _copy_path(path, successor.right, (removed, successor))
+        return self._new_version(root)
+
+
+def _copy_path(
+    path: list[tuple[BinaryTreeNode[T], bool]],
+    subtree: BinaryTreeNode[T] | None,
+    replaced: tuple[BinaryTreeNode[T], BinaryTreeNode[T]] | None = None,
+) -> BinaryTreeNode[T] | None:
+    """Copy a root-to-leaf path bottom-up, with a new subtree at its end
+
+    Each entry of the path tells whether it went left from that node. The
+    copies are balanced like AVL trees, without changing any existing node.
+    replaced optionally gives a node of the path whose copy takes the value
+    (and key) of another node.
+    """
+    for node, went_left in reversed(path):
+        source = replaced[1] if replaced and replaced[0] is node else node
+        val, key = source.val, source.key
+        if went_left:
+            copy = BinaryTreeNode(val, left=subtree, right=node.right, key=key)
+        else:
+            copy = BinaryTreeNode(val, left=node.left, right=subtree, key=key)
+        subtree = _avl_balanced_copy(copy)
+    return subtree
+
+
+def _avl_balanced_copy(node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+    """Node with the AVL invariant restored by copying, rather than rotating"""
+    balance_factor = _height(node.left) - _height(node.right)
+    if balance_factor > 1:
+        left = node.left
+        assert left is not None
+        if _height(left.left) < _height(left.right):
+            left = _rotated_left(left)
+        return _rotated_right(
+            BinaryTreeNode(node.val, left=left, right=node.right, key=node.key)
+        )
+    if balance_factor < -1:
+        right = node.right
+        assert right is not None
+        if _height(right.right) < _height(right.left):
+            right = _rotated_right(right)
+        return _rotated_left(
+            BinaryTreeNode(node.val, left=node.left, right=right, key=node.key)
+        )
+    return node
+
+
+def _rotated_left(node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+    pivot = node.right
+    assert pivot is not None
+    left = BinaryTreeNode(node.val, left=node.left, right=pivot.left, key=node.key)
+    return BinaryTreeNode(pivot.val, left=left, right=pivot.right, key=pivot.key)
 
-        root.left = self._ordered_list_to_balanced_tree(
-            ordered_elements=ordered_elements,
-            start_index=start_index,
-            end_index=middle_index - 1,
-        )
-        root.right = self._ordered_list_to_balanced_tree(
-            ordered_elements=ordered_elements,
-            start_index=middle_index + 1,
-            end_index=end_index,
-        )
 
-        return root
+def _rotated_right(node: BinaryTreeNode[T]) -> BinaryTreeNode[T]:
+    pivot = node.left
+    assert pivot is not None
+    right = BinaryTreeNode(node.val, left=pivot.right, right=node.right, key=node.key)
+    return BinaryTreeNode(pivot.val, left=pivot.left, right=right, key=pivot.key)
@@ -0,0 +1,292 @@
+"""Sorted map built on a Binary Search Tree of (key, value) items"""
+
+import copy
+import heapq
+from collections.abc import (
+    ItemsView,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    ValuesView,
+)
+from operator import itemgetter
+from typing import Any, Generic, TypeVar
+
+from playground.tree import (
+    _BATCH_REBUILD_COST,
+    BinarySearchTree,
+    BinaryTreeNode,
+    _Comparable,
+)
+
+K = TypeVar("K", bound=_Comparable)
+V = TypeVar("V")
+TreeMapT = TypeVar("TreeMapT", bound="BinarySearchTreeMap[Any, Any]")
+
+# Items are ordered by their key. A module-level function, so that maps can
+# be pickled
+_item_key = itemgetter(0)
+
+
+class BinarySearchTreeMap(MutableMapping[K, V], Generic[K, V]):
+    """Mapping whose keys are kept sorted in a binary search tree
+
+    Getting, setting and deleting a key costs O(height). Keys, values and
+    items are iterated in key order, and items can be sliced by key range.
+
+    >>> prices = BinarySearchTreeMap({"pear": 3, "apple": 2, "fig": 5})
+    >>> list(prices)
+    ['apple', 'fig', 'pear']
+    >>> prices["fig"]
+    5
+    >>> prices["kiwi"] = 4
+    >>> prices["b":"l"]
+    [('fig', 5), ('kiwi', 4)]
+    >>> del prices["pear"]
+    >>> list(prices.items())
+    [('apple', 2), ('fig', 5), ('kiwi', 4)]
+
+    The items are stored in a tree of the given class, such as
+    AVLBinarySearchTree to keep it balanced on every change. Other keyword
+    arguments are passed to it.
+    """
+
+    def __init__(
+        self,
+        items: Mapping[K, V] | Iterable[tuple[K, V]] = (),
+        *,
+        tree_class: type[BinarySearchTree[Any]] = BinarySearchTree,
+        **kwargs: Any,
+    ) -> None:
+        self._tree: BinarySearchTree[Any] = tree_class(key=_item_key, **kwargs)
+        self.update(items)
+
+    @classmethod
+    def from_sorted(
+        cls: type[TreeMapT],
+        items: Iterable[tuple[K, V]],
+        *,
+        validate: bool = True,
+        **kwargs: Any,
+    ) -> TreeMapT:
+        """Build a balanced map from items sorted by key in O(n)
+
+        >>> BinarySearchTreeMap.from_sorted([(1, "a"), (2, "b")])[2]
+        'b'
+        >>> BinarySearchTreeMap.from_sorted([(1, "a"), (1, "b")])
+        Traceback (most recent call last):
+            ...
+        ValueError: Unsorted keys: 1 cannot come after 1
+
+        Other keyword arguments are passed to the constructor.
+        """
+        ordered_items = list(items)
+        if validate:
+            for (previous, _), (current, _) in zip(ordered_items, ordered_items[1:]):
+                if not previous < current:
+                    raise ValueError(
+                        f"Unsorted keys: {current} cannot come after {previous}"
+                    )
+        tree_map = cls(**kwargs)
+        tree_map._tree._rebuild(ordered_items)
+        return tree_map
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError("Key ranges cannot have a step")
+            return list(self.irange_items(key.start, key.stop, (True, False)))
+        node = self._node(key)
+        if node is None:
+            raise KeyError(key)
+        return node.val[1]
+
+    def _node(self, key: object) -> BinaryTreeNode[Any] | None:
+        """Node of the item with the given key, or None if there is none
+
+        Keys equal to it match even if of another type, as they would in a
+        dict. Keys that cannot be compared to the ones in the map never do.
+        """
+        try:
+            node = self._tree._closest(key, below=True, inclusive=True)
+        except TypeError:
+            return None
+        return node if node is not None and node.key == key else None
+
+    def __setitem__(self, key: K, value: V) -> None:
+        node = self._node(key)
+        if node is None:
+            self._tree.add((key, value))
+            return
+        # The key given when the item was first set is kept, as dict does
+        self._tree._version += 1
+        node.val = (node.val[0], value)
+
+    def __delitem__(self, key: K) -> None:
+        if self._node(key) is None:
+            raise KeyError(key)
+        self._tree.remove(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self._node(key) is not None
+
+    def __iter__(self) -> Iterator[K]:
+        return (key for key, _ in self._tree)
+
+    def __reversed__(self) -> Iterator[K]:
+        return (key for key, _ in reversed(self._tree))
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    def __copy__(self: TreeMapT) -> TreeMapT:
+        tree_map = type(self).__new__(type(self))
+        tree_map._tree = copy.copy(self._tree)
+        return tree_map
+
+    def copy(self: TreeMapT) -> TreeMapT:
+        """Shallow copy of the map, balanced"""
+        return copy.copy(self)
+
+    def items(self) -> ItemsView[K, V]:
+        """Items in key order, without looking each key up"""
+        return _ItemsView(self)
+
+    def values(self) -> ValuesView[V]:
+        """Values in key order, without looking each key up"""
+        return _ValuesView(self)
+
+    def update(self, other: Any = (), /, **kwargs: V) -> None:
+        """Set several items at once, like dict.update
+
+        Large batches are merged with the items of the map, which is rebuilt
+        balanced in O(n + k), as BinarySearchTree.add_many does.
+
+        >>> tree_map = BinarySearchTreeMap({1: "a", 3: "c"})
+        >>> tree_map.update([(2, "b"), (3, "C")])
+        >>> list(tree_map.items())
+        [(1, 'a'), (2, 'b'), (3, 'C')]
+        """
+        new_items = list(other.items() if hasattr(other, "keys") else other)
+        new_items.extend(kwargs.items())  # type: ignore[arg-type]
+        if not new_items:
+            return
+        # Sorting is stable, so the last item set for a key comes last
+        new_items.sort(key=_item_key)
+        tree = self._tree
+        final_size = len(tree) + len(new_items)
+        targeted_cost = len(new_items) * max(tree.height, final_size.bit_length())
+        if targeted_cost <= _BATCH_REBUILD_COST * final_size:
+            for key, value in new_items:
+                self[key] = value
+            return
+        merged: list[tuple[K, V]] = []
+        # On equal keys, merge takes the items of the map first, so each one
+        # replaces the previous item with its key
+        for item in heapq.merge(tree, new_items, key=_item_key):
+            if merged and merged[-1][0] == item[0]:
+                merged[-1] = item
+            else:
+                merged.append(item)
+        tree._rebuild(merged)
+
+    def balance(self) -> None:
+        """Balance the tree holding the items to have minimum height
+
+        >>> tree_map = BinarySearchTreeMap()
+        >>> for key in range(7):
+        ...     tree_map[key] = str(key)
+        >>> tree_map.height
+        7
+        >>> tree_map.balance()
+        >>> tree_map.height
+        3
+        """
+        self._tree.balance()
+
+    @property
+    def height(self) -> int:
+        """1-based height of the tree holding the items"""
+        return self._tree.height
+
+    def irange(
+        self,
+        lo: K | None = None,
+        hi: K | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[K]:
+        """Iterate in order through the keys between lo and hi. See irange_items
+
+        >>> tuple(BinarySearchTreeMap.fromkeys(range(10)).irange(3, 6))
+        (3, 4, 5, 6)
+        """
+        return (key for key, _ in self.irange_items(lo, hi, inclusive, reverse))
+
+    def irange_items(
+        self,
+        lo: K | None = None,
+        hi: K | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[K, V]]:
+        """Iterate in order through the items with keys between lo and hi
+
+        It costs O(height + k) to get k items. A missing bound means the range
+        is not bounded there. Slicing the map, as in tree_map[lo:hi], gets a
+        list of the items from lo, inclusive, to hi, exclusive.
+
+        >>> tree_map = BinarySearchTreeMap({1: "a", 2: "b", 3: "c"})
+        >>> tuple(tree_map.irange_items(2, reverse=True))
+        ((3, 'c'), (2, 'b'))
+        """
+        return self._tree.irange(lo, hi, inclusive, reverse)
+
+    def floor_item(self, key: K) -> tuple[K, V]:
+        """Item with the largest key smaller than or equal to the given one
+
+        >>> BinarySearchTreeMap({1: "a", 3: "c"}).floor_item(2)
+        (1, 'a')
+        """
+        item: tuple[K, V] = self._tree.floor(key)
+        return item
+
+    def ceiling_item(self, key: K) -> tuple[K, V]:
+        """Item with the smallest key greater than or equal to the given one
+
+        >>> BinarySearchTreeMap({1: "a", 3: "c"}).ceiling_item(2)
+        (3, 'c')
+        """
+        item: tuple[K, V] = self._tree.ceiling(key)
+        return item
+
+    @classmethod
+    def fromkeys(
+        cls: type[TreeMapT],
+        keys: Iterable[K],
+        value: Any = None,
+        **kwargs: Any,
+    ) -> TreeMapT:
+        """Map with the given keys, all set to value, like dict.fromkeys"""
+        return cls(((key, value) for key in keys), **kwargs)
+
+
+class _ItemsView(ItemsView[K, V]):
+    _mapping: BinarySearchTreeMap[K, V]
+
+    def __iter__(self) -> Iterator[tuple[K, V]]:
+        return iter(self._mapping._tree)
+
+    def __reversed__(self) -> Iterator[tuple[K, V]]:
+        return reversed(self._mapping._tree)
+
+
+class _ValuesView(ValuesView[V]):
+    _mapping: BinarySearchTreeMap[Any, V]
+
+    def __iter__(self) -> Iterator[V]:
+        return (value for _, value in self._mapping._tree)
+
+    def __reversed__(self) -> Iterator[V]:
+        return (value for _, value in reversed(self._mapping._tree))
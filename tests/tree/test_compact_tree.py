@@ -0,0 +1,139 @@
+"""Binary Search Tree module to test the array-backed compact tree"""
+
+import random
+
+import pytest
+
+from playground.compact_tree import CompactBinarySearchTree
+from playground.tree import BinarySearchTree, BinaryTreeNode
+
+
+def test_nodes_have_no_instance_dict():
+    assert not hasattr(BinaryTreeNode(1), "__dict__")
+
+
+def test_empty_tree():
+    tree: CompactBinarySearchTree[int] = CompactBinarySearchTree()
+    assert len(tree) == 0
+    assert tree.height == 0
+    assert tuple(tree) == ()
+    assert tuple(tree.breadth_first_iterator()) == ()
+    assert tuple(tree.depth_first_pre_order_iterator()) == ()
+    assert tuple(tree.depth_first_post_order_iterator()) == ()
+    assert 1 not in tree
+
+
+def test_cannot_contain_an_element_of_different_type():
+    tree = CompactBinarySearchTree.from_sorted([1])
+    assert "1" not in tree
+    assert None not in tree
+
+
+def test_same_behavior_as_binary_search_tree():
+    rng = random.Random(11)
+    compact: CompactBinarySearchTree[int] = CompactBinarySearchTree()
+    reference: BinarySearchTree[int] = BinarySearchTree()
+    for _ in range(3_000):
+        val = rng.randrange(300)
+        if len(reference) and rng.random() < 0.4:
+            if val in reference:
+                compact.remove(val)
+                reference.remove(val)
+            else:
+                with pytest.raises(ValueError):
+                    compact.remove(val)
+        else:
+            compact.add(val)
+            reference.add(val)
+        assert len(compact) == len(reference)
+    assert compact.height == reference.height
+    for name in (
+        "breadth_first_iterator",
+        "depth_first_pre_order_iterator",
+        "depth_first_in_order_iterator",
+        "depth_first_post_order_iterator",
+    ):
+        assert tuple(getattr(compact, name)()) == tuple(getattr(reference, name)())
+    for val in range(-1, 301):
+        assert (val in compact) == (val in reference)
+
+
+def test_removed_slots_are_reused():
+    tree = CompactBinarySearchTree.from_sorted(range(10))
+    for val in range(5):
+        tree.remove(val)
+    for val in range(5):
+        tree.add(val)
+    assert len(tree._values) == 10
+    assert tuple(tree) == tuple(range(10))
+
+
+def test_balance_keeps_shape_of_binary_search_tree():
+    values = [5, 3, 9, 1, 2, 8, 7, 7, 0]
+    compact = CompactBinarySearchTree.from_iterable(values)
+    reference = BinarySearchTree.from_iterable(values)
+    compact.add(10)
+    reference.add(10)
+    compact.balance()
+    reference.balance()
+    assert tuple(compact.breadth_first_iterator()) == tuple(
+        reference.breadth_first_iterator()
+    )
+
+
+def test_from_sorted_rejects_unsorted_values():
+    with pytest.raises(ValueError):
+        CompactBinarySearchTree.from_sorted([2, 1])
+
+
+def test_float_values():
+    tree = CompactBinarySearchTree.from_iterable([0.5, -1.5, 2.25], typecode="d")
+    assert tuple(tree) == (-1.5, 0.5, 2.25)
+    assert 0.5 in tree
+
+
+def test_lookups_match_binary_search_tree():
+    rng = random.Random(6)
+    values = [rng.randrange(100) for _ in range(200)]
+    compact = CompactBinarySearchTree.from_iterable(values[:100])
+    reference = BinarySearchTree.from_iterable(values[:100])
+    # Added one by one, so that the tree is not perfectly balanced
+    for val in values[100:]:
+        compact.add(val)
+        reference.add(val)
+    assert compact.min() == reference.min() and compact.max() == reference.max()
+    assert tuple(reversed(compact)) == tuple(reversed(reference))
+    for k in range(-len(reference), len(reference)):
+        assert compact.select(k) == reference.select(k)
+    for p in (0, 12.5, 50, 99, 100):
+        assert compact.percentile(p) == reference.percentile(p)
+    for x in range(-1, 102):
+        assert compact.rank(x) == reference.rank(x)
+        assert compact.count(x) == reference.count(x)
+        assert compact.count_range(x, x + 10) == reference.count_range(x, x + 10)
+        for method in ("floor", "ceiling", "predecessor", "successor"):
+            try:
+                expected = getattr(reference, method)(x)
+            except ValueError:
+                with pytest.raises(ValueError):
+                    getattr(compact, method)(x)
+            else:
+                assert getattr(compact, method)(x) == expected
+        for inclusive in ((True, True), (False, True), (True, False)):
+            for reverse in (False, True):
+                args = (x, x + 20, inclusive, reverse)
+                assert tuple(compact.irange(*args)) == tuple(reference.irange(*args))
+        assert tuple(compact.iter_from(x, inclusive=False)) == tuple(
+            reference.iter_from(x, inclusive=False)
+        )
+
+
+def test_lookups_in_an_empty_tree():
+    tree: CompactBinarySearchTree[int] = CompactBinarySearchTree()
+    assert tree.rank(1) == 0
+    assert tuple(tree.irange(0, 10)) == ()
+    for method in ("min", "max"):
+        with pytest.raises(ValueError, match="empty"):
+            getattr(tree, method)()
+    with pytest.raises(IndexError):
+        tree.select(0)
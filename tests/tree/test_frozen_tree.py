@@ -0,0 +1,142 @@
+"""Binary Search Tree module to test the frozen tree in Eytzinger layout"""
+
+import bisect
+from array import array
+
+import pytest
+
+from playground.frozen_tree import FrozenBinarySearchTree
+from playground.tree import BinarySearchTree, BinaryTreeNode
+
+
+def linked_tree(frozen: FrozenBinarySearchTree) -> BinarySearchTree:
+    """Equivalent tree of nodes, with the children of k at 2k + 1 and 2k + 2"""
+    values = list(frozen.breadth_first_iterator())
+    nodes = [BinaryTreeNode(val) for val in values]
+    for index, node in enumerate(nodes):
+        if 2 * index + 1 < len(nodes):
+            node.left = nodes[2 * index + 1]
+        if 2 * index + 2 < len(nodes):
+            node.right = nodes[2 * index + 2]
+    return BinarySearchTree(nodes[0] if nodes else None)
+
+
+@pytest.mark.parametrize("n", range(0, 34))
+def test_shape_and_iteration_orders(n: int):
+    frozen = FrozenBinarySearchTree.from_sorted(range(n))
+    tree = linked_tree(frozen)
+    assert len(frozen) == n
+    assert frozen.height == tree.height
+    assert list(frozen) == list(range(n))
+    for order in (
+        "breadth_first_iterator",
+        "depth_first_pre_order_iterator",
+        "depth_first_in_order_iterator",
+        "depth_first_post_order_iterator",
+    ):
+        assert list(getattr(frozen, order)()) == list(getattr(tree, order)())
+    if n:
+        assert frozen.min() == 0
+        assert frozen.max() == n - 1
+
+
+@pytest.mark.parametrize("n", (1, 2, 5, 8, 31, 100))
+def test_neighbor_queries(n: int):
+    values = sorted([2 * i for i in range(n)] + [4, 4])
+    frozen = FrozenBinarySearchTree.from_sorted(values)
+    for x in range(-2, 2 * n + 2):
+        assert (x in frozen) == (x in values)
+        left, right = bisect.bisect_left(values, x), bisect.bisect_right(values, x)
+        for query, index in (
+            (frozen.floor, right - 1),
+            (frozen.predecessor, left - 1),
+            (frozen.ceiling, left),
+            (frozen.successor, right),
+        ):
+            if 0 <= index < len(values):
+                assert query(x) == values[index]
+            else:
+                with pytest.raises(ValueError):
+                    query(x)
+
+
+@pytest.mark.parametrize("n", (0, 1, 2, 6, 7, 8, 20))
+@pytest.mark.parametrize(
+    "inclusive",
+    ((True, True), (True, False), (False, True), (False, False)),
+)
+def test_irange(n: int, inclusive: tuple[bool, bool]):
+    frozen = FrozenBinarySearchTree.from_sorted(range(n))
+    assert list(frozen.irange()) == list(range(n))
+    assert list(frozen.irange(reverse=True)) == list(range(n - 1, -1, -1))
+    for lo in range(-1, n + 1):
+        for hi in range(-1, n + 1):
+            expected = [
+                val
+                for val in range(n)
+                if (lo < val or (inclusive[0] and lo == val))
+                and (val < hi or (inclusive[1] and val == hi))
+            ]
+            assert list(frozen.irange(lo, hi, inclusive)) == expected
+            assert list(frozen.irange(lo, hi, inclusive, reverse=True)) == (
+                expected[::-1]
+            )
+
+
+@pytest.mark.parametrize(
+    ("values", "storage"),
+    (
+        ([3, 1, 2], array),
+        ([0.5, -1.5], array),
+        ([1, 2**64], list),
+        (["b", "a", "c"], list),
+    ),
+)
+def test_storage(values: list, storage: type):
+    frozen = FrozenBinarySearchTree.from_iterable(values)
+    assert isinstance(frozen._values, storage)
+    assert list(frozen) == sorted(values)
+    assert all(val in frozen for val in values)
+    assert [type(val) for val in frozen] == [type(val) for val in sorted(values)]
+
+
+def test_contains_other_types():
+    frozen = FrozenBinarySearchTree.from_sorted([1, 2, 3])
+    assert "1" not in frozen
+    assert None not in frozen
+    assert 1 not in FrozenBinarySearchTree()
+
+
+def test_empty_tree():
+    frozen: FrozenBinarySearchTree[int] = FrozenBinarySearchTree()
+    assert frozen.height == 0
+    assert list(frozen.depth_first_pre_order_iterator()) == []
+    with pytest.raises(ValueError):
+        frozen.max()
+    with pytest.raises(ValueError):
+        frozen.floor(1)
+
+
+def test_freeze_is_a_snapshot():
+    tree = BinarySearchTree.from_iterable([3, 1, 2])
+    frozen = tree.freeze()
+    tree.remove(2)
+    assert list(frozen) == [1, 2, 3]
+    assert list(tree.freeze()) == [1, 3]
+
+
+@pytest.mark.parametrize("n", (0, 1, 6, 7, 100))
+def test_resumable_and_chunked_iteration(n: int):
+    frozen = FrozenBinarySearchTree.from_sorted(range(0, 2 * n, 2))
+    values = list(range(0, 2 * n, 2))
+    assert list(reversed(frozen)) == values[::-1]
+    for key in (-1, 0, 5, 6, 2 * n):
+        assert list(frozen.iter_from(key)) == [val for val in values if val >= key]
+        assert list(frozen.iter_from(key, reverse=True, inclusive=False)) == [
+            val for val in reversed(values) if val < key
+        ]
+    chunks = list(frozen.iter_chunks(3))
+    assert [len(chunk) for chunk in chunks[:-1]] == [3] * (len(chunks) - 1)
+    assert [val for chunk in chunks for val in chunk] == values
+    with pytest.raises(ValueError):
+        next(frozen.iter_chunks(0))
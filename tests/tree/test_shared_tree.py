@@ -0,0 +1,94 @@
+"""Binary Search Tree module to test trees shared across processes"""
+
+import multiprocessing
+import pickle
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+from playground.shared_tree import SharedBinarySearchTree
+from playground.tree import BinarySearchTree
+
+VALUES = [1, 3, 3, 5, 8, 13, 21]
+
+
+@pytest.fixture
+def shared():
+    with BinarySearchTree.from_iterable(VALUES).share() as tree:
+        yield tree
+
+
+def query(tree: SharedBinarySearchTree[int]) -> tuple:
+    return (21 in tree, tree.floor(4), list(tree.irange(3, 13)), list(tree))
+
+
+def test_attached_tree_reads_the_shared_values(shared):
+    with SharedBinarySearchTree.attach(shared.name) as attached:
+        assert attached.name == shared.name
+        assert list(attached) == VALUES
+        assert list(attached.breadth_first_iterator()) == list(
+            shared.breadth_first_iterator()
+        )
+        assert query(attached) == (True, 3, [3, 3, 5, 8, 13], VALUES)
+    # Closing an attached tree does not affect the others
+    assert list(shared) == VALUES
+
+
+def test_pool_workers_attach_by_name(shared):
+    # Only the name is pickled
+    assert len(pickle.dumps(shared)) < 200
+    with multiprocessing.get_context("spawn").Pool(2) as pool:
+        results = pool.map(query, [shared] * 4)
+    assert results == [(True, 3, [3, 3, 5, 8, 13], VALUES)] * 4
+
+
+def test_floats_and_empty_trees():
+    with BinarySearchTree.from_iterable([2.5, -1.0]).share() as tree:
+        assert list(tree) == [-1.0, 2.5]
+        assert 2.5 in tree
+        assert 2 not in tree
+    with BinarySearchTree().share() as tree:
+        assert list(tree) == []
+        assert list(SharedBinarySearchTree.attach(tree.name)) == []
+
+
+def test_share_with_a_name():
+    tree = BinarySearchTree.from_sorted([1, 2]).share(name="playground-test-tree")
+    assert tree.name == "playground-test-tree"
+    tree.unlink()
+
+
+def test_only_numbers_can_be_shared():
+    with pytest.raises(ValueError):
+        BinarySearchTree.from_sorted(["a"]).share()
+    with pytest.raises(ValueError):
+        BinarySearchTree.from_sorted([2**64]).share()
+
+
+@pytest.mark.parametrize("size", (1, 64))
+def test_attach_to_other_blocks(size: int):
+    shared_memory = SharedMemory(create=True, size=size)
+    try:
+        with pytest.raises(ValueError):
+            SharedBinarySearchTree.attach(shared_memory.name)
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+def test_lifecycle():
+    tree = BinarySearchTree.from_sorted([1, 2]).share()
+    name = tree.name
+    attached = SharedBinarySearchTree.attach(name)
+    attached.close()
+    attached.close()
+    assert attached.name is None
+    with pytest.raises(ValueError):
+        list(attached)
+    with pytest.raises(ValueError):
+        pickle.dumps(attached)
+
+    tree.unlink()
+    tree.unlink()
+    with pytest.raises(FileNotFoundError):
+        SharedBinarySearchTree.attach(name)
@@ -0,0 +1,284 @@
+"""Binary Search Tree module to test the asyncio tree"""
+
+import asyncio
+import threading
+
+import pytest
+
+from playground.async_tree import AsyncBinarySearchTree
+from playground.tree import BinarySearchTree
+
+ITERATORS = (
+    "breadth_first_iterator",
+    "depth_first_pre_order_iterator",
+    "depth_first_in_order_iterator",
+    "depth_first_post_order_iterator",
+)
+
+
+async def collect(values) -> list:
+    return [val async for val in values]
+
+
+@pytest.mark.parametrize("iterator", ITERATORS)
+@pytest.mark.parametrize("yield_every", (1, 7, 1000))
+def test_async_iterators_match_the_sync_ones(iterator: str, yield_every: int):
+    tree = AsyncBinarySearchTree.from_iterable(range(100))
+    tree.add(100)
+    values = getattr(tree, f"a{iterator}")(yield_every)
+    assert asyncio.run(collect(values)) == list(getattr(tree, iterator)())
+
+
+def test_async_for_iterates_in_order():
+    tree = AsyncBinarySearchTree.from_sorted([1, 2, 3])
+    assert asyncio.run(collect(tree)) == [1, 2, 3]
+    assert asyncio.run(collect(AsyncBinarySearchTree())) == []
+
+
+def test_async_iteration_lets_other_tasks_run():
+    tree = AsyncBinarySearchTree.from_sorted(range(10))
+    events = []
+
+    async def other() -> None:
+        events.append("other")
+
+    async def main() -> None:
+        task = asyncio.create_task(other())
+        async for val in tree.adepth_first_in_order_iterator(yield_every=5):
+            events.append(val)
+        await task
+
+    asyncio.run(main())
+    assert events == [0, 1, 2, 3, 4, "other", 5, 6, 7, 8, 9]
+
+
+def test_async_iteration_fails_if_the_tree_changes():
+    tree = AsyncBinarySearchTree.from_sorted(range(10))
+
+    async def main() -> None:
+        async for val in tree:
+            tree.add(val + 0.5)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_abalance():
+    tree: AsyncBinarySearchTree[int] = AsyncBinarySearchTree()
+    for val in range(1000):
+        tree.add(val)
+    asyncio.run(tree.abalance())
+    assert tree.height == (1000).bit_length()
+    assert list(tree) == list(range(1000))
+
+
+def test_aadd_many_keeps_duplicates_and_balances():
+    tree = AsyncBinarySearchTree.from_sorted([1, 3, 5])
+    asyncio.run(tree.aadd_many([5, 4, 0, 2]))
+    assert list(tree) == [0, 1, 2, 3, 4, 5, 5]
+    assert tree.height == (7).bit_length()
+
+
+def test_async_construction():
+    tree = asyncio.run(AsyncBinarySearchTree.afrom_sorted([1, 2, 3]))
+    assert isinstance(tree, AsyncBinarySearchTree)
+    assert list(tree) == [1, 2, 3]
+    tree = asyncio.run(AsyncBinarySearchTree.afrom_iterable([3, 1, 2, 1]))
+    assert list(tree) == [1, 1, 2, 3]
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncBinarySearchTree.afrom_sorted([2, 1]))
+
+
+@pytest.mark.parametrize(
+    "operation",
+    ("union", "intersection", "difference", "symmetric_difference"),
+)
+@pytest.mark.parametrize(
+    "other",
+    (
+        [2, 3, 3, 4],
+        BinarySearchTree.from_sorted([3, 4]),
+        AsyncBinarySearchTree.from_sorted([0, 3, 3, 3]),
+    ),
+)
+def test_async_set_operations_match_the_sync_ones(operation: str, other):
+    tree = AsyncBinarySearchTree.from_sorted([1, 2, 3, 3])
+    combined = asyncio.run(getattr(tree, f"a{operation}")(other))
+    assert isinstance(combined, AsyncBinarySearchTree)
+    assert list(combined) == list(getattr(tree, operation)(other))
+
+
+def test_set_operations_use_the_values_operands_had_when_called():
+    reading = threading.Event()
+    changed = threading.Event()
+
+    class SlowTree(AsyncBinarySearchTree[int]):
+        def union(self, other):
+            reading.set()
+            changed.wait(timeout=5)
+            return super().union(other)
+
+    tree = SlowTree.from_sorted(range(10))
+    other = BinarySearchTree.from_sorted([8, 9, 10])
+
+    async def main() -> SlowTree:
+        combined = asyncio.create_task(tree.aunion(other))
+        await asyncio.get_running_loop().run_in_executor(None, reading.wait, 5)
+        tree.remove(0)
+        other.add(11)
+        changed.set()
+        return await combined
+
+    combined = asyncio.run(main())
+    assert isinstance(combined, SlowTree)
+    assert list(combined) == list(range(11))
+
+
+class BuildingTree(AsyncBinarySearchTree[int]):
+    """Tree whose builds in the executor wait for writes on the event loop"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.building = threading.Event()
+        self.written = threading.Event()
+
+    def _ordered_list_to_balanced_tree(self, *args, **kwargs):
+        if threading.current_thread() is not threading.main_thread():
+            self.building.set()
+            self.written.wait(timeout=5)
+        return super()._ordered_list_to_balanced_tree(*args, **kwargs)
+
+    async def write_while_building(self, operation, write) -> None:
+        task = asyncio.create_task(operation)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.building.wait, 5)
+        write()
+        self.written.set()
+        await task
+
+
+def no_blocking_fallback(*args):
+    raise AssertionError("The work was redone on the event loop")
+
+
+def test_abalance_replays_values_added_and_removed_meanwhile():
+    tree = BuildingTree()
+    for val in range(100):
+        tree.add(val)
+    tree.balance = no_blocking_fallback  # type: ignore[method-assign]
+
+    def write() -> None:
+        tree.add(100)
+        tree.remove(0)
+        tree.remove_all(50)
+
+    asyncio.run(tree.write_while_building(tree.abalance(), write))
+    assert list(tree) == [val for val in range(1, 101) if val != 50]
+    assert tree.height <= (100).bit_length() + 1
+    assert tree._write_log is None
+
+
+def test_abalance_leaves_a_tree_rebuilt_meanwhile():
+    tree = BuildingTree.from_sorted([1, 2, 3])
+    asyncio.run(
+        tree.write_while_building(tree.abalance(), lambda: tree.add_many(range(4, 100)))
+    )
+    assert list(tree) == list(range(1, 100))
+
+
+def test_aadd_many_replays_writes_made_meanwhile():
+    tree = BuildingTree.from_sorted(range(0, 100, 2))
+    tree.add_many = no_blocking_fallback  # type: ignore[method-assign]
+    asyncio.run(
+        tree.write_while_building(tree.aadd_many(range(1, 100, 2)), lambda: tree.add(7))
+    )
+    assert list(tree) == sorted([*range(100), 7])
+
+
+def test_aadd_many_adds_on_the_event_loop_if_the_tree_keeps_being_rebuilt():
+    tree = AsyncBinarySearchTree.from_sorted(range(0, 100, 2))
+    done = False
+
+    async def rebuild() -> None:
+        while not done:
+            tree.balance("in_place")
+            await asyncio.sleep(0)
+
+    async def main() -> None:
+        nonlocal done
+        rebuilding = asyncio.create_task(rebuild())
+        await tree.aadd_many(range(1, 100, 2))
+        done = True
+        await rebuilding
+
+    asyncio.run(main())
+    assert list(tree) == list(range(100))
+
+
+def test_walks_stop_when_a_write_starts():
+    tree = AsyncBinarySearchTree.from_sorted(range(10))
+    assert tree._walk() == (tree._writes, list(range(10)), list(range(10)))
+    tree._writes += 1
+    assert tree._walk() is None
+    tree._writes += 1
+    nodes = tree._in_order_copies(tree._root)
+
+    def interrupted(root, at_the_end=False):
+        yield next(nodes)
+        tree._writes += 2
+        if not at_the_end:
+            yield next(nodes)
+
+    for at_the_end in (False, True):
+        tree._in_order_copies = (  # type: ignore[method-assign]
+            lambda root: interrupted(root, at_the_end)
+        )
+        assert tree._walk() is None
+
+
+def test_snapshot_taken_on_the_event_loop_if_walks_keep_being_interrupted():
+    tree = AsyncBinarySearchTree.from_sorted(range(10))
+    tree.add(10)
+    tree._walk = lambda: None  # type: ignore[method-assign]
+    asyncio.run(tree.abalance())
+    assert list(tree) == list(range(11))
+    assert tree.height == (11).bit_length()
+
+
+def test_aadd_many_makes_progress_under_steady_writes():
+    tree = AsyncBinarySearchTree.from_sorted(range(0, 20_000, 2))
+    tree.add_many = no_blocking_fallback  # type: ignore[method-assign]
+    written = []
+    done = False
+
+    async def write() -> None:
+        while not done:
+            written.append(-len(written) - 1)
+            tree.add(written[-1])
+            await asyncio.sleep(0)
+
+    async def main() -> None:
+        nonlocal done
+        writer = asyncio.create_task(write())
+        for start in range(1, 20, 2):
+            await tree.aadd_many(range(start, 20_000, 1000))
+        done = True
+        await writer
+
+    asyncio.run(main())
+    added = [val for start in range(1, 20, 2) for val in range(start, 20_000, 1000)]
+    assert written
+    assert list(tree) == sorted([*range(0, 20_000, 2), *added, *written])
+
+
+def test_builds_running_together():
+    tree = AsyncBinarySearchTree.from_sorted(range(0, 100, 2))
+    # Cached values are used as they are, without walking the tree
+    assert tree.floor_many([3]) == [2]
+
+    async def main() -> None:
+        await asyncio.gather(tree.aadd_many([1, 3]), tree.abalance())
+
+    asyncio.run(main())
+    assert list(tree) == sorted([*range(0, 100, 2), 1, 3])
+    assert tree._write_log is None
@@ -0,0 +1,133 @@
+"""Binary Search Tree module to test the self-balancing AVL tree"""
+
+import math
+import random
+
+import pytest
+
+from playground.tree import AVLBinarySearchTree, BinaryTreeNode
+
+
+def assert_avl_balanced(tree: AVLBinarySearchTree[int]):
+    stack = [tree._root]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        left = node.left.height if node.left else 0
+        right = node.right.height if node.right else 0
+        assert node.height == 1 + max(left, right)
+        assert abs(left - right) <= 1
+        stack.append(node.left)
+        stack.append(node.right)
+
+
+def max_avl_height(n: int) -> float:
+    return 1.4405 * math.log2(n + 2)
+
+
+@pytest.mark.parametrize(
+    "values",
+    (
+        (),
+        (1,),
+        (1, 2, 3, 4, 5, 6, 7, 8, 9, 10),
+        (10, 9, 8, 7, 6, 5, 4, 3, 2, 1),
+        (5, 1, 9, 2, 8, 3, 7, 4, 6),
+        (1, 1, 1, 1, 1, 1, 1, 1),
+    ),
+)
+def test_add_keeps_tree_balanced(values: tuple[int, ...]):
+    tree: AVLBinarySearchTree[int] = AVLBinarySearchTree()
+    for val in values:
+        tree.add(val)
+    assert tuple(tree) == tuple(sorted(values))
+    assert_avl_balanced(tree)
+
+
+@pytest.mark.parametrize(
+    ("values", "removed"),
+    (
+        ((1,), (1,)),
+        ((1, 2, 3, 4, 5, 6, 7), (4,)),
+        ((1, 2, 3, 4, 5, 6, 7), (1, 2, 3)),
+        ((1, 2, 3, 4, 5, 6, 7), (7, 6, 5)),
+        ((1, 2, 3, 4, 5, 6, 7), (4, 2, 6, 1, 3, 5, 7)),
+        ((2, 2, 2, 1, 3), (2, 2)),
+    ),
+)
+def test_remove_keeps_tree_balanced(
+    values: tuple[int, ...],
+    removed: tuple[int, ...],
+):
+    tree: AVLBinarySearchTree[int] = AVLBinarySearchTree()
+    for val in values:
+        tree.add(val)
+    expected = list(sorted(values))
+    for val in removed:
+        tree.remove(val)
+        expected.remove(val)
+        assert_avl_balanced(tree)
+    assert list(tree) == expected
+
+
+def test_remove_not_present_value():
+    tree: AVLBinarySearchTree[int] = AVLBinarySearchTree(BinaryTreeNode(2))
+    with pytest.raises(ValueError):
+        tree.remove(1)
+    with pytest.raises(ValueError):
+        AVLBinarySearchTree().remove(1)
+
+
+def test_an_unbalanced_tree_is_balanced_on_creation():
+    tree = AVLBinarySearchTree(
+        BinaryTreeNode(
+            1,
+            right=BinaryTreeNode(2, right=BinaryTreeNode(3, right=BinaryTreeNode(4))),
+        )
+    )
+    assert tuple(tree) == (1, 2, 3, 4)
+    assert_avl_balanced(tree)
+
+
+def test_a_balanced_tree_keeps_its_shape_on_creation():
+    tree = AVLBinarySearchTree(
+        BinaryTreeNode(
+            3,
+            left=BinaryTreeNode(1, right=BinaryTreeNode(2)),
+            right=BinaryTreeNode(4),
+        )
+    )
+    assert tuple(tree.breadth_first_iterator()) == (3, 1, 4, 2)
+
+
+def test_random_operations():
+    rng = random.Random(42)
+    tree: AVLBinarySearchTree[int] = AVLBinarySearchTree()
+    expected: list[int] = []
+    for _ in range(2_000):
+        val = rng.randrange(200)
+        if expected and rng.random() < 0.4:
+            val = rng.choice(expected)
+            tree.remove(val)
+            expected.remove(val)
+        else:
+            tree.add(val)
+            expected.append(val)
+    assert list(tree) == sorted(expected)
+    assert_avl_balanced(tree)
+
+
+def test_a_million_sorted_keys():
+    n = 1_000_000
+    tree: AVLBinarySearchTree[int] = AVLBinarySearchTree()
+    for i in range(n):
+        tree.add(i)
+    assert tree.height <= max_avl_height(n)
+    assert 0 in tree
+    assert n - 1 in tree
+    assert n not in tree
+    for i in range(0, n, 2):
+        tree.remove(i)
+    assert tree.height <= max_avl_height(n // 2)
+    assert list(tree) == list(range(1, n, 2))
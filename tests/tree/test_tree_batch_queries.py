@@ -0,0 +1,94 @@
+"""Binary Search Tree module to test batched lookups over a sorted snapshot"""
+
+import array
+import random
+
+import pytest
+
+from playground import tree as tree_module
+from playground.tree import BinarySearchTree
+
+VALUES = list(range(0, 100, 3)) + [30, 30]
+QUERIES = [-5, 0, 1, 29, 30, 31, 50, 51, 99, 100, 200]
+
+
+@pytest.fixture
+def tree() -> BinarySearchTree[int]:
+    shuffled = VALUES[:]
+    random.Random(5).shuffle(shuffled)
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    for val in shuffled:
+        tree.add(val)
+    return tree
+
+
+def expected_floors(default=None):
+    return [max((v for v in VALUES if v <= q), default=default) for q in QUERIES]
+
+
+def expected_ceilings(default=None):
+    return [min((v for v in VALUES if v >= q), default=default) for q in QUERIES]
+
+
+def test_contains_many(tree: BinarySearchTree[int]):
+    assert tree.contains_many(QUERIES) == [q in VALUES for q in QUERIES]
+    assert tree.contains_many(iter(QUERIES)) == [q in VALUES for q in QUERIES]
+
+
+def test_contains_many_on_an_empty_tree():
+    assert BinarySearchTree().contains_many([1, 2]) == [False, False]
+
+
+def test_floor_and_ceiling_many(tree: BinarySearchTree[int]):
+    assert tree.floor_many(QUERIES, default=-1) == expected_floors(default=-1)
+    assert tree.ceiling_many(QUERIES, default=-1) == expected_ceilings(default=-1)
+    with pytest.raises(ValueError):
+        tree.floor_many(QUERIES)
+    with pytest.raises(ValueError):
+        tree.ceiling_many(QUERIES)
+
+
+def test_snapshot_is_invalidated_by_changes(tree: BinarySearchTree[int]):
+    assert tree.contains_many([1, 3]) == [False, True]
+    tree.add(1)
+    tree.remove(3)
+    assert tree.contains_many([1, 3]) == [True, False]
+    tree.balance()
+    assert tree.floor_many([2]) == [1]
+
+
+def test_pure_python_fallback_for_buffers(tree, monkeypatch):
+    monkeypatch.setattr(tree_module, "_HAS_NUMPY", False)
+    queries = array.array("q", QUERIES)
+    assert tree.contains_many(queries) == [q in VALUES for q in QUERIES]
+    assert tree.floor_many(queries, default=-1) == expected_floors(default=-1)
+
+
+def test_vectorized_lookups(tree: BinarySearchTree[int]):
+    np = pytest.importorskip("numpy")
+    queries = np.array(QUERIES)
+    result = tree.contains_many(queries)
+    assert isinstance(result, np.ndarray)
+    assert result.tolist() == [q in VALUES for q in QUERIES]
+    assert tree.floor_many(queries, default=-1).tolist() == expected_floors(-1)
+    assert tree.ceiling_many(queries, default=-1).tolist() == expected_ceilings(-1)
+    with pytest.raises(ValueError):
+        tree.floor_many(queries)
+    with pytest.raises(ValueError):
+        tree.ceiling_many(queries)
+
+
+def test_vectorized_lookups_accept_buffers(tree: BinarySearchTree[int]):
+    np = pytest.importorskip("numpy")
+    result = tree.contains_many(array.array("q", QUERIES))
+    assert isinstance(result, np.ndarray)
+    assert result.tolist() == [q in VALUES for q in QUERIES]
+    floors = tree.floor_many(memoryview(array.array("q", [30, 31])))
+    assert floors.tolist() == [30, 30]
+
+
+def test_vectorized_lookups_on_an_empty_tree():
+    np = pytest.importorskip("numpy")
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    assert tree.contains_many(np.array([1, 2])).tolist() == [False, False]
+    assert tree.floor_many(np.array([1]), default=0).tolist() == [0]
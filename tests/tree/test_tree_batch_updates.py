@@ -0,0 +1,106 @@
+"""Binary Search Tree module to test batched adds and removes"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from playground import tree as tree_module
+from playground.tree import AVLBinarySearchTree, BinarySearchTree
+
+BATCH_SIZES = (3, 500)
+
+
+@pytest.fixture(autouse=True, params=("targeted", "rebuild"))
+def batch_strategy(request, monkeypatch) -> str:
+    """Force batches to be applied one value at a time, or by rebuilding"""
+    rebuild_cost = 10**9 if request.param == "targeted" else 0
+    monkeypatch.setattr(tree_module, "_BATCH_REBUILD_COST", rebuild_cost)
+    return request.param
+
+
+@pytest.fixture(params=(BinarySearchTree, AVLBinarySearchTree))
+def tree(request) -> BinarySearchTree[int]:
+    tree = request.param()
+    for val in random.Random(1).sample(range(200), 100):
+        tree.add(val)
+    return tree
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_add_many(tree: BinarySearchTree[int], batch_size: int):
+    expected = list(tree)
+    batch = [random.Random(batch_size).randrange(300) for _ in range(batch_size)]
+    tree.add_many(batch)
+    assert list(tree) == sorted(expected + batch)
+    assert len(tree) == len(expected) + batch_size
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_add_many_of_sorted_values_keeps_the_tree_balanced(batch_size: int):
+    tree = BinarySearchTree.from_sorted(range(0, 20_000, 2))
+    tree.add_many(range(1, 2 * batch_size, 2))
+    assert tree.height <= (len(tree)).bit_length() + 1
+    empty_tree: BinarySearchTree[int] = BinarySearchTree()
+    empty_tree.add_many(range(batch_size))
+    assert empty_tree.height == batch_size.bit_length()
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_remove_many(tree: BinarySearchTree[int], batch_size: int):
+    tree.add_many(range(200, 200 + batch_size))
+    expected = list(tree)
+    batch = random.Random(batch_size).sample(expected, batch_size)
+    tree.remove_many(batch)
+    assert Counter(tree) == Counter(expected) - Counter(batch)
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_remove_many_not_present_values(tree: BinarySearchTree[int], batch_size: int):
+    tree.add_many(range(200, 200 + batch_size))
+    expected = list(tree)
+    present = random.Random(batch_size).sample(expected, batch_size - 1)
+    for missing in (-1, 1_000, expected[0]):
+        with pytest.raises(ValueError):
+            tree.remove_many(present + [missing, expected[0]])
+        assert list(tree) == expected
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_apply_batch(tree: BinarySearchTree[int], batch_size: int):
+    rng = random.Random(batch_size)
+    expected = Counter(tree)
+    ops = []
+    for _ in range(batch_size):
+        val = rng.randrange(300)
+        ops.append(("add", val))
+        expected[val] += 1
+        if rng.random() < 0.5:
+            removed = rng.choice(list(expected.elements()))
+            ops.append(("remove", removed))
+            expected[removed] -= 1
+    rng.shuffle(ops)
+    tree.apply_batch(ops)
+    assert list(tree) == sorted(expected.elements())
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_apply_batch_cannot_remove_more_than_added(batch_size: int):
+    tree = BinarySearchTree.from_sorted([1, 2])
+    ops = [("add", 3)] * batch_size + [("remove", 3)] * (batch_size + 1)
+    with pytest.raises(ValueError):
+        tree.apply_batch(ops)
+    assert list(tree) == [1, 2]
+
+
+def test_apply_batch_unknown_operation(tree: BinarySearchTree[int]):
+    with pytest.raises(ValueError):
+        tree.apply_batch([("add", 1), ("pop", 1)])
+
+
+def test_empty_batches(tree: BinarySearchTree[int]):
+    expected = tuple(tree.breadth_first_iterator())
+    tree.add_many([])
+    tree.remove_many([])
+    tree.apply_batch([])
+    assert tuple(tree.breadth_first_iterator()) == expected
@@ -0,0 +1,257 @@
+"""Binary Search Tree module to test the thread-safe tree and its lock"""
+
+import copy
+import pickle
+import random
+import threading
+
+import pytest
+
+from playground.concurrent_tree import (
+    _ITERATION_CHUNK_SIZE,
+    ConcurrentBinarySearchTree,
+    ReadWriteLock,
+)
+
+ITERATORS = (
+    "__iter__",
+    "breadth_first_iterator",
+    "depth_first_pre_order_iterator",
+    "depth_first_in_order_iterator",
+    "depth_first_post_order_iterator",
+    "irange",
+    "__reversed__",
+)
+
+
+def run_threads(*targets) -> None:
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def read():
+        with lock.read():
+            # Every reader must get here before any of them leaves
+            barrier.wait()
+
+    run_threads(read, read, read)
+
+
+def test_writers_hold_the_lock_alone():
+    lock = ReadWriteLock()
+    holders: list[str] = []
+    overlaps = []
+
+    def use(access, kind):
+        for _ in range(300):
+            with access():
+                holders.append(kind)
+                if "write" in holders and len(holders) > 1:
+                    overlaps.append(holders[:])
+                holders.remove(kind)
+
+    run_threads(
+        lambda: use(lock.write, "write"),
+        lambda: use(lock.write, "write"),
+        lambda: use(lock.read, "read"),
+        lambda: use(lock.read, "read"),
+    )
+    assert not overlaps
+
+
+def test_waiting_writers_go_before_new_readers():
+    lock = ReadWriteLock()
+    order = []
+
+    def write():
+        with lock.write():
+            order.append("write")
+
+    def read():
+        with lock.read():
+            order.append("read")
+
+    lock.acquire_read()
+    writer = threading.Thread(target=write)
+    writer.start()
+    while not lock._waiting_writers:
+        pass
+    reader = threading.Thread(target=read)
+    reader.start()
+    lock.release_read()
+    writer.join(timeout=5)
+    reader.join(timeout=5)
+    assert order == ["write", "read"]
+
+
+def test_reentrancy():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+        assert lock._writer == threading.get_ident()
+    assert lock._writer is None
+    with lock.read():
+        with lock.read():
+            pass
+        assert lock._readers == 1
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    assert lock._readers == 0
+
+
+def test_concurrent_updates_and_lookups():
+    tree: ConcurrentBinarySearchTree[int] = ConcurrentBinarySearchTree()
+    errors = []
+
+    def write(start):
+        for val in range(start, 2000, 4):
+            tree.add(val)
+        for val in range(start, 2000, 8):
+            tree.remove(val)
+
+    def read():
+        for val in range(2000):
+            try:
+                val in tree
+                tree.floor_many([val], default=-1)
+                len(tree)
+            except Exception as error:
+                errors.append(error)
+
+    run_threads(*(lambda start=start: write(start) for start in range(4)), read, read)
+    assert not errors
+    assert list(tree) == [val for val in range(2000) if val % 8 >= 4]
+    assert tree.height >= len(tree).bit_length()
+
+
+@pytest.mark.parametrize("iterator", ITERATORS)
+def test_iterators_fail_fast(iterator: str):
+    tree = ConcurrentBinarySearchTree.from_sorted(range(200))
+    values = getattr(tree, iterator)()
+    taken = [next(values) for _ in range(100)]
+    assert len(set(taken)) == 100
+    tree.remove(taken[0])
+    with pytest.raises(RuntimeError):
+        next(values)
+
+
+@pytest.mark.parametrize("iterator", ITERATORS)
+def test_iterators_without_changes(iterator: str):
+    tree = ConcurrentBinarySearchTree.from_sorted(range(200))
+    assert sorted(getattr(tree, iterator)()) == list(range(200))
+    assert list(ConcurrentBinarySearchTree().breadth_first_iterator()) == []
+
+
+@pytest.mark.parametrize("iterator", (*ITERATORS, "iter_from"))
+def test_iterators_take_the_lock_once_per_chunk(iterator: str):
+    tree = ConcurrentBinarySearchTree.from_sorted(range(_ITERATION_CHUNK_SIZE * 3))
+    acquire_read = tree.lock.acquire_read
+    acquisitions = []
+
+    def counting_acquire_read():
+        acquisitions.append(None)
+        acquire_read()
+
+    tree.lock.acquire_read = counting_acquire_read  # type: ignore[method-assign]
+    args = (0,) if iterator == "iter_from" else ()
+    assert len(list(getattr(tree, iterator)(*args))) == _ITERATION_CHUNK_SIZE * 3
+    # Once to start, and once for each chunk, the last one being empty
+    assert len(acquisitions) == 5
+
+
+def test_iterating_while_another_thread_writes():
+    tree = ConcurrentBinarySearchTree.from_sorted(range(10_000))
+    outcomes = []
+
+    def read():
+        try:
+            outcomes.append(list(tree) == list(range(10_000)))
+        except RuntimeError:
+            outcomes.append("changed")
+
+    def write():
+        tree.add(-1)
+        tree.remove(-1)
+
+    run_threads(read, write, read)
+    # An iteration is either complete and correct, or stopped by the change
+    assert all(outcome in (True, "changed") for outcome in outcomes)
+
+
+@pytest.mark.parametrize("operation", ("union", "update"))
+def test_combining_with_a_tree_another_thread_writes(operation: str):
+    values = list(range(0, 20_000, 2))
+    other = ConcurrentBinarySearchTree.from_sorted(values)
+    results = []
+    done = threading.Event()
+
+    def write():
+        # Other always has every value but at most the one being moved
+        for val in random.Random(0).sample(values, 2000):
+            other.remove(val)
+            other.add(val)
+        done.set()
+
+    def combine():
+        while not done.is_set():
+            tree = ConcurrentBinarySearchTree.from_sorted([-1])
+            if operation == "union":
+                tree = tree | other
+            else:
+                tree |= other
+            results.append(list(tree))
+
+    run_threads(write, combine)
+    assert results
+    for result in results:
+        assert result[0] == -1
+        assert result == sorted(set(result))
+        assert len(result) >= len(values)
+
+
+def test_combining_trees_both_ways_does_not_deadlock():
+    a = ConcurrentBinarySearchTree.from_sorted(range(0, 2000, 2))
+    b = ConcurrentBinarySearchTree.from_sorted(range(1, 2000, 2))
+
+    def combine(tree, other):
+        for _ in range(50):
+            tree |= other
+            tree.add(-1)
+
+    run_threads(lambda: combine(a, b), lambda: combine(b, a))
+    assert set(a) == set(b) == set(range(-1, 2000))
+
+
+def test_grouping_operations_under_the_lock():
+    tree = ConcurrentBinarySearchTree.from_sorted([1, 2, 3])
+    with tree.lock.write():
+        tree.remove_many([1, 2])
+        tree |= ConcurrentBinarySearchTree.from_sorted([5])
+        assert tree.select(0) == 3
+        assert list(tree) == [3, 5]
+    with tree.lock.read():
+        assert tree.min() == 3
+        with pytest.raises(RuntimeError):
+            tree.add(1)
+
+
+def test_copies_get_their_own_lock():
+    tree = ConcurrentBinarySearchTree.from_sorted([1, 2, 3])
+    for copied in (
+        copy.copy(tree),
+        copy.deepcopy(tree),
+        pickle.loads(pickle.dumps(tree)),
+    ):
+        assert isinstance(copied, ConcurrentBinarySearchTree)
+        assert copied.lock is not tree.lock
+        assert list(copied) == [1, 2, 3]
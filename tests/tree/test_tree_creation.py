@@ -2,7 +2,7 @@
 
 import pytest
 
-from playground.tree import BinarySearchTree, BinaryTreeNode
+from playground.tree import AVLBinarySearchTree, BinarySearchTree, BinaryTreeNode
 
 
 def test_can_create_empty_tree():
@@ -182,3 +182,61 @@ def test_can_not_create_unsorted_tree_from_the_root_in_a_higher_level():
                 ),
             ),
         )
+
+
+@pytest.mark.parametrize(
+    "values",
+    (
+        [],
+        [1],
+        [1, 2],
+        [1, 1, 1],
+        list(range(100)),
+    ),
+)
+@pytest.mark.parametrize("tree_class", (BinarySearchTree, AVLBinarySearchTree))
+def test_from_sorted(values: list[int], tree_class: type[BinarySearchTree[int]]):
+    tree = tree_class.from_sorted(values)
+    assert isinstance(tree, tree_class)
+    assert list(tree) == values
+    assert len(tree) == len(values)
+    assert tree.height == len(values).bit_length()
+
+
+def test_from_sorted_accepts_any_iterable():
+    assert list(BinarySearchTree.from_sorted(iter(range(10)))) == list(range(10))
+
+
+def test_from_sorted_keeps_balance_shape():
+    values = list(range(50))
+    tree = BinarySearchTree.from_sorted(values)
+    balanced = BinarySearchTree.from_iterable(reversed(values))
+    balanced.balance()
+    assert tuple(tree.breadth_first_iterator()) == tuple(
+        balanced.breadth_first_iterator()
+    )
+
+
+def test_from_sorted_rejects_unsorted_values():
+    with pytest.raises(ValueError):
+        BinarySearchTree.from_sorted([1, 2, 4, 3])
+
+
+def test_from_sorted_without_validation():
+    tree = BinarySearchTree.from_sorted(range(10), validate=False)
+    assert list(tree) == list(range(10))
+
+
+@pytest.mark.parametrize(
+    "values",
+    (
+        [],
+        [3, 1, 2],
+        [5, 5, 1, 5, 0],
+        list(range(100, 0, -1)),
+    ),
+)
+def test_from_iterable(values: list[int]):
+    tree = BinarySearchTree.from_iterable(values)
+    assert list(tree) == sorted(values)
+    assert tree.height == len(values).bit_length()
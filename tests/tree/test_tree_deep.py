@@ -0,0 +1,75 @@
+"""Binary Search Tree module to test operations on very deep trees"""
+
+import pytest
+
+from playground.tree import BinarySearchTree, BinaryTreeNode
+
+DEPTH = 10**5
+
+
+def right_chain(n: int) -> BinaryTreeNode[int]:
+    root = BinaryTreeNode(n - 1)
+    for val in range(n - 2, -1, -1):
+        root = BinaryTreeNode(val, right=root)
+    return root
+
+
+def left_chain(n: int) -> BinaryTreeNode[int]:
+    root = BinaryTreeNode(0)
+    for val in range(1, n):
+        root = BinaryTreeNode(val, left=root)
+    return root
+
+
+@pytest.fixture(params=(right_chain, left_chain))
+def deep_tree(request) -> BinarySearchTree[int]:
+    return BinarySearchTree(request.param(DEPTH))
+
+
+def test_creation_and_properties(deep_tree: BinarySearchTree[int]):
+    assert deep_tree.height == DEPTH
+    assert len(deep_tree) == DEPTH
+
+
+def test_contains(deep_tree: BinarySearchTree[int]):
+    assert 0 in deep_tree
+    assert DEPTH - 1 in deep_tree
+    assert DEPTH not in deep_tree
+    assert -1 not in deep_tree
+
+
+def test_iteration(deep_tree: BinarySearchTree[int]):
+    expected = list(range(DEPTH))
+    assert list(deep_tree) == expected
+    assert list(deep_tree.breadth_first_iterator()) == list(
+        deep_tree.depth_first_pre_order_iterator()
+    )
+    assert sorted(deep_tree.depth_first_post_order_iterator()) == expected
+
+
+def test_add_and_remove(deep_tree: BinarySearchTree[int]):
+    deep_tree.add(DEPTH)
+    deep_tree.add(-1)
+    assert deep_tree.height == DEPTH + 1
+    deep_tree.remove(DEPTH // 2)
+    deep_tree.remove(DEPTH)
+    deep_tree.remove(-1)
+    assert len(deep_tree) == DEPTH - 1
+    assert DEPTH // 2 not in deep_tree
+
+
+@pytest.mark.parametrize("strategy", ("rebuild", "in_place"))
+def test_balance(deep_tree: BinarySearchTree[int], strategy):
+    deep_tree.balance(strategy)
+    assert deep_tree.height == DEPTH.bit_length()
+    assert list(deep_tree) == list(range(DEPTH))
+
+
+def test_unsorted_deep_tree():
+    root = right_chain(DEPTH)
+    node = root
+    while node.right:
+        node = node.right
+    node.right = BinaryTreeNode(0)
+    with pytest.raises(ValueError):
+        BinarySearchTree(root)
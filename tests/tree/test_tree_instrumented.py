@@ -0,0 +1,187 @@
+"""Binary Search Tree module to test the trees that measure their operations"""
+
+import random
+
+import pytest
+
+from playground.instrumented_tree import (
+    InstrumentedAVLBinarySearchTree,
+    InstrumentedBinarySearchTree,
+    InstrumentedScapegoatBinarySearchTree,
+    OperationStats,
+)
+from playground.tree import BinarySearchTree, BinaryTreeNode
+
+TRAVERSALS = (
+    "breadth_first_iterator",
+    "depth_first_pre_order_iterator",
+    "depth_first_in_order_iterator",
+    "depth_first_post_order_iterator",
+)
+
+
+@pytest.mark.parametrize(
+    "tree_class",
+    (
+        InstrumentedBinarySearchTree,
+        InstrumentedAVLBinarySearchTree,
+        InstrumentedScapegoatBinarySearchTree,
+    ),
+)
+def test_behaves_as_the_tree_it_measures(tree_class):
+    rng = random.Random(0)
+    tree = tree_class()
+    expected = BinarySearchTree()
+    for _ in range(500):
+        val = rng.randrange(50)
+        if val in expected:
+            tree.remove(val)
+            expected.remove(val)
+        else:
+            tree.add(val)
+            expected.add(val)
+        assert (val in tree) == (val in expected)
+    assert list(tree) == list(expected)
+    stats = tree.stats()
+    assert stats["add"].calls + stats["remove"].calls == 500
+    assert stats["contains"].calls == 500
+
+
+def test_counts_the_nodes_each_search_visits():
+    chain = InstrumentedBinarySearchTree()
+    for val in range(1, 8):
+        chain.add(val)
+    balanced = InstrumentedBinarySearchTree.from_sorted(range(1, 8))
+    assert 7 in chain
+    assert 7 in balanced
+    assert chain.stats()["contains"].nodes_visited == 7
+    assert balanced.stats()["contains"].nodes_visited == 3
+    # Each add went down to the leaf it became the child of
+    assert chain.stats()["add"] == OperationStats(
+        calls=7,
+        seconds=chain.stats()["add"].seconds,
+        nodes_visited=sum(range(7)),
+        rotations=0,
+        rebuilt_nodes=0,
+    )
+
+
+def test_copies_in_a_multiset_stop_at_their_node():
+    tree = InstrumentedBinarySearchTree.from_sorted([1, 2, 3], multiset=True)
+    tree.add(2)
+    tree.add(3)
+    assert tree.stats()["add"].nodes_visited == 1 + 2
+
+
+def test_calls_the_callback_after_each_operation():
+    calls = []
+    tree = InstrumentedBinarySearchTree.from_sorted(
+        [1, 2, 3], callback=lambda *args: calls.append(args)
+    )
+    tree.add(4)
+    tree.remove(1)
+    assert "a" not in tree
+    assert [(operation, visited) for operation, _, visited in calls] == [
+        ("add", 2),
+        ("remove", 2),
+        ("contains", 0),
+    ]
+    assert all(seconds >= 0 for _, seconds, _ in calls)
+
+
+def test_measures_failed_operations():
+    tree = InstrumentedBinarySearchTree.from_sorted([1, 2, 3])
+    with pytest.raises(ValueError):
+        tree.remove(4)
+    assert tree.stats()["remove"].calls == 1
+
+
+@pytest.mark.parametrize("traversal", TRAVERSALS)
+def test_counts_the_values_traversals_visit(traversal):
+    tree = InstrumentedBinarySearchTree.from_sorted(range(10))
+    assert sorted(getattr(tree, traversal)()) == list(range(10))
+    assert tree.stats()[traversal].nodes_visited == 10
+
+
+def test_measures_stopped_traversals_once_closed():
+    tree = InstrumentedBinarySearchTree.from_sorted(range(10))
+    values = iter(tree)
+    assert next(values) == 0
+    assert tree.stats() == {}
+    values.close()
+    assert tree.stats()["depth_first_in_order_iterator"].nodes_visited == 1
+
+
+def test_counts_the_nodes_balancing_rebuilds():
+    tree = InstrumentedBinarySearchTree()
+    for val in range(20):
+        tree.add(val)
+    tree.balance("rebuild")
+    stats = tree.stats()["balance"]
+    assert stats.nodes_visited == stats.rebuilt_nodes == 20
+    assert stats.rotations == 0
+
+
+def test_counts_the_rotations_balancing_in_place():
+    # Already a vine, which is folded by rotating 5, 7, 3 and 1 of its nodes
+    chain = InstrumentedBinarySearchTree()
+    for val in range(20):
+        chain.add(val)
+    chain.balance("in_place")
+    stats = chain.stats()["balance"]
+    assert (stats.nodes_visited, stats.rotations, stats.rebuilt_nodes) == (20, 16, 0)
+    # The left chain takes a rotation for each node but the root to become one
+    chain = InstrumentedBinarySearchTree()
+    for val in reversed(range(20)):
+        chain.add(val)
+    chain.balance("in_place")
+    assert chain.stats()["balance"].rotations == 19 + 16
+
+
+def test_lookups_of_another_type_visit_no_nodes():
+    tree = InstrumentedBinarySearchTree.from_sorted([1, 2, 3])
+    assert 2.5 not in tree
+    assert "a" not in tree
+    assert tree.stats()["contains"].nodes_visited == 0
+    assert 3 in tree
+    assert tree.stats()["contains"].nodes_visited == 2
+
+
+def test_counts_avl_rotations():
+    tree = InstrumentedAVLBinarySearchTree()
+    # A single rotation, to the left
+    for val in (1, 2, 3):
+        tree.add(val)
+    assert tree.stats()["add"].rotations == 1
+    # A double rotation, right then left
+    tree.add(5)
+    tree.add(4)
+    assert tree.stats()["add"].rotations == 3
+    tree.remove(1)
+    assert tree.stats()["remove"].rotations == 1
+
+
+def test_counts_scapegoat_rebuilds_within_the_operation():
+    tree = InstrumentedScapegoatBinarySearchTree.from_sorted(range(100), alpha=0.6)
+    for val in range(50):
+        tree.remove(val)
+    stats = tree.stats()
+    # Shrinking the tree rebuilt it, which is measured as part of a removal
+    assert "balance" not in stats
+    assert stats["remove"].calls == 50
+    assert stats["remove"].rebuilt_nodes > 0
+    assert stats["remove"].rotations == 0
+
+
+def test_does_not_measure_creation():
+    chain = BinaryTreeNode(1, right=BinaryTreeNode(2, right=BinaryTreeNode(3)))
+    tree = InstrumentedAVLBinarySearchTree(chain)
+    assert tree.height == 2
+    assert tree.stats() == {}
+
+
+def test_reset_stats():
+    tree = InstrumentedBinarySearchTree.from_sorted([1, 2, 3])
+    assert 1 in tree
+    tree.reset_stats()
+    assert tree.stats() == {}
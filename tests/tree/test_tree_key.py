@@ -0,0 +1,206 @@
+"""Binary Search Tree module to test trees ordering values by a key function"""
+
+import asyncio
+import copy
+import pickle
+import random
+from dataclasses import dataclass
+from operator import attrgetter
+
+import pytest
+
+from playground.async_tree import AsyncBinarySearchTree
+from playground.concurrent_tree import ConcurrentBinarySearchTree
+from playground.tree import (
+    AVLBinarySearchTree,
+    BinarySearchTree,
+    BinaryTreeNode,
+    PersistentBinarySearchTree,
+    ScapegoatBinarySearchTree,
+)
+
+TREE_CLASSES = (
+    BinarySearchTree,
+    AVLBinarySearchTree,
+    ScapegoatBinarySearchTree,
+    ConcurrentBinarySearchTree,
+    AsyncBinarySearchTree,
+)
+
+
+@dataclass(eq=False)
+class Record:
+    """Payload that cannot be compared, only ordered by its id"""
+
+    id: int
+    name: str = ""
+
+
+by_id = attrgetter("id")
+
+
+def ids(tree) -> list[int]:
+    return [record.id for record in tree]
+
+
+@pytest.mark.parametrize("tree_class", TREE_CLASSES)
+def test_adding_and_removing_by_key(tree_class):
+    rng = random.Random(1)
+    tree = tree_class(key=by_id)
+    added: list[int] = []
+    for _ in range(500):
+        if added and rng.random() < 0.4:
+            val = rng.choice(added)
+            added.remove(val)
+            tree.remove(val)
+        else:
+            val = rng.randrange(100)
+            added.append(val)
+            tree.add(Record(val))
+    assert ids(tree) == sorted(added)
+    assert all(val in tree for val in added)
+    assert Record(added[0]) not in tree
+    with pytest.raises(ValueError):
+        tree.remove(100)
+
+
+def test_keys_are_computed_once_per_value():
+    calls = []
+
+    def key(record: Record) -> int:
+        calls.append(record.id)
+        return record.id
+
+    tree = BinarySearchTree(key=key)
+    for val in range(100):
+        tree.add(Record(val))
+    tree.balance()
+    tree.balance("in_place")
+    for val in range(100):
+        assert val in tree
+        assert tree.floor(val + 0.5).id == val
+    assert tree.contains_many([1, 200]) == [True, False]
+    tree.remove_many(range(0, 100, 2))
+    assert sorted(calls) == list(range(100))
+
+    calls.clear()
+    tree = BinarySearchTree.from_iterable(
+        [Record(val) for val in range(99, -1, -1)], key=key
+    )
+    # A few values are added one by one, and many merged with the tree
+    tree.add_many([Record(val) for val in range(100, 103)])
+    tree.add_many([Record(val) for val in range(103, 300)])
+    assert sorted(calls) == list(range(300))
+
+
+def test_lookups_take_keys():
+    tree = BinarySearchTree.from_sorted(
+        [Record(val, str(val)) for val in range(0, 20, 2)], key=by_id
+    )
+    assert tree.min().id == 0 and tree.max().id == 18
+    assert tree.floor(5).id == 4 and tree.ceiling(5).id == 6
+    assert tree.predecessor(4).id == 2 and tree.successor(4).id == 6
+    assert tree.rank(5) == 3 and tree.count_range(3, 9) == 3
+    assert ids(tree.irange(3, 9)) == [4, 6, 8]
+    assert ids(tree.iter_from(16)) == [16, 18]
+    assert ids(tree.iter_from(4, reverse=True, inclusive=False)) == [2, 0]
+    assert tree.floor_many([1, 19], default=None)[1].id == 18
+    assert tree.ceiling_many([19], default=-1) == [-1]
+    assert tree.contains_many(range(3)) == [True, False, True]
+    # Arrays are not vectorized, as the values are not the keys
+    assert [record.id for record in tree.ceiling_many(bytearray([3]))] == [4]
+    assert "4" not in tree
+
+
+def test_sorted_and_unsorted_creation():
+    records = [Record(val) for val in (3, 1, 2)]
+    assert ids(BinarySearchTree.from_iterable(records, key=by_id)) == [1, 2, 3]
+    with pytest.raises(ValueError, match="Unsorted values: 1 cannot come after 3"):
+        BinarySearchTree.from_sorted(records, key=by_id)
+    root = BinaryTreeNode(records[2], left=BinaryTreeNode(records[1]))
+    tree = BinarySearchTree(root, key=by_id)
+    assert tree._root is not None and tree._root.key == 2
+    with pytest.raises(ValueError, match="3 cannot be to the left of 2"):
+        BinarySearchTree(
+            BinaryTreeNode(records[2], left=BinaryTreeNode(records[0])), key=by_id
+        )
+
+
+@pytest.mark.parametrize("size", (10, 10_000))
+def test_batches_by_key(size: int):
+    tree = BinarySearchTree.from_sorted([Record(val) for val in range(size)], key=by_id)
+    tree.add_many([Record(val) for val in range(size, 2 * size)])
+    tree.remove_many(range(0, 2 * size, 2))
+    tree.apply_batch([("add", Record(-1)), ("remove", 1)])
+    assert ids(tree) == [-1, *range(3, 2 * size, 2)]
+    with pytest.raises(ValueError):
+        tree.remove_many([0])
+
+
+@pytest.mark.parametrize(
+    ("operation", "expected"),
+    (
+        ("union", [1, 2, 3, 3, 4]),
+        ("intersection", [3]),
+        ("difference", [1, 2]),
+        ("symmetric_difference", [1, 2, 3, 4]),
+    ),
+)
+def test_set_operations_by_key(operation: str, expected: list[int]):
+    tree = BinarySearchTree.from_sorted([Record(1), Record(2), Record(3)], key=by_id)
+    records = [Record(4), Record(3), Record(3)]
+    other_tree = BinarySearchTree.from_iterable(records, key=by_id)
+    for other in (records, other_tree):
+        assert ids(getattr(tree, operation)(other)) == expected
+    update = "update" if operation == "union" else f"{operation}_update"
+    getattr(tree, update)(other_tree)
+    assert ids(tree) == expected
+    assert tree.height == len(expected).bit_length()
+
+
+def test_set_operations_with_a_tree_ordered_differently():
+    tree = BinarySearchTree.from_sorted([-1, 2, -3], key=abs)
+    assert list(tree | BinarySearchTree.from_sorted([-3, 2, 4])) == [-1, 2, -3, 4]
+
+
+def test_copies_keep_the_key_function():
+    tree = ScapegoatBinarySearchTree.from_iterable(
+        [Record(2), Record(1)], key=by_id, alpha=0.6
+    )
+    for copied in (
+        copy.copy(tree),
+        copy.deepcopy(tree),
+        pickle.loads(pickle.dumps(tree)),
+        tree.union([Record(3)]),
+    ):
+        assert isinstance(copied, ScapegoatBinarySearchTree)
+        assert copied.alpha == 0.6
+        assert copied.floor(2.5).id == 2
+
+
+def test_persistent_tree_by_key():
+    tree = PersistentBinarySearchTree(key=by_id)
+    for val in range(100):
+        tree = tree.add(Record(val))
+    updated = tree.remove(10).remove(50)
+    assert 10 in tree and 10 not in updated
+    assert ids(updated) == [val for val in range(100) if val not in (10, 50)]
+    assert updated.ceiling(10).id == 11
+
+
+def test_async_bulk_operations_by_key():
+    tree = AsyncBinarySearchTree(key=by_id)
+    for val in range(10):
+        tree.add(Record(val))
+    asyncio.run(tree.aadd_many([Record(-1)]))
+    asyncio.run(tree.abalance())
+    assert ids(tree) == list(range(-1, 10))
+    assert tree.height == (11).bit_length()
+
+
+def test_trees_with_a_key_cannot_be_frozen_nor_shared():
+    tree = BinarySearchTree.from_sorted([3, 2, 1], key=lambda val: -val)
+    with pytest.raises(ValueError):
+        tree.freeze()
+    with pytest.raises(ValueError):
+        tree.share()
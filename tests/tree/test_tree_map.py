@@ -0,0 +1,134 @@
+"""Binary Search Tree module to test the sorted map"""
+
+import copy
+import pickle
+import random
+
+import pytest
+
+from playground.tree import AVLBinarySearchTree, ScapegoatBinarySearchTree
+from playground.tree_map import BinarySearchTreeMap
+
+
+@pytest.mark.parametrize(
+    "tree_class",
+    (None, AVLBinarySearchTree, ScapegoatBinarySearchTree),
+)
+def test_behaves_like_a_sorted_dict(tree_class):
+    rng = random.Random(5)
+    kwargs = {"tree_class": tree_class} if tree_class else {}
+    tree_map: BinarySearchTreeMap[int, int] = BinarySearchTreeMap(**kwargs)
+    expected: dict[int, int] = {}
+    for step in range(2000):
+        key = rng.randrange(200)
+        if rng.random() < 0.3:
+            if key in expected:
+                del expected[key]
+                del tree_map[key]
+            else:
+                with pytest.raises(KeyError):
+                    del tree_map[key]
+        else:
+            expected[key] = step
+            tree_map[key] = step
+    assert len(tree_map) == len(expected)
+    assert list(tree_map) == sorted(expected)
+    assert list(tree_map.items()) == sorted(expected.items())
+    assert list(tree_map.values()) == [expected[key] for key in sorted(expected)]
+    assert tree_map == expected
+    assert all(tree_map[key] == value for key, value in expected.items())
+    if tree_class:
+        assert tree_map.height <= 2 * len(expected).bit_length()
+
+
+def test_missing_keys():
+    tree_map = BinarySearchTreeMap({1: "a"})
+    for key in (0, 2, "1", 1.5):
+        with pytest.raises(KeyError):
+            tree_map[key]
+        assert key not in tree_map
+    assert tree_map.get(2) is None
+    assert tree_map.pop(1) == "a"
+    with pytest.raises(KeyError):
+        BinarySearchTreeMap()[1]
+
+
+def test_setting_an_existing_key_keeps_its_node():
+    tree_map = BinarySearchTreeMap.fromkeys(range(10), 0)
+    height = tree_map.height
+    items = tree_map.items()
+    tree_map[5] = 1
+    tree_map[5.0] = 2
+    assert tree_map[5] == 2 and type(next(tree_map.irange(5, 5))) is int
+    assert tree_map.height == height
+    assert len(items) == 10 and (5, 2) in items
+
+
+def test_ordered_views_and_ranges():
+    tree_map = BinarySearchTreeMap((key, str(key)) for key in range(0, 20, 2))
+    assert list(reversed(tree_map)) == list(range(18, -1, -2))
+    assert list(reversed(tree_map.items()))[0] == (18, "18")
+    assert list(reversed(tree_map.values()))[-1] == "0"
+    assert tree_map[4:10] == [(4, "4"), (6, "6"), (8, "8")]
+    assert tree_map[:3] == [(0, "0"), (2, "2")]
+    assert tree_map[15:] == [(16, "16"), (18, "18")]
+    with pytest.raises(ValueError):
+        tree_map[::2]
+    assert list(tree_map.irange(3, 9, reverse=True)) == [8, 6, 4]
+    assert list(tree_map.irange_items(17, inclusive=(False, False))) == [(18, "18")]
+    assert tree_map.floor_item(5) == (4, "4")
+    assert tree_map.ceiling_item(5) == (6, "6")
+    with pytest.raises(ValueError):
+        tree_map.ceiling_item(19)
+
+
+@pytest.mark.parametrize("size", (10, 10_000))
+def test_bulk_updates(size: int):
+    tree_map = BinarySearchTreeMap.fromkeys(range(0, size, 2), "old")
+    tree_map.update({key: "new" for key in range(size // 2, 2 * size)})
+    tree_map.update([(0, "first"), (0, "last")])
+    tree_map.update()
+    assert tree_map[0] == "last"
+    assert list(tree_map) == sorted(
+        set(range(0, size // 2, 2)) | set(range(size // 2, 2 * size))
+    )
+    assert list(tree_map.values()).count("new") == 2 * size - size // 2
+
+
+def test_update_like_dict():
+    tree_map = BinarySearchTreeMap({"b": 1})
+    tree_map.update({"c": 2}, a=3)
+    assert list(tree_map.items()) == [("a", 3), ("b", 1), ("c", 2)]
+
+
+def test_from_sorted_and_balance():
+    items = [(key, -key) for key in range(100)]
+    tree_map = BinarySearchTreeMap.from_sorted(items, tree_class=AVLBinarySearchTree)
+    assert tree_map.height == (100).bit_length()
+    assert list(tree_map.items()) == items
+    with pytest.raises(ValueError):
+        BinarySearchTreeMap.from_sorted(reversed(items))
+    unsorted = BinarySearchTreeMap.from_sorted(reversed(items), validate=False)
+    assert len(unsorted) == 100
+    chain: BinarySearchTreeMap[int, int] = BinarySearchTreeMap()
+    for key, value in items:
+        chain[key] = value
+    chain.balance()
+    assert chain.height == (100).bit_length()
+
+
+def test_copies_are_independent():
+    tree_map = BinarySearchTreeMap(
+        {1: [1], 2: [2]}, tree_class=ScapegoatBinarySearchTree, alpha=0.6
+    )
+    shallow = tree_map.copy()
+    deep = copy.deepcopy(tree_map)
+    unpickled = pickle.loads(pickle.dumps(tree_map))
+    tree_map[3] = [3]
+    tree_map[1].append(1)
+    for copied in (shallow, deep, unpickled):
+        assert isinstance(copied._tree, ScapegoatBinarySearchTree)
+        assert copied._tree.alpha == 0.6
+        assert list(copied) == [1, 2]
+    assert shallow[1] == [1, 1]
+    assert deep[1] == unpickled[1] == [1]
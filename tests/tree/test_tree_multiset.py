@@ -0,0 +1,184 @@
+"""Binary Search Tree module to test multisets, counting copies in each node"""
+
+import copy
+import pickle
+import random
+from collections import Counter
+
+import pytest
+
+from playground.concurrent_tree import ConcurrentBinarySearchTree
+from playground.tree import (
+    AVLBinarySearchTree,
+    BinarySearchTree,
+    BinaryTreeNode,
+    ScapegoatBinarySearchTree,
+)
+
+TREE_CLASSES = (
+    BinarySearchTree,
+    AVLBinarySearchTree,
+    ScapegoatBinarySearchTree,
+    ConcurrentBinarySearchTree,
+)
+
+
+def node_count(tree: BinarySearchTree) -> int:
+    count = 0
+    stack = [tree._root]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            count += 1
+            stack.extend((node.left, node.right))
+    return count
+
+
+@pytest.mark.parametrize("tree_class", TREE_CLASSES)
+def test_random_updates_match_a_counter(tree_class):
+    rng = random.Random(2)
+    tree = tree_class(multiset=True)
+    counter: Counter[int] = Counter()
+    for _ in range(2000):
+        val = rng.randrange(30)
+        operation = rng.random()
+        if operation < 0.6:
+            tree.add(val)
+            counter[val] += 1
+        elif counter[val] and operation < 0.9:
+            tree.remove(val)
+            counter[val] -= 1
+        elif counter[val]:
+            tree.remove_all(val)
+            del counter[val]
+        else:
+            with pytest.raises(ValueError):
+                tree.remove(val)
+    expected = sorted(counter.elements())
+    assert list(tree) == expected
+    assert len(tree) == len(expected)
+    assert node_count(tree) == len(+counter)
+    assert list(tree.distinct()) == sorted(+counter)
+    for val in range(31):
+        assert tree.count(val) == counter[val]
+        assert tree.rank(val) == sum(1 for other in expected if other < val)
+    assert [tree.select(i) for i in range(len(expected))] == expected
+
+
+def test_copies_do_not_grow_the_tree():
+    tree = AVLBinarySearchTree(multiset=True)
+    for _ in range(10_000):
+        tree.add(7)
+    tree.add(8)
+    assert tree.height == 2
+    assert tree.count(7) == 10_000
+    assert tree.percentile(100) == 8 and tree.select(9_999) == 7
+    assert tree.count_range(7, 8) == 10_001
+    tree.remove_all(7)
+    assert list(tree) == [8]
+    with pytest.raises(ValueError):
+        tree.remove_all(7)
+
+
+def test_iterators_repeat_the_copies():
+    tree = BinarySearchTree.from_sorted([1, 2, 2, 3, 3, 3], multiset=True)
+    assert node_count(tree) == 3
+    assert list(tree.breadth_first_iterator()) == [2, 2, 1, 3, 3, 3]
+    assert list(tree.depth_first_pre_order_iterator()) == [2, 2, 1, 3, 3, 3]
+    assert list(tree.depth_first_post_order_iterator()) == [1, 3, 3, 3, 2, 2]
+    assert list(reversed(tree)) == [3, 3, 3, 2, 2, 1]
+    assert list(tree.irange(2, 3, inclusive=(True, False))) == [2, 2]
+    assert list(tree.iter_from(2, inclusive=False)) == [3, 3, 3]
+    assert list(tree.iter_chunks(4)) == [[1, 2, 2, 3], [3, 3]]
+    assert tree.contains_many([2, 4]) == [True, False]
+    assert tree.floor_many([2.5]) == [2]
+    assert list(tree.freeze()) == list(tree)
+
+
+@pytest.mark.parametrize("size", (40, 10_000))
+def test_batches_keep_one_node_per_value(size: int):
+    tree = BinarySearchTree.from_iterable(
+        [val % 10 for val in range(size)], multiset=True
+    )
+    tree.add_many(val % 20 for val in range(size))
+    tree.remove_many([0] * (size // 10))
+    assert node_count(tree) == 20
+    assert tree.count(0) == size // 20
+    assert tree.count(5) == size // 10 + size // 20
+    assert tree.count(15) == size // 20
+    tree.balance()
+    assert node_count(tree) == 20 and tree.height == 5
+    tree.balance("in_place")
+    assert tree.height == 5 and tree.count(5) == size // 10 + size // 20
+
+
+def test_removing_a_node_with_two_children_moves_the_copies():
+    tree = BinarySearchTree.from_sorted([1, 2, 3, 3, 3, 4, 5, 6, 7], multiset=True)
+    root = tree._root
+    assert root is not None and root.val == 4
+    tree.remove(4)
+    assert root.val == 5
+    tree.remove_all(5)
+    assert root.val == 6
+    tree.remove(2)
+    assert list(tree) == [1, 3, 3, 3, 6, 7]
+    assert [tree.select(i) for i in range(6)] == [1, 3, 3, 3, 6, 7]
+    assert tree.count_range(2, 6) == 4
+
+
+def test_set_operations_count_copies():
+    a = BinarySearchTree.from_sorted([1, 2, 2, 3], multiset=True)
+    b = BinarySearchTree.from_sorted([2, 3, 3, 4])
+    assert list(a | b) == [1, 2, 2, 3, 3, 4]
+    assert list(a & b) == [2, 3]
+    assert list(a - b) == [1, 2]
+    assert list(b ^ a) == [1, 2, 3, 4]
+    assert (a | b)._multiset and not (b | a)._multiset
+    a |= b
+    assert node_count(a) == 4
+
+
+def test_copies_stay_multisets():
+    tree = ScapegoatBinarySearchTree.from_sorted([1, 1, 2], multiset=True, alpha=0.6)
+    for copied in (
+        copy.copy(tree),
+        copy.deepcopy(tree),
+        pickle.loads(pickle.dumps(tree)),
+    ):
+        assert isinstance(copied, ScapegoatBinarySearchTree)
+        assert copied.alpha == 0.6
+        assert node_count(copied) == 2
+        assert list(copied) == [1, 1, 2]
+
+
+def test_values_with_the_same_key_count_as_copies():
+    tree = BinarySearchTree(key=len, multiset=True)
+    for word in ("tree", "node", "leaf", "root", "branch"):
+        tree.add(word)
+    assert tree.count(4) == 4
+    assert list(tree) == ["tree"] * 4 + ["branch"]
+    assert list(tree.distinct()) == ["tree", "branch"]
+
+
+def test_counting_without_multiset():
+    tree = BinarySearchTree(
+        BinaryTreeNode(2, left=BinaryTreeNode(2), right=BinaryTreeNode(3))
+    )
+    tree.add(2)
+    assert tree.count(2) == 3 and node_count(tree) == 4
+    assert list(tree.distinct()) == [2, 3]
+    tree.remove_all(2)
+    assert list(tree) == [3]
+    with pytest.raises(ValueError):
+        tree.remove_all(2)
+
+
+def test_only_multisets_store_counts():
+    nodes = BinaryTreeNode(2, left=BinaryTreeNode(1), right=BinaryTreeNode(3))
+    tree = BinarySearchTree(nodes, multiset=True)
+    tree.add(2)
+    tree.add(2)
+    assert list(tree) == [1, 2, 2, 2, 3] and tree.height == 2
+    assert not hasattr(nodes, "__dict__") and nodes.count == 1
+    with pytest.raises(AttributeError):
+        nodes.count = 2
@@ -0,0 +1,90 @@
+"""Binary Search Tree module to test the order statistics backed by subtree sizes"""
+
+import bisect
+import math
+import random
+
+import pytest
+
+from playground.tree import AVLBinarySearchTree, BinarySearchTree, BinaryTreeNode
+
+
+@pytest.fixture(params=("unbalanced", "avl", "balanced"))
+def tree_and_values(request) -> tuple[BinarySearchTree[int], list[int]]:
+    rng = random.Random(7)
+    values = [rng.randrange(50) for _ in range(200)]
+    tree: BinarySearchTree[int] = (
+        AVLBinarySearchTree() if request.param == "avl" else BinarySearchTree()
+    )
+    for val in values:
+        tree.add(val)
+    if request.param == "balanced":
+        tree.balance()
+    for val in values[:60]:
+        tree.remove(val)
+    return tree, sorted(values[60:])
+
+
+def test_length_is_kept_up_to_date(tree_and_values):
+    tree, values = tree_and_values
+    assert len(tree) == len(values)
+    tree.add(1_000)
+    assert len(tree) == len(values) + 1
+
+
+def test_length_of_a_tree_built_from_nodes():
+    tree = BinarySearchTree(
+        BinaryTreeNode(
+            3,
+            left=BinaryTreeNode(2, left=BinaryTreeNode(1)),
+            right=BinaryTreeNode(4),
+        )
+    )
+    assert len(tree) == 4
+
+
+def test_select(tree_and_values):
+    tree, values = tree_and_values
+    for k in range(-len(values), len(values)):
+        assert tree.select(k) == values[k]
+
+
+@pytest.mark.parametrize("k", (-1, 0, 1))
+def test_select_on_an_empty_tree(k: int):
+    with pytest.raises(IndexError):
+        BinarySearchTree().select(k)
+
+
+def test_select_out_of_range(tree_and_values):
+    tree, values = tree_and_values
+    with pytest.raises(IndexError):
+        tree.select(len(values))
+    with pytest.raises(IndexError):
+        tree.select(-len(values) - 1)
+
+
+def test_rank(tree_and_values):
+    tree, values = tree_and_values
+    for x in range(-1, 52):
+        assert tree.rank(x) == bisect.bisect_left(values, x)
+
+
+def test_count_range(tree_and_values):
+    tree, values = tree_and_values
+    for lo in range(-1, 52, 5):
+        for hi in range(-1, 52, 3):
+            expected = sum(1 for val in values if lo <= val <= hi)
+            assert tree.count_range(lo, hi) == expected
+
+
+@pytest.mark.parametrize("p", (0, 1, 10, 25, 33.3, 50, 75, 99, 100))
+def test_percentile(tree_and_values, p: float):
+    tree, values = tree_and_values
+    expected = values[max(0, math.ceil(p * len(values) / 100) - 1)]
+    assert tree.percentile(p) == expected
+
+
+@pytest.mark.parametrize("p", (-1, 100.5))
+def test_percentile_out_of_range(p: float):
+    with pytest.raises(ValueError):
+        BinarySearchTree(BinaryTreeNode(1)).percentile(p)
@@ -0,0 +1,101 @@
+"""Binary Search Tree module to test building trees with several cores"""
+
+import random
+from operator import itemgetter
+
+import pytest
+
+from playground import parallel_tree
+from playground.parallel_tree import from_iterable_parallel
+from playground.tree import (
+    AVLBinarySearchTree,
+    BinarySearchTree,
+    ScapegoatBinarySearchTree,
+)
+
+
+@pytest.fixture(autouse=True)
+def free_threaded(monkeypatch) -> None:
+    """Use the threads even with the GIL, as on free-threaded builds"""
+    monkeypatch.setattr(parallel_tree, "_FREE_THREADED", True)
+
+
+def shape(tree):
+    """Every node in breadth-first order, with the attributes it keeps"""
+    nodes = []
+    level = [tree._root]
+    while level:
+        nodes.extend(
+            (node.val, node.key, node.count, node.height, node.size)
+            for node in level
+            if node
+        )
+        level = [child for node in level if node for child in (node.left, node.right)]
+    return nodes
+
+
+@pytest.mark.parametrize("size", (0, 1, 2, 5, 64, 1000))
+@pytest.mark.parametrize("workers", (2, 3, 4, 7))
+def test_builds_the_same_tree_as_from_iterable(size, workers):
+    values = [random.Random(size).randrange(size // 2 + 1) for _ in range(size)]
+    tree = from_iterable_parallel(values, workers=workers, min_parallel_size=0)
+    assert shape(tree) == shape(BinarySearchTree.from_iterable(values))
+
+
+@pytest.mark.parametrize("multiset", (False, True))
+def test_keeps_equal_keys_in_input_order(multiset):
+    rng = random.Random(0)
+    # Records with few distinct keys, told apart by their position
+    values = [(rng.randrange(10), position) for position in range(500)]
+    kwargs = {"key": itemgetter(0), "multiset": multiset}
+    tree = from_iterable_parallel(values, workers=3, min_parallel_size=0, **kwargs)
+    assert shape(tree) == shape(BinarySearchTree.from_iterable(values, **kwargs))
+    # Copies in a multiset are all the first value added with their key
+    if not multiset:
+        assert list(tree) == sorted(values, key=itemgetter(0))
+
+
+@pytest.mark.parametrize(
+    "tree_class",
+    (AVLBinarySearchTree, ScapegoatBinarySearchTree),
+)
+def test_builds_other_tree_classes(tree_class):
+    values = list(range(300))
+    random.Random(0).shuffle(values)
+    tree = from_iterable_parallel(values, tree_class, workers=2, min_parallel_size=0)
+    assert type(tree) is tree_class
+    assert shape(tree) == shape(tree_class.from_iterable(values))
+    for val in range(300):
+        tree.remove(val)
+    assert len(tree) == 0
+
+
+def test_builds_few_values_in_this_process():
+    tree = from_iterable_parallel([3, 1, 2], workers=4)
+    assert tuple(tree) == (1, 2, 3)
+    assert tree.height == 2
+
+
+def test_computes_each_key_once():
+    calls = []
+
+    def key(val):
+        calls.append(val)
+        return -val
+
+    values = list(range(100))
+    tree = from_iterable_parallel(values, workers=3, min_parallel_size=0, key=key)
+    assert list(tree) == values[::-1]
+    assert sorted(calls) == values
+
+
+def test_builds_in_a_single_thread_with_the_gil(monkeypatch):
+    monkeypatch.setattr(parallel_tree, "_FREE_THREADED", False)
+    monkeypatch.setattr(parallel_tree, "ThreadPoolExecutor", None)
+    tree = from_iterable_parallel([3, 1, 2], workers=4, min_parallel_size=0)
+    assert tuple(tree) == (1, 2, 3)
+
+
+def test_invalid_workers():
+    with pytest.raises(ValueError):
+        from_iterable_parallel([1, 2, 3], workers=0)
@@ -0,0 +1,104 @@
+"""Binary Search Tree module to test the persistent (path-copying) tree"""
+
+import random
+
+import pytest
+
+from playground.tree import (
+    BinarySearchTree,
+    BinaryTreeNode,
+    PersistentBinarySearchTree,
+    _is_avl_balanced,
+)
+
+
+def nodes(tree: PersistentBinarySearchTree) -> set[int]:
+    found = set()
+    stack = [tree._root]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            found.add(id(node))
+            stack.extend((node.left, node.right))
+    return found
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_every_version_keeps_its_values(seed: int):
+    rng = random.Random(seed)
+    tree: PersistentBinarySearchTree[int] = PersistentBinarySearchTree()
+    versions = [(tree, [])]
+    values: list[int] = []
+    for _ in range(300):
+        if values and rng.random() < 0.4:
+            val = rng.choice(values)
+            values.remove(val)
+            tree = tree.remove(val)
+        else:
+            val = rng.randrange(50)
+            values.append(val)
+            tree = tree.add(val)
+        versions.append((tree, sorted(values)))
+        assert _is_avl_balanced(tree._root)
+    for version, expected in versions:
+        assert list(version) == expected
+        assert len(version) == len(expected)
+
+
+@pytest.mark.parametrize("operation", ("add", "remove"))
+def test_updates_share_unchanged_nodes(operation: str):
+    tree = PersistentBinarySearchTree.from_sorted(range(1000))
+    for val in (0, 500, 511, 999):
+        updated = getattr(tree, operation)(val)
+        new_nodes = nodes(updated) - nodes(tree)
+        assert len(new_nodes) <= 3 * tree.height
+
+
+def test_sorted_adds_stay_balanced():
+    tree: PersistentBinarySearchTree[int] = PersistentBinarySearchTree()
+    for val in range(1000):
+        tree = tree.add(val)
+    assert tree.height <= 1.44 * (1000).bit_length()
+    for val in range(0, 1000, 2):
+        tree = tree.remove(val)
+    assert _is_avl_balanced(tree._root)
+    assert list(tree) == list(range(1, 1000, 2))
+
+
+def test_reading_a_version_while_writing():
+    tree = PersistentBinarySearchTree.from_sorted(range(100))
+    snapshot = tree
+    iterated = []
+    for val in snapshot:
+        iterated.append(val)
+        tree = tree.add(val + 0.5).remove(val)
+    assert iterated == list(range(100))
+    assert list(tree) == [val + 0.5 for val in range(100)]
+
+
+def test_remove_missing_and_last_values():
+    tree = PersistentBinarySearchTree.from_sorted([1])
+    with pytest.raises(ValueError):
+        tree.remove(2)
+    assert list(tree.remove(1)) == []
+    with pytest.raises(ValueError):
+        PersistentBinarySearchTree().remove(1)
+
+
+def test_creation_balances_the_given_nodes():
+    root = BinaryTreeNode(1, right=BinaryTreeNode(2, right=BinaryTreeNode(3)))
+    tree = PersistentBinarySearchTree(root)
+    assert tree.height == 2
+    assert list(tree) == [1, 2, 3]
+
+
+def test_read_only_operations():
+    tree = PersistentBinarySearchTree.from_sorted([1, 2, 3, 4])
+    assert tree.floor(0.5 + 2) == 2
+    assert list(tree.irange(2, 3)) == [2, 3]
+    assert list(tree.freeze()) == [1, 2, 3, 4]
+    combined = tree | BinarySearchTree.from_sorted([5])
+    assert isinstance(combined, PersistentBinarySearchTree)
+    assert list(combined) == [1, 2, 3, 4, 5]
+    assert not hasattr(tree, "balance")
+    assert not hasattr(tree, "add_many")
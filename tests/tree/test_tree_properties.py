@@ -1,5 +1,7 @@
 """Binary Search Tree module to test properties not covered by other test suites"""
 
+import random
+
 import pytest
 
 from playground.tree import BinarySearchTree, BinaryTreeNode
@@ -279,3 +281,118 @@ def test_balancing(
     assert len(tree) == previous_length
     assert tuple(tree) == previous_elements
     assert tree.height == expected_height
+
+
+def nodes(tree: BinarySearchTree[int]) -> list[BinaryTreeNode[int]]:
+    found = []
+    stack = [tree._root]
+    while stack:
+        node = stack.pop()
+        if node:
+            found.append(node)
+            stack.extend((node.left, node.right))
+    return found
+
+
+@pytest.mark.parametrize("size", (0, 1, 2, 3, 6, 7, 8, 31, 50, 127))
+@pytest.mark.parametrize("shape", ("sorted", "reversed", "random", "balanced"))
+def test_in_place_balancing(size: int, shape: str):
+    values = list(range(size))
+    if shape == "reversed":
+        values.reverse()
+    elif shape == "random":
+        random.Random(size).shuffle(values)
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    for val in values:
+        tree.add(val // 2)
+    if shape == "balanced":
+        tree.balance()
+    previous_nodes = {id(node) for node in nodes(tree)}
+    previous_elements = tuple(tree)
+
+    tree.balance("in_place")
+
+    assert tuple(tree) == previous_elements
+    assert tree.height == size.bit_length()
+    assert {id(node) for node in nodes(tree)} == previous_nodes
+    for node in nodes(tree):
+        left_height = node.left.height if node.left else 0
+        right_height = node.right.height if node.right else 0
+        assert node.height == 1 + max(left_height, right_height)
+        left_size = node.left.size if node.left else 0
+        right_size = node.right.size if node.right else 0
+        assert node.size == 1 + left_size + right_size
+
+
+def test_unknown_balancing_strategy():
+    with pytest.raises(ValueError):
+        BinarySearchTree().balance("unknown")  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("size", (0, 1, 2, 7, 50, 127))
+@pytest.mark.parametrize("shape", ("sorted", "random", "balanced"))
+def test_shape_report(size: int, shape: str):
+    values = list(range(size))
+    if shape == "random":
+        random.Random(size).shuffle(values)
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    for val in values:
+        tree.add(val)
+    if shape == "balanced":
+        tree.balance()
+    depths = {}
+    stack = [(tree._root, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if node:
+            depths[node.val] = depth
+            stack.extend(((node.left, depth + 1), (node.right, depth + 1)))
+
+    report = tree.shape_report()
+
+    assert report.nodes == size
+    assert report.height == tree.height
+    assert report.optimal_height == size.bit_length()
+    assert sum(report.depth_histogram) == size
+    assert len(report.depth_histogram) == tree.height
+    assert report.average_depth == pytest.approx(
+        sum(depths.values()) / size if size else 0
+    )
+    assert report.most_copied == []
+    tree.balance()
+    balanced = tree.shape_report()
+    assert balanced.most_unbalanced == []
+    assert balanced.balance_speedup == pytest.approx(1)
+    assert report.balance_speedup == pytest.approx(
+        report.average_depth / balanced.average_depth if size else 1
+    )
+    if shape == "sorted" and size > 2:
+        # The whole chain is the most unbalanced subtree
+        assert report.most_unbalanced[0] == (0, size, size.bit_length())
+        assert report.balance_speedup > 1
+
+
+def test_shape_report_lists_the_top_entries():
+    tree: BinarySearchTree[int] = BinarySearchTree()
+    for val in (5, 1, 1, 9, 9, 9, 3, 3, 3, 3, 7):
+        tree.add(val)
+    report = tree.shape_report(top=2)
+    assert report.most_copied == [(3, 4, 4), (9, 3, 3)]
+    assert len(report.most_unbalanced) == 2
+    extra_heights = [height - optimal for _, height, optimal in report.most_unbalanced]
+    assert extra_heights == sorted(extra_heights, reverse=True)
+
+    multiset = BinarySearchTree.from_iterable(tree, multiset=True)
+    report = multiset.shape_report(top=2)
+    assert report.nodes == 5
+    assert report.most_copied == [(3, 4, 1), (9, 3, 1)]
+
+
+def test_shape_report_measures_nodes_not_copies():
+    chain: BinarySearchTree[int] = BinarySearchTree(multiset=True)
+    for val in range(5):
+        for _ in range(10):
+            chain.add(val)
+    report = chain.shape_report()
+    assert (report.nodes, report.height, report.optimal_height) == (5, 5, 3)
+    assert report.most_unbalanced == [(0, 5, 3), (1, 4, 3), (2, 3, 2)]
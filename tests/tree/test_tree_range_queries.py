@@ -0,0 +1,111 @@
+"""Binary Search Tree module to test range queries and neighbor lookups"""
+
+import random
+from itertools import islice
+
+import pytest
+
+from playground.tree import AVLBinarySearchTree, BinarySearchTree
+
+
+@pytest.fixture(params=("unbalanced", "avl", "balanced"))
+def tree_and_values(request) -> tuple[BinarySearchTree[int], list[int]]:
+    rng = random.Random(3)
+    values = [rng.randrange(0, 60, 2) for _ in range(100)]
+    tree: BinarySearchTree[int] = (
+        AVLBinarySearchTree() if request.param == "avl" else BinarySearchTree()
+    )
+    for val in values:
+        tree.add(val)
+    if request.param == "balanced":
+        tree.balance()
+    return tree, sorted(values)
+
+
+@pytest.mark.parametrize("inclusive", ((True, True), (True, False), (False, True)))
+@pytest.mark.parametrize("reverse", (False, True))
+def test_irange(tree_and_values, inclusive: tuple[bool, bool], reverse: bool):
+    tree, values = tree_and_values
+    bounds = (None, -1, 0, 9, 10, 31, 58, 70)
+    for lo in bounds:
+        for hi in bounds:
+            expected = [
+                val
+                for val in values
+                if (lo is None or val > lo or (inclusive[0] and val == lo))
+                and (hi is None or val < hi or (inclusive[1] and val == hi))
+            ]
+            if reverse:
+                expected.reverse()
+            result = tree.irange(lo, hi, inclusive=inclusive, reverse=reverse)
+            assert list(result) == expected
+
+
+def test_irange_on_an_empty_tree():
+    assert list(BinarySearchTree().irange(1, 2)) == []
+
+
+@pytest.mark.parametrize("inclusive", (False, True))
+def test_iter_from(tree_and_values, inclusive: bool):
+    tree, values = tree_and_values
+    for key in (-1, 0, 9, 10, 58, 70):
+        after = [val for val in values if val > key or (inclusive and val == key)]
+        before = [val for val in values if val < key or (inclusive and val == key)]
+        assert list(tree.iter_from(key, inclusive=inclusive)) == after
+        assert list(tree.iter_from(key, True, inclusive)) == before[::-1]
+
+
+def test_paginating_with_iter_from():
+    tree = BinarySearchTree.from_sorted(range(0, 100, 3))
+    pages = [list(islice(tree, 7))]
+    while len(pages[-1]) == 7:
+        pages.append(list(islice(tree.iter_from(pages[-1][-1], inclusive=False), 7)))
+    assert [val for page in pages for val in page] == list(range(0, 100, 3))
+
+
+def test_reversed(tree_and_values):
+    tree, values = tree_and_values
+    assert list(reversed(tree)) == values[::-1]
+    assert list(reversed(BinarySearchTree())) == []
+
+
+@pytest.mark.parametrize("size", (1, 3, 100, 1000))
+def test_iter_chunks(tree_and_values, size: int):
+    tree, values = tree_and_values
+    chunks = list(tree.iter_chunks(size))
+    assert all(len(chunk) == size for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= size
+    assert [val for chunk in chunks for val in chunk] == values
+    assert list(BinarySearchTree().iter_chunks(size)) == []
+
+
+def test_min_and_max(tree_and_values):
+    tree, values = tree_and_values
+    assert tree.min() == values[0]
+    assert tree.max() == values[-1]
+
+
+@pytest.mark.parametrize("method", ("min", "max"))
+def test_min_and_max_on_an_empty_tree(method: str):
+    with pytest.raises(ValueError):
+        getattr(BinarySearchTree(), method)()
+
+
+def test_neighbors(tree_and_values):
+    tree, values = tree_and_values
+    for x in range(-2, 62):
+        smaller_or_equal = [val for val in values if val <= x]
+        smaller = [val for val in values if val < x]
+        greater_or_equal = [val for val in values if val >= x]
+        greater = [val for val in values if val > x]
+        for method, candidates, expected in (
+            (tree.floor, smaller_or_equal, max),
+            (tree.predecessor, smaller, max),
+            (tree.ceiling, greater_or_equal, min),
+            (tree.successor, greater, min),
+        ):
+            if candidates:
+                assert method(x) == expected(candidates)
+            else:
+                with pytest.raises(ValueError):
+                    method(x)
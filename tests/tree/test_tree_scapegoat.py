@@ -0,0 +1,107 @@
+"""Binary Search Tree module to test the partially rebuilt scapegoat tree"""
+
+import math
+import random
+
+import pytest
+
+from playground.tree import BinaryTreeNode, ScapegoatBinarySearchTree
+
+
+def height_budget(n: int, alpha: float) -> float:
+    return math.log(n) / math.log(1 / alpha) + 1 if n else 0
+
+
+@pytest.mark.parametrize("alpha", (0.5, 0.6, 0.75, 0.9))
+@pytest.mark.parametrize("order", ("sorted", "reversed", "random"))
+def test_height_stays_within_budget(alpha: float, order: str):
+    values = list(range(2_000))
+    if order == "reversed":
+        values.reverse()
+    elif order == "random":
+        random.Random(2).shuffle(values)
+    tree: ScapegoatBinarySearchTree[int] = ScapegoatBinarySearchTree(alpha=alpha)
+    for i, val in enumerate(values, start=1):
+        tree.add(val)
+        assert tree.height <= height_budget(i, alpha) + 1e-9
+    assert list(tree) == sorted(values)
+    assert tree.alpha == alpha
+
+
+def test_remove_rebuilds_the_tree_when_it_shrinks():
+    tree: ScapegoatBinarySearchTree[int] = ScapegoatBinarySearchTree(alpha=0.6)
+    for val in range(1_000):
+        tree.add(val)
+    # Removing from one side leaves the other one too deep without a rebuild
+    for val in range(500):
+        tree.remove(val)
+        assert tree.height <= height_budget(len(tree), 0.6) + 1
+    assert list(tree) == list(range(500, 1_000))
+
+
+@pytest.mark.parametrize("strategy", ("rebuild", "in_place"))
+def test_explicit_balance_resets_the_rebuild_threshold(strategy: str):
+    tree = ScapegoatBinarySearchTree.from_sorted(range(100), alpha=0.7)
+    for val in range(25):
+        tree.remove(val)
+    tree.balance(strategy)
+    balance = tree.balance
+    calls = []
+
+    def counting_balance(*args):
+        calls.append(args)
+        balance(*args)
+
+    tree.balance = counting_balance  # type: ignore[method-assign]
+    # 69 values would be fewer than 0.7 times the 100 before balancing
+    for val in range(25, 31):
+        tree.remove(val)
+    assert not calls
+    # But they still are once fewer than 0.7 times the 75 after it
+    for val in range(31, 48):
+        tree.remove(val)
+    assert len(calls) == 1
+    assert list(tree) == list(range(48, 100))
+
+
+def test_remove_not_present_value():
+    tree = ScapegoatBinarySearchTree.from_sorted([1, 2, 3])
+    with pytest.raises(ValueError):
+        tree.remove(4)
+
+
+def test_random_operations():
+    rng = random.Random(9)
+    tree: ScapegoatBinarySearchTree[int] = ScapegoatBinarySearchTree()
+    expected: list[int] = []
+    for _ in range(3_000):
+        if expected and rng.random() < 0.45:
+            val = rng.choice(expected)
+            tree.remove(val)
+            expected.remove(val)
+        else:
+            val = rng.randrange(500)
+            tree.add(val)
+            expected.append(val)
+    assert list(tree) == sorted(expected)
+    assert len(tree) == len(expected)
+
+
+def test_an_unbalanced_tree_is_balanced_on_creation():
+    tree = ScapegoatBinarySearchTree(
+        BinaryTreeNode(1, right=BinaryTreeNode(2, right=BinaryTreeNode(3))),
+        alpha=0.5,
+    )
+    assert tree.height == 2
+
+
+def test_bulk_construction_takes_alpha():
+    tree = ScapegoatBinarySearchTree.from_iterable([3, 1, 2], alpha=0.8)
+    assert tree.alpha == 0.8
+    assert list(tree) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("alpha", (0.49, 1, 2))
+def test_invalid_alpha(alpha: float):
+    with pytest.raises(ValueError):
+        ScapegoatBinarySearchTree(alpha=alpha)
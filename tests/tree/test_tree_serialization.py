@@ -0,0 +1,119 @@
+"""Binary Search Tree module to test copying, pickling and binary dumps"""
+
+import copy
+import io
+import pickle
+import struct
+
+import pytest
+
+from playground.tree import (
+    AVLBinarySearchTree,
+    BinarySearchTree,
+    BinaryTreeNode,
+    ScapegoatBinarySearchTree,
+)
+
+
+def chain(n: int) -> BinaryTreeNode[int]:
+    root = BinaryTreeNode(n - 1)
+    for val in range(n - 2, -1, -1):
+        root = BinaryTreeNode(val, right=root)
+    return root
+
+
+@pytest.mark.parametrize(
+    "tree",
+    (
+        BinarySearchTree(),
+        BinarySearchTree.from_sorted([1, 1, 2, 3]),
+        AVLBinarySearchTree.from_sorted(["a", "b"]),
+        ScapegoatBinarySearchTree.from_sorted([0.5, 1.5], alpha=0.9),
+    ),
+)
+@pytest.mark.parametrize(
+    "clone",
+    (
+        copy.copy,
+        copy.deepcopy,
+        lambda tree: pickle.loads(pickle.dumps(tree)),
+    ),
+)
+def test_clones_keep_type_values_and_configuration(tree, clone):
+    cloned = clone(tree)
+    assert cloned is not tree
+    assert type(cloned) is type(tree)
+    assert tuple(cloned) == tuple(tree)
+    assert cloned.height == len(tree).bit_length()
+    if isinstance(tree, ScapegoatBinarySearchTree):
+        assert cloned.alpha == tree.alpha
+
+
+def test_clones_are_independent():
+    tree = BinarySearchTree.from_sorted([1, 2, 3])
+    cloned = copy.copy(tree)
+    cloned.add(4)
+    tree.remove(1)
+    assert tuple(tree) == (2, 3)
+    assert tuple(cloned) == (1, 2, 3, 4)
+
+
+def test_deep_trees_can_be_pickled_and_copied():
+    tree = BinarySearchTree(chain(10**5))
+    assert tuple(pickle.loads(pickle.dumps(tree))) == tuple(range(10**5))
+    assert len(copy.deepcopy(tree)) == 10**5
+
+
+@pytest.mark.parametrize(
+    ("values", "item_size"),
+    (
+        ([], 8),
+        ([-(2**63), -1, 0, 1, 2**63 - 1], 8),
+        ([-1.5, 0.0, 2.25, float("inf")], 8),
+        ([1, 2**63], None),
+        ([1, 1.5], None),
+        ([True, False], None),
+        (["a", "b", "c"], None),
+    ),
+)
+def test_dump_and_load(values: list, item_size: int | None):
+    file = io.BytesIO()
+    tree = BinarySearchTree.from_iterable(values)
+    tree.dump(file)
+    if item_size is not None:
+        assert len(file.getvalue()) == 15 + item_size * len(values)
+    file.seek(0)
+    loaded = BinarySearchTree.load(file)
+    assert list(loaded) == sorted(values)
+    assert [type(val) for val in loaded] == [type(val) for val in sorted(values)]
+
+
+def test_dump_and_load_large_trees():
+    file = io.BytesIO()
+    BinarySearchTree.from_sorted(range(200_000)).dump(file)
+    file.seek(0)
+    loaded = ScapegoatBinarySearchTree.load(file, alpha=0.6)
+    assert loaded.alpha == 0.6
+    assert list(loaded) == list(range(200_000))
+
+
+@pytest.mark.parametrize(
+    "data",
+    (
+        b"",
+        b"PGBST",
+        b"XXXXX" + bytes(10),
+        struct.pack("<5sBcQ", b"PGBST", 2, b"q", 0),
+        struct.pack("<5sBcQ", b"PGBST", 1, b"q", 2) + bytes(8),
+        struct.pack("<5sBcQ", b"PGBST", 1, b"p", 2) + pickle.dumps([1]),
+    ),
+)
+def test_load_invalid_dumps(data: bytes):
+    with pytest.raises(ValueError):
+        BinarySearchTree.load(io.BytesIO(data))
+
+
+def test_load_validates_the_order():
+    data = struct.pack("<5sBcQ", b"PGBST", 1, b"p", 2) + pickle.dumps([2, 1])
+    with pytest.raises(ValueError):
+        BinarySearchTree.load(io.BytesIO(data))
@@ -0,0 +1,113 @@
+"""Binary Search Tree module to test union, intersection and differences"""
+
+import operator
+import random
+from collections import Counter
+
+import pytest
+
+from playground.tree import (
+    AVLBinarySearchTree,
+    BinarySearchTree,
+    ScapegoatBinarySearchTree,
+)
+
+# Method, in-place method, operator, in-place operator and Counter operator
+OPERATIONS = (
+    ("union", "update", operator.or_, operator.ior, operator.or_),
+    (
+        "intersection",
+        "intersection_update",
+        operator.and_,
+        operator.iand,
+        operator.and_,
+    ),
+    ("difference", "difference_update", operator.sub, operator.isub, operator.sub),
+    (
+        "symmetric_difference",
+        "symmetric_difference_update",
+        operator.xor,
+        operator.ixor,
+        lambda a, b: (a - b) + (b - a),
+    ),
+)
+
+
+def random_values(seed: int) -> list[int]:
+    rng = random.Random(seed)
+    return [rng.randrange(20) for _ in range(rng.randrange(30))]
+
+
+def expected(values, other_values, counter_operation) -> list[int]:
+    return sorted(counter_operation(Counter(values), Counter(other_values)).elements())
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize(
+    ("method", "in_place_method", "op", "in_place_op", "counter_op"),
+    OPERATIONS,
+)
+def test_operations_follow_counter_semantics(
+    seed, method, in_place_method, op, in_place_op, counter_op
+):
+    values, other_values = random_values(seed), random_values(seed + 100)
+    tree = BinarySearchTree.from_iterable(values)
+    other = BinarySearchTree.from_iterable(other_values)
+    result = expected(values, other_values, counter_op)
+
+    assert list(getattr(tree, method)(other)) == result
+    assert list(getattr(tree, method)(other_values)) == result
+    combined = op(tree, other)
+    assert list(combined) == result
+    assert combined.height == len(result).bit_length()
+    assert list(tree) == sorted(values)
+    assert list(other) == sorted(other_values)
+
+    assert in_place_op(tree, other) is tree
+    assert list(tree) == result
+
+    tree = BinarySearchTree.from_iterable(values)
+    getattr(tree, in_place_method)(iter(other_values))
+    assert list(tree) == result
+
+
+@pytest.mark.parametrize(
+    "op",
+    (
+        operator.or_,
+        operator.and_,
+        operator.sub,
+        operator.xor,
+        operator.ior,
+        operator.iand,
+        operator.isub,
+        operator.ixor,
+    ),
+)
+def test_operators_need_trees(op):
+    with pytest.raises(TypeError):
+        op(BinarySearchTree.from_sorted([1]), [1])
+
+
+def test_copies_come_from_the_tree_first():
+    first, second = [1], [1]
+    tree = BinarySearchTree.from_sorted([first])
+    other = BinarySearchTree.from_sorted([second, second])
+    union = list(tree | other)
+    assert union[0] is first
+    assert union[1] is second
+
+
+def test_result_keeps_the_type_and_configuration():
+    tree = ScapegoatBinarySearchTree.from_sorted([1, 2], alpha=0.9)
+    result = tree | AVLBinarySearchTree.from_sorted([3])
+    assert isinstance(result, ScapegoatBinarySearchTree)
+    assert result.alpha == 0.9
+    assert list(result) == [1, 2, 3]
+
+
+def test_in_place_operations_invalidate_cached_data():
+    tree = BinarySearchTree.from_sorted([1, 2])
+    assert tree.contains_many([3]) == [False]
+    tree |= BinarySearchTree.from_sorted([3])
+    assert tree.contains_many([3]) == [True]